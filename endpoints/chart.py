@@ -0,0 +1,197 @@
+import json
+from collections.abc import Mapping
+
+from werkzeug import Request, Response
+from dify_plugin import Endpoint
+
+from utils.decisions import decision_key, get_decision_cache
+from utils.endpoint import authorized, json_response
+from utils.executor import build_charts
+from utils.flatten import flatten_source
+from utils.governor import parse_output_budget
+from utils.guardrail import parse_series_budget
+from utils.ingest import ChartDataError, open_json_source
+from utils.memory import MEMORY_POLICIES, MemoryBudgetError, MemoryTracker
+from utils.metrics import Invocation
+from utils.pipeline import (DEFAULT_OPTIONS, split_chart_types, explicit_decision, request_decision, parse_decision,
+                            auto_decision, needs_name_key, load_chart_data, prepare_jobs)
+from utils.quantize import parse_precision
+from utils.trace import start_trace
+
+
+class ChartRequestError(ValueError):
+    """请求参数或数据有误，返回 400"""
+
+
+class ChartEndpoint(Endpoint):
+    """
+    POST /chart：请求体为 JSON，包含 chart_data 以及可选的 chart_type、name_key、value_keys、series_names、group_key、chart_title
+    字段齐全时直接生成图表，不调用大模型；不齐全时依次使用决策缓存、请求中 model 指定的大模型、自动检测字段
+    返回 {"decision": 字段选择, "notices": 提示, "charts": [{"chart_type": 图表类型, "option": ECharts 配置}], "errors": 失败的图表}
+    """
+
+    def _invoke(self, r: Request, values: Mapping, settings: Mapping) -> Response:
+        # 该端点会用安装者的大模型额度并读取、构建大量数据，未配置 chart_token 时拒绝所有请求
+        if not settings.get("chart_token"):
+            return json_response({"error": "图表端点未配置 chart_token，已拒绝访问"}, 403)
+        if not authorized(r, settings.get("chart_token")):
+            return json_response({"error": "unauthorized"}, 401)
+        body = r.get_json(silent=True)
+        if not isinstance(body, dict):
+            return json_response({"error": "请求体必须是 JSON 对象"}, 400)
+        invocation = Invocation()
+        try:
+            payload = self._render(body, invocation)
+            return json_response(payload)
+        except ChartRequestError as e:
+            return json_response({"error": str(e)}, 400)
+        except Exception as e:
+            return json_response({"error": f"生成失败: {e}"}, 500)
+        finally:
+            invocation.finish()
+
+    def _render(self, body: dict, invocation: Invocation) -> str:
+        if "chart_data" not in body:
+            raise ChartRequestError("缺少 chart_data")
+        options = {key: body[key] for key in DEFAULT_OPTIONS if body.get(key) is not None}
+        memory_policy = body.get("memory_policy") or "sample"
+        try:
+            parse_precision(options.get("precision", DEFAULT_OPTIONS["precision"]))
+            if "series_budget" in options:
+                options["series_budget"] = parse_series_budget(options["series_budget"])
+            if "output_budget" in options:
+                # 端点的 output_budget 以字节为单位，与 DEFAULT_OPTIONS 一致
+                options["output_budget"] = parse_output_budget(options["output_budget"], unit=1)
+        except ValueError as e:
+            raise ChartRequestError(str(e))
+        if memory_policy not in MEMORY_POLICIES:
+            raise ChartRequestError(f"不支持的内存处理方式: {memory_policy}，可选值为 {', '.join(MEMORY_POLICIES)}")
+        memory = MemoryTracker()
+        trace = start_trace(invocation.enabled)
+        invocation.trace = trace
+        invocation.memory = memory
+
+        try:
+            with trace.span("sample"):
+                source = flatten_source(open_json_source(body["chart_data"]))
+                sample_records = source.sample(20)
+        except ChartDataError as e:
+            raise ChartRequestError(str(e))
+
+        notices = []
+        decision, decided_by, cache_key = self._decide(body, sample_records, invocation, trace)
+        if decided_by not in ("llm", "cache"):
+            cache_key = None
+        # 大模型的字段选择至少生成了一个图表才写入缓存；缓存的字段选择没能生成任何图表时移出缓存
+        built = False
+        try:
+            requested_chart_types = split_chart_types(body.get("chart_type"))
+            chart_types = requested_chart_types if len(requested_chart_types) > 1 else [decision["chart_type"]]
+            try:
+                data_list, memory_notice = load_chart_data(source, sample_records, chart_types, decision, memory_policy,
+                                                           memory, trace)
+            except ChartDataError as e:
+                if isinstance(e, MemoryBudgetError):
+                    # 内存处理方式为拒绝生成
+                    invocation.status = "rejected"
+                raise ChartRequestError(str(e))
+            if memory_notice:
+                invocation.fallback(f"memory_{memory_policy}")
+                notices.append(memory_notice)
+            if decision["name_key"] not in data_list and needs_name_key(chart_types):
+                raise ChartRequestError(f"name_key {decision['name_key']} 不存在于数据中")
+            for value_key in decision["value_keys"]:
+                if value_key not in data_list:
+                    raise ChartRequestError(f"value_key {value_key} 不存在于数据中")
+
+            jobs = []
+            try:
+                for kind, payload in prepare_jobs(chart_types, data_list, decision, options, trace):
+                    if kind == "job":
+                        # 默认输出紧凑 JSON，调用方需要缩进格式时传 compact: false
+                        payload["options"]["compact"] = bool(body.get("compact", True))
+                        jobs.append(payload)
+                    elif kind == "unsupported":
+                        raise ChartRequestError(payload)
+                    else:
+                        if kind != "message":
+                            invocation.fallback(kind)
+                        notices.append(payload)
+            except ChartRequestError:
+                raise
+            except ValueError as e:
+                raise ChartRequestError(str(e))
+
+            with trace.span("build", charts=len(jobs)):
+                results = build_charts(jobs)
+            # 构建函数输出的配置已经是 JSON 文本，直接拼接到响应中，不再解析和重新序列化
+            charts = []
+            errors = []
+            for job, (echarts_config, error) in zip(jobs, results):
+                invocation.chart(job["chart_type"], error is None)
+                if error is not None:
+                    errors.append({"chart_type": job["chart_type"], "error": str(error)})
+                    continue
+                invocation.output(echarts_config)
+                charts.append(f'{{"chart_type":{json.dumps(job["chart_type"], ensure_ascii=False)},"option":{echarts_config}}}')
+            built = bool(charts)
+            # 没有生成任何图表任务时（如分组超过系列上限且处理方式为拒绝）记为 rejected，不计入成功
+            invocation.status = "ok" if built else "rejected" if not jobs else "error"
+            head = json.dumps({"decision": dict(decision, source=decided_by), "notices": notices, "errors": errors},
+                              ensure_ascii=False)
+            return f'{head[:-1]},"charts":[{",".join(charts)}]}}'
+        finally:
+            if cache_key is not None:
+                get_decision_cache().settle(cache_key, decision, built, decided_by == "cache")
+
+    def _decide(self, body: dict, sample_records: list, invocation: Invocation, trace) -> tuple:
+        """
+        返回 (字段选择, 来源, 决策缓存的键)，来源为 explicit、cache、llm 或 auto_detect
+        大模型给出的字段在至少生成一个图表后才写入缓存（见 _render）
+        """
+        try:
+            decision = explicit_decision(body)
+        except ValueError as e:
+            raise ChartRequestError(str(e))
+        if decision is not None:
+            return decision, "explicit", None
+
+        chart_type, chart_title, model = body.get("chart_type"), body.get("chart_title"), body.get("model")
+        decision_cache = get_decision_cache()
+        cache_key = None
+        if decision_cache.enabled:
+            columns = list(dict.fromkeys(key for item in sample_records for key in item))
+            cache_key = decision_key(columns, chart_type, chart_title, model)
+            cached_decision = decision_cache.get(cache_key)
+            if cached_decision is not None:
+                try:
+                    return parse_decision(cached_decision), "cache", cache_key
+                except ValueError:
+                    pass
+
+        if isinstance(model, dict) and model.get("model"):
+            invocation.llm_call()
+            decision = None
+            # 大模型调用失败或返回的字段不可用时退回自动检测
+            with trace.span("llm", cached=False):
+                try:
+                    response = request_decision(self.session.model.llm, model, chart_type, chart_title, sample_records)
+                except Exception:
+                    invocation.llm_failure("error")
+                    response = None
+            if response is not None:
+                try:
+                    decision = parse_decision(response)
+                except json.JSONDecodeError:
+                    invocation.llm_failure("invalid_json")
+                except (ValueError, TypeError):
+                    invocation.llm_failure("invalid_config")
+            if decision is not None:
+                return decision, "llm", cache_key
+
+        invocation.fallback("auto_detect")
+        try:
+            decision = auto_decision(sample_records, (split_chart_types(chart_type) or [None])[0], chart_title)
+        except ValueError as e:
+            raise ChartRequestError(f"无法确定图表字段: {e}")
+        return decision, "auto_detect", None
@@ -0,0 +1,16 @@
+from collections.abc import Mapping
+
+from werkzeug import Request, Response
+from dify_plugin import Endpoint
+
+from utils.endpoint import authorized
+from utils.metrics import render_metrics
+
+
+class MetricsEndpoint(Endpoint):
+    """以 Prometheus 文本格式输出插件进程的调用次数、阶段耗时、缓存命中率、输出体积与内存峰值"""
+
+    def _invoke(self, r: Request, values: Mapping, settings: Mapping) -> Response:
+        if not authorized(r, settings.get("metrics_token")):
+            return Response("unauthorized\n", status=401, content_type="text/plain; charset=utf-8")
+        return Response(render_metrics(), status=200, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,28 @@
+import logging
+import os
+
 from dify_plugin import Plugin, DifyPluginEnv
+from dify_plugin.config.logger_format import plugin_logger_handler
 
 plugin = Plugin(DifyPluginEnv(MAX_REQUEST_TIMEOUT=3600))
 
 if __name__ == '__main__':
+    # 每次调用的预估与实际内存峰值通过插件日志输出
+    memory_logger = logging.getLogger("utils.memory")
+    memory_logger.setLevel(logging.INFO)
+    memory_logger.addHandler(plugin_logger_handler)
+    # 设置 JSON2CHART_TRACE_LOG=1 时把各阶段耗时和大模型的原始输出以 DEBUG 级别写入插件日志
+    if os.getenv("JSON2CHART_TRACE_LOG") == "1":
+        for name in ("utils.trace", "tools.json2chart"):
+            trace_logger = logging.getLogger(name)
+            trace_logger.setLevel(logging.DEBUG)
+            trace_logger.addHandler(plugin_logger_handler)
+    # 设置 JSON2CHART_WARMUP=1 时在启动阶段预热，避免第一次调用承担全部初始化开销
+    from utils.warmup import warm_up, warmup_enabled
+    if warmup_enabled():
+        # 预热耗时通过插件日志输出
+        warmup_logger = logging.getLogger("utils.warmup")
+        warmup_logger.setLevel(logging.INFO)
+        warmup_logger.addHandler(plugin_logger_handler)
+        warm_up()
     plugin.run()
@@ -0,0 +1,192 @@
+# 离线批量生成：在 Dify 之外用与工具相同的处理流程，把一个目录中的数据文件（JSON、CSV、NDJSON、Parquet 等）
+# 并行转换为 ECharts 配置文件，不调用大模型：字段来自显式指定、与数据文件同名的 .spec.json、决策缓存或自动检测
+# 用法: python scripts/batch_json2chart.py 输入目录 -o 输出目录 [--spec 字段.json] [--decision-cache 缓存.json] [--workers 8]
+# 字段文件与图表端点的请求体格式相同（不含 chart_data）：{"chart_type": "柱状图", "name_key": "产品", "value_keys": ["销量"], ...}
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 数据文件的扩展名，与 utils.readers 支持的格式一致
+DATA_EXTENSIONS = (".json", ".ndjson", ".jsonl", ".csv", ".tsv", ".arrow", ".feather", ".ipc", ".parquet")
+# 与数据文件同名、指定该文件字段的文件后缀
+SPEC_SUFFIX = ".spec.json"
+
+
+def find_inputs(directory: str, recursive: bool) -> list:
+    """列出目录中的数据文件（跳过字段文件），按路径排序"""
+    paths = []
+    for parent, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(SPEC_SUFFIX) or not name.lower().endswith(DATA_EXTENSIONS):
+                continue
+            paths.append(os.path.join(parent, name))
+        if not recursive:
+            break
+    return paths
+
+
+def load_spec(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    if not isinstance(spec, dict):
+        raise ValueError(f"字段文件必须是 JSON 对象: {path}")
+    return spec
+
+
+def decide(spec: dict, sample_records: list, model: dict, auto_detect: bool) -> tuple:
+    """返回 (字段选择, 来源)；来源为 explicit、cache 或 auto_detect，都无法确定时抛出 ValueError"""
+    from utils.decisions import decision_key, get_decision_cache
+    from utils.pipeline import auto_decision, explicit_decision, parse_decision, split_chart_types
+
+    decision = explicit_decision(spec)
+    if decision is not None:
+        return decision, "explicit"
+    decision_cache = get_decision_cache()
+    if decision_cache.enabled:
+        # 与插件使用相同的缓存键，插件运行中积累的决策可以直接复用
+        columns = list(dict.fromkeys(key for item in sample_records for key in item))
+        cached = decision_cache.get(decision_key(columns, spec.get("chart_type"), spec.get("chart_title"), model))
+        if cached is not None:
+            return parse_decision(cached), "cache"
+    if not auto_detect:
+        raise ValueError("没有指定字段，决策缓存中也没有该数据结构的字段选择（可加 --auto-detect 自动检测）")
+    chart_type = (split_chart_types(spec.get("chart_type")) or [None])[0]
+    return auto_decision(sample_records, chart_type, spec.get("chart_title")), "auto_detect"
+
+
+def output_paths(output_dir: str, input_path: str, input_dir: str, count: int) -> list:
+    """输出文件保持输入目录的层级；一个数据文件生成多个图表时按序号区分"""
+    relative = os.path.splitext(os.path.relpath(input_path, input_dir))[0]
+    base = os.path.join(output_dir, relative)
+    if count == 1:
+        return [base + ".echarts.json"]
+    return [f"{base}.{index + 1}.echarts.json" for index in range(count)]
+
+
+def convert_file(input_path: str, input_dir: str, output_dir: str, spec: dict, model: dict,
+                 auto_detect: bool) -> dict:
+    """在子进程中处理一个数据文件，返回统计信息；失败时 error 为错误说明"""
+    from utils.columns import column_length
+    from utils.executor import run_chart_job
+    from utils.flatten import flatten_source
+    from utils.pipeline import DEFAULT_OPTIONS, load_chart_data, needs_name_key, prepare_jobs, split_chart_types
+    from utils.readers import open_file_source
+
+    start = time.perf_counter()
+    result = {"input": input_path, "outputs": [], "rows": 0, "bytes": 0, "source": None, "notices": [], "error": None}
+    try:
+        spec_path = os.path.splitext(input_path)[0] + SPEC_SUFFIX
+        if os.path.exists(spec_path):
+            spec = dict(spec, **load_spec(spec_path))
+        source = flatten_source(open_file_source(input_path))
+        sample_records = source.sample(20)
+        decision, result["source"] = decide(spec, sample_records, model, auto_detect)
+        requested_chart_types = split_chart_types(spec.get("chart_type"))
+        chart_types = requested_chart_types if len(requested_chart_types) > 1 else [decision["chart_type"]]
+        data_list, notice = load_chart_data(source, sample_records, chart_types, decision,
+                                            spec.get("memory_policy") or "sample")
+        if notice:
+            result["notices"].append(notice)
+        if decision["name_key"] not in data_list and needs_name_key(chart_types):
+            raise ValueError(f"name_key {decision['name_key']} 不存在于数据中")
+        for value_key in decision["value_keys"]:
+            if value_key not in data_list:
+                raise ValueError(f"value_key {value_key} 不存在于数据中")
+        result["rows"] = column_length(data_list)
+
+        options = {key: spec[key] for key in DEFAULT_OPTIONS if spec.get(key) is not None}
+        jobs = []
+        for kind, payload in prepare_jobs(chart_types, data_list, decision, options):
+            if kind == "job":
+                if "compact" in spec:
+                    payload["options"]["compact"] = bool(spec["compact"])
+                jobs.append(payload)
+            elif kind == "unsupported":
+                raise ValueError(payload)
+            else:
+                result["notices"].append(payload)
+        del data_list
+
+        # 已经在进程池中，逐个构建；配置边序列化边写入文件，不在内存中保留完整字符串
+        for job, path in zip(jobs, output_paths(output_dir, input_path, input_dir, len(jobs))):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                for fragment in run_chart_job(job, chunked=True):
+                    f.write(fragment)
+            result["outputs"].append(path)
+            result["bytes"] += os.path.getsize(path)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="批量把数据文件转换为 ECharts 配置")
+    parser.add_argument("input_dir", help="数据文件所在目录")
+    parser.add_argument("-o", "--output-dir", required=True, help="输出目录，保持输入目录的层级")
+    parser.add_argument("--spec", help="所有文件共用的字段文件；与数据文件同名的 .spec.json 优先")
+    parser.add_argument("--decision-cache", help="决策缓存文件（插件的 JSON2CHART_DECISION_CACHE），没有指定字段时查找")
+    parser.add_argument("--model", default="", help="生成决策缓存时使用的模型，格式为 provider/model，用于计算缓存键")
+    parser.add_argument("--auto-detect", action="store_true", help="没有指定字段且缓存未命中时自动检测字段")
+    parser.add_argument("--recursive", action="store_true", help="包含子目录中的文件")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="进程数")
+    parser.add_argument("--report", help="把每个文件的处理结果写入该 JSON 文件")
+    args = parser.parse_args(argv)
+
+    inputs = find_inputs(args.input_dir, args.recursive)
+    if not inputs:
+        print(f"目录中没有数据文件: {args.input_dir}")
+        return 1
+    spec = load_spec(args.spec) if args.spec else {}
+    provider, _, model_name = args.model.rpartition("/")
+    model = {"provider": provider, "model": model_name} if model_name else None
+    if args.decision_cache:
+        # 决策缓存在首次使用时按环境变量加载，子进程继承环境变量后各自只读使用
+        os.environ["JSON2CHART_DECISION_CACHE"] = args.decision_cache
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), mp_context=context) as pool:
+        futures = [pool.submit(convert_file, path, args.input_dir, args.output_dir, spec, model, args.auto_detect)
+                   for path in inputs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["error"]:
+                print(f"失败 {result['input']}: {result['error']}")
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda result: result["input"])
+    failed = [result for result in results if result["error"]]
+    rows = sum(result["rows"] for result in results)
+    output_bytes = sum(result["bytes"] for result in results)
+    charts = sum(len(result["outputs"]) for result in results)
+    sources = {}
+    for result in results:
+        if result["source"]:
+            sources[result["source"]] = sources.get(result["source"], 0) + 1
+    print(f"处理 {len(results)} 个文件，成功 {len(results) - len(failed)} 个，失败 {len(failed)} 个，"
+          f"生成 {charts} 个图表，进程数 {args.workers}")
+    print(f"耗时 {elapsed:.2f} 秒，{len(results) / elapsed:.1f} 文件/秒，{rows / elapsed:.0f} 行/秒，"
+          f"输出 {output_bytes / 1024 / 1024:.1f} MB（{output_bytes / 1024 / 1024 / elapsed:.1f} MB/秒）")
+    if sources:
+        print("字段来源: " + "，".join(f"{source} {count}" for source, count in sorted(sources.items())))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
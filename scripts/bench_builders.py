@@ -0,0 +1,185 @@
+# 图表构建函数的基准测试：用合成数据测量各图表类型在不同数据量下的构建耗时与输出体积，并与基线对比
+# 用法: python scripts/bench_builders.py [--max-rows N] [--charts 柱状图,折线图] [--threshold 0.5] [--update-baseline]
+# 耗时按同一进程中校准循环的耗时归一化后再与基线对比，不同机器上的绝对耗时不可比较
+# 任一用例的归一化耗时或输出体积超出基线的 (1 + threshold) 倍时以退出码 1 结束
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.registry import CHART_TYPES  # noqa: E402
+
+BASELINE_PATH = os.path.join(ROOT, "scripts", "bench_baseline.json")
+
+# 数据行数
+SIZES = (10, 1000, 100_000, 1_000_000)
+# 数据形态：数值字段个数、类别文本长度、分组数（0 为不分组，只对支持分组的图表测试）
+VARIANTS = {
+    "k1": {"value_keys": 1, "width": 8, "groups": 0},
+    "k3w32": {"value_keys": 3, "width": 32, "groups": 0},
+    "g10": {"value_keys": 1, "width": 8, "groups": 10},
+    "g100": {"value_keys": 2, "width": 16, "groups": 100},
+}
+# 耗时低于该值（毫秒）的用例只比较输出体积，避免计时抖动造成误报
+MIN_COMPARE_MS = 5.0
+# 校准循环的重复次数，取最短耗时
+CALIBRATION_REPEAT = 7
+# 行数达到该值时按紧凑 JSON 构建：实际调用中这种数据量一定会触发输出体积上限，缩进格式的输出也会占用过多内存
+COMPACT_ROWS = 1_000_000
+
+
+def make_columns(rows: int, value_keys: int, width: int, groups: int, seed: int = 0) -> dict:
+    """
+    生成列式测试数据：类别字段 name（分组时每个分组内类别不重复）、数值字段 v0..vN（第一个为整数，其余为小数），
+    以及分组字段 group
+    """
+    rng = random.Random(seed)
+    categories = max(1, rows // groups) if groups else rows
+    pad = "x" * max(0, width - 8)
+    columns = {"name": [f"c{i % categories:07d}{pad}"[:max(width, 8)] for i in range(rows)]}
+    for k in range(value_keys):
+        if k == 0:
+            columns["v0"] = [rng.randint(0, 100_000) for _ in range(rows)]
+        else:
+            columns[f"v{k}"] = [rng.random() * 1000 for _ in range(rows)]
+    if groups:
+        columns["group"] = [f"g{i // categories % groups}" for i in range(rows)]
+    return columns
+
+
+def build_cases(max_rows: int, charts: list) -> list:
+    """按图表类型的字段要求组合用例：(用例名, 图表类型, 行数, 数据形态)"""
+    cases = []
+    for spec in CHART_TYPES.values():
+        if charts and spec.name not in charts:
+            continue
+        for rows in SIZES:
+            if rows > max_rows:
+                continue
+            for variant, shape in VARIANTS.items():
+                if shape["groups"] and not spec.supports_group:
+                    continue
+                count = shape["value_keys"]
+                if spec.max_value_keys is not None:
+                    count = min(count, spec.max_value_keys)
+                if count < spec.min_value_keys:
+                    count = spec.min_value_keys
+                cases.append((f"{spec.name}/{rows}/{variant}", spec, rows, dict(shape, value_keys=count)))
+    return cases
+
+
+def calibrate() -> float:
+    """
+    运行一段与构建函数相近的纯 Python 负载（格式化字符串、组装字典列表、序列化 JSON），返回最短耗时（毫秒）
+    用例耗时除以该值得到与机器速度无关的归一化耗时
+    """
+    best = None
+    for _ in range(CALIBRATION_REPEAT):
+        start = time.perf_counter()
+        items = [{"name": f"c{i:07d}", "value": i * 0.5, "group": f"g{i % 10}"} for i in range(20_000)]
+        json.dumps({"series": items}, ensure_ascii=False, indent=2)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_case(spec, rows: int, shape: dict) -> dict:
+    """构建图表并计时；重复多次取最短耗时（100 万行的用例只构建一次），计时前回收上一个用例留下的对象"""
+    columns = make_columns(rows, shape["value_keys"], shape["width"], shape["groups"])
+    value_keys = [f"v{k}" for k in range(shape["value_keys"])]
+    options = {"name_key": "name", "value_keys": value_keys}
+    if shape["groups"]:
+        options["group_key"] = "group"
+    if rows >= COMPACT_ROWS:
+        options["compact"] = True
+    builder = spec.load()
+    repeat = 5 if rows <= 1000 else 3 if rows < COMPACT_ROWS else 1
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        output = builder(columns, **options)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return {"ms": round(best, 2), "bytes": len(output.encode("utf-8"))}
+
+
+def compare(name: str, result: dict, baseline: dict, threshold: float) -> list:
+    """与基线对比，返回超出阈值的说明；耗时比较归一化耗时，没有归一化耗时的旧基线只比较输出体积"""
+    problems = []
+    expected = baseline.get(name)
+    if expected is None:
+        return problems
+    units = expected.get("units")
+    if units is not None and max(result["ms"], expected["ms"]) >= MIN_COMPARE_MS \
+            and result["units"] > units * (1 + threshold):
+        problems.append(f"归一化耗时 {result['units']:.2f}，基线 {units:.2f}（本次 {result['ms']:.1f} ms）")
+    if result["bytes"] > expected["bytes"] * (1 + threshold):
+        problems.append(f"输出 {result['bytes']} 字节，基线 {expected['bytes']} 字节")
+    return problems
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="图表构建函数基准测试")
+    parser.add_argument("--max-rows", type=int, default=SIZES[-1], help="最大数据行数")
+    parser.add_argument("--charts", default="", help="只测试这些图表类型，逗号分隔")
+    parser.add_argument("--threshold", type=float, default=0.5, help="允许超出基线的比例")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    args = parser.parse_args(argv)
+
+    charts = [name.strip() for name in args.charts.split(",") if name.strip()]
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    calibration = calibrate()
+    print(f"校准循环耗时 {calibration:.2f} ms，归一化耗时 = 用例耗时 / 校准耗时")
+    results = {}
+    regressions = []
+    print(f"{'用例':<32}{'耗时(ms)':>12}{'归一化':>10}{'基线':>10}{'输出(KB)':>12}{'行/秒':>14}")
+    for name, spec, rows, shape in build_cases(args.max_rows, charts):
+        result = run_case(spec, rows, shape)
+        result["units"] = round(result["ms"] / calibration, 5)
+        problems = compare(name, result, baseline, args.threshold)
+        if problems and not args.update_baseline:
+            # 偶发的调度抖动会让单次计时偏高，超出基线时重测一次，取较短的耗时
+            retry = run_case(spec, rows, shape)
+            if retry["ms"] < result["ms"]:
+                result = dict(retry, units=round(retry["ms"] / calibration, 5))
+                problems = compare(name, result, baseline, args.threshold)
+        results[name] = result
+        expected = baseline.get(name, {}).get("units")
+        rate = rows / result["ms"] * 1000 if result["ms"] else 0
+        print(f"{name:<32}{result['ms']:>12.1f}{result['units']:>10.3f}"
+              f"{f'{expected:.3f}' if expected is not None else '-':>10}"
+              f"{result['bytes'] / 1024:>12.1f}{rate:>14.0f}")
+        if problems:
+            regressions.append((name, problems))
+
+    if args.update_baseline:
+        # 只覆盖本次运行的用例，保留其他用例的基线
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(baseline.items())), f, ensure_ascii=False, indent=2)
+        print(f"已更新基线: {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"\n{len(regressions)} 个用例超出基线 {args.threshold:.0%}：")
+        for name, problems in regressions:
+            print(f"  {name}: {'；'.join(problems)}")
+        return 1
+    print(f"\n全部 {len(results)} 个用例均在基线的 {args.threshold:.0%} 以内")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,108 @@
+# 图表端点的本地测试：用 werkzeug 构造请求直接调用 ChartEndpoint，不需要 Dify 实例
+# 字段不完整的请求会用到大模型时，由返回预先准备回答的假大模型代替
+# 用法: python scripts/endpoint_harness.py [--body 请求.json] [--rows 1000] [--requests 200] [--concurrency 4] [--show]
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scripts.load_test import FakeLLM, percentile, stub_session  # noqa: E402
+
+
+def synthetic_body(rows: int, chart_type: str, explicit: bool = True, seed: int = 0) -> dict:
+    """生成请求体；explicit 为 False 时只给出数据和图表类型，由决策缓存、大模型或自动检测选择字段"""
+    rng = random.Random(seed)
+    data = [{"产品": f"P{i % 50}", "地区": f"R{i % 7}", "销量": rng.randint(0, 1000),
+             "利润": round(rng.random() * 100, 2)} for i in range(rows)]
+    body = {"chart_data": data, "chart_type": chart_type}
+    if explicit:
+        body.update({"name_key": "产品", "value_keys": ["销量"], "chart_title": f"{rows} 行{chart_type}"})
+    return body
+
+
+def make_request(body, token: str = None):
+    from werkzeug import Request
+    from werkzeug.test import EnvironBuilder
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    data = body if isinstance(body, (str, bytes)) else json.dumps(body, ensure_ascii=False)
+    builder = EnvironBuilder(method="POST", path="/chart", data=data, headers=headers,
+                             content_type="application/json")
+    return Request(builder.get_environ())
+
+
+def make_endpoint(llm_response: str, latency_ms: float):
+    from endpoints.chart import ChartEndpoint
+    return ChartEndpoint(stub_session(FakeLLM(llm_response, latency_ms)))
+
+
+def call(body, settings: dict, token: str, llm_response: str, latency_ms: float) -> tuple:
+    """执行一次请求，返回 (状态码, 响应文本, 耗时秒数)；构造请求的时间不计入耗时"""
+    endpoint = make_endpoint(llm_response, latency_ms)
+    request = make_request(body, token)
+    start = time.perf_counter()
+    response = endpoint.invoke(request, {}, settings)
+    elapsed = time.perf_counter() - start
+    return response.status_code, response.get_data(as_text=True), elapsed
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="图表端点本地测试")
+    parser.add_argument("--body", help="请求体 JSON 文件，不指定时使用合成数据")
+    parser.add_argument("--rows", type=int, default=1000, help="合成数据的行数")
+    parser.add_argument("--chart-type", default="柱状图", help="合成请求的图表类型")
+    parser.add_argument("--incomplete", action="store_true", help="合成请求不给出字段，走决策缓存、大模型或自动检测")
+    parser.add_argument("--model", action="store_true", help="字段不完整时在请求中带上 model，使用假大模型选择字段")
+    parser.add_argument("--llm-response", default=json.dumps(
+        {"chart_type": "柱状图", "chart_title": "产品销量", "name_key": "产品", "value_keys": ["销量"],
+         "series_names": ["销量"]}, ensure_ascii=False), help="假大模型返回的文本")
+    parser.add_argument("--llm-latency", type=float, default=0, help="假大模型的延迟（毫秒）")
+    parser.add_argument("--token", default="harness", help="端点设置中的 chart_token（端点要求必须配置），同时用于请求头")
+    parser.add_argument("--requests", type=int, default=50, help="请求次数")
+    parser.add_argument("--concurrency", type=int, default=1, help="并发请求数")
+    parser.add_argument("--show", action="store_true", help="输出第一次请求的响应内容")
+    args = parser.parse_args(argv)
+
+    if args.body:
+        with open(args.body, encoding="utf-8") as f:
+            body = json.load(f)
+    else:
+        body = synthetic_body(args.rows, args.chart_type, not args.incomplete)
+        if args.model:
+            body["model"] = {"provider": "fake", "model": "fake", "mode": "chat", "completion_params": {}}
+    settings = {"chart_token": args.token}
+    # 请求体只序列化一次，重复请求时复用
+    payload = json.dumps(body, ensure_ascii=False)
+
+    status, text, _ = call(payload, settings, args.token, args.llm_response, args.llm_latency)
+    if args.show:
+        print(text if len(text) <= 4000 else text[:4000] + f"...（共 {len(text)} 字符）")
+    if status != 200:
+        print(f"请求失败，状态码 {status}: {text[:500]}")
+        return 1
+
+    def worker(_):
+        return call(payload, settings, args.token, args.llm_response, args.llm_latency)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(worker, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for status, _, _ in results if status != 200)
+    latencies = [seconds * 1000 for _, _, seconds in results]
+    decision = json.loads(text)["decision"]
+    print(f"请求 {len(results)} 次，并发 {args.concurrency}，失败 {failed} 次，耗时 {elapsed:.2f} 秒，"
+          f"吞吐量 {len(results) / elapsed:.1f} 次/秒")
+    print(f"字段来源 {decision['source']}，响应 {len(text.encode('utf-8')) / 1024:.1f} KB")
+    print(f"延迟 平均 {sum(latencies) / len(latencies):.1f} ms，p50 {percentile(latencies, 50):.1f} ms，"
+          f"p95 {percentile(latencies, 95):.1f} ms，p99 {percentile(latencies, 99):.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
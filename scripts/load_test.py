@@ -0,0 +1,245 @@
+# 端到端压测：用桩 session 和模拟延迟的假大模型构造 Json2chartTool，按给定并发重放调用记录，
+# 统计吞吐量以及各阶段（调用大模型之前、大模型、构建、输出）的 p50/p95/p99 延迟，不需要 Dify 实例和真实模型
+# 用法: python scripts/load_test.py [--traces 记录.jsonl] [--requests 200] [--concurrency 8] [--llm-latency 800] [--async]
+# --async 时所有调用在同一个线程的事件循环中进行，用于验证一个工作进程能否同时等待多个大模型调用
+# 调用记录每行一个 JSON：{"tool_parameters": {...}, "llm_response": "大模型返回的文本", "llm_latency_ms": 可选}
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 报告中的阶段，按调用顺序排列
+STAGES = ("prepare", "llm", "build", "output", "total")
+STAGE_LABELS = {
+    "prepare": "调用大模型之前",
+    "llm": "大模型",
+    "build": "构建（首个图表片段之前）",
+    "output": "输出",
+    "total": "合计",
+}
+# 合成调用记录的数据行数与图表类型
+SYNTHETIC_ROWS = (100, 1000, 10_000)
+SYNTHETIC_CHARTS = ("柱状图", "折线图", "饼状图", "散点图")
+
+
+class FakeLLM:
+    """替代 session.model.llm：等待指定延迟后返回预先准备的回答，并记录本次调用的起止时间"""
+
+    def __init__(self, response: str, latency_ms: float, jitter_ms: float = 0, rng: random.Random = None):
+        self.response = response
+        self.latency = max(0.0, latency_ms + (rng or random).uniform(-jitter_ms, jitter_ms)) / 1000
+        self.started = None
+        self.finished = None
+
+    def invoke(self, model_config=None, prompt_messages=None, stream=False, **kwargs):
+        self.started = time.perf_counter()
+        time.sleep(self.latency)
+        self.finished = time.perf_counter()
+        return SimpleNamespace(message=SimpleNamespace(content=self.response))
+
+
+def stub_session(llm: FakeLLM):
+    """只提供工具用到的 session.model.llm"""
+    return SimpleNamespace(model=SimpleNamespace(llm=llm))
+
+
+def make_tool(session):
+    from dify_plugin.entities.tool import ToolRuntime
+    from tools.json2chart import Json2chartTool
+    return Json2chartTool(runtime=ToolRuntime(credentials={}, user_id=None, session_id=None), session=session)
+
+
+def synthetic_traces(seed: int = 0) -> list:
+    """生成不同数据量与图表类型的调用记录，大模型的回答按数据字段预先写好"""
+    rng = random.Random(seed)
+    traces = []
+    for rows in SYNTHETIC_ROWS:
+        data = [{"产品": f"P{i % 50}", "地区": f"R{i % 7}", "销量": rng.randint(0, 1000),
+                 "利润": round(rng.random() * 100, 2)} for i in range(rows)]
+        for chart_type in SYNTHETIC_CHARTS:
+            value_keys = ["销量", "利润"] if chart_type == "散点图" else ["销量"]
+            response = {"chart_type": chart_type, "chart_title": f"{rows} 行{chart_type}", "name_key": "产品",
+                        "value_keys": value_keys, "series_names": value_keys}
+            traces.append({
+                "tool_parameters": {"chart_data": json.dumps(data, ensure_ascii=False), "chart_type": chart_type,
+                                    "model": {"provider": "fake", "model": "fake", "mode": "chat",
+                                              "completion_params": {}}},
+                "llm_response": json.dumps(response, ensure_ascii=False),
+            })
+    return traces
+
+
+def load_traces(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _message_text(message) -> str:
+    """取出文本消息或流式变量消息的内容"""
+    body = getattr(message, "message", None)
+    text = getattr(body, "text", None)
+    if text is None:
+        text = getattr(body, "variable_value", None)
+    return text if isinstance(text, str) else ""
+
+
+def run_invocation(trace: dict, latency_ms: float, jitter_ms: float, rng: random.Random) -> dict:
+    """执行一次调用，按消息到达的时间切分阶段"""
+    llm = FakeLLM(trace["llm_response"], trace.get("llm_latency_ms", latency_ms), jitter_ms, rng)
+    tool = make_tool(stub_session(llm))
+    start = time.perf_counter()
+    first_chart = None
+    failed = False
+    for message in tool._invoke(dict(trace["tool_parameters"])):
+        text = _message_text(message)
+        if first_chart is None and "```echarts" in text:
+            first_chart = time.perf_counter()
+        if text.startswith("生成失败") or text.startswith("自动检测字段也失败"):
+            failed = True
+    return _timings(llm, start, first_chart, time.perf_counter(), failed)
+
+
+async def arun_invocation(trace: dict, latency_ms: float, jitter_ms: float, rng: random.Random) -> dict:
+    """在当前事件循环中执行一次调用，直接迭代工具的异步实现"""
+    llm = FakeLLM(trace["llm_response"], trace.get("llm_latency_ms", latency_ms), jitter_ms, rng)
+    tool = make_tool(stub_session(llm))
+    start = time.perf_counter()
+    first_chart = None
+    failed = False
+    async for message in tool._ainvoke(dict(trace["tool_parameters"])):
+        text = _message_text(message)
+        if first_chart is None and "```echarts" in text:
+            first_chart = time.perf_counter()
+        if text.startswith("生成失败") or text.startswith("自动检测字段也失败"):
+            failed = True
+    return _timings(llm, start, first_chart, time.perf_counter(), failed)
+
+
+def _timings(llm: FakeLLM, start: float, first_chart: float, end: float, failed: bool) -> dict:
+    # 命中决策缓存时不会调用大模型，大模型阶段记为 0
+    llm_start = llm.started if llm.started is not None else start
+    llm_end = llm.finished if llm.finished is not None else llm_start
+    chart_start = first_chart if first_chart is not None else end
+    return {
+        "prepare": llm_start - start,
+        "llm": llm_end - llm_start,
+        "build": chart_start - llm_end,
+        "output": end - chart_start,
+        "total": end - start,
+        "failed": failed or first_chart is None,
+    }
+
+
+async def run_async(traces: list, requests: int, concurrency: int, latency_ms: float, jitter_ms: float) -> list:
+    """同一个事件循环中最多同时进行 concurrency 个调用"""
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(0)
+
+    async def worker(index: int) -> dict:
+        async with semaphore:
+            return await arun_invocation(traces[index % len(traces)], latency_ms, jitter_ms, rng)
+
+    return await asyncio.gather(*(worker(index) for index in range(requests)))
+
+
+def percentile(values: list, q: float) -> float:
+    """最近秩法计算分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(q / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    summary = {
+        "requests": len(results),
+        "failed": sum(1 for result in results if result["failed"]),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0,
+        "stages": {},
+    }
+    for stage in STAGES:
+        values = [result[stage] * 1000 for result in results]
+        summary["stages"][stage] = {
+            "mean_ms": round(sum(values) / len(values), 1) if values else 0,
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+        }
+    return summary
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Json2chartTool 端到端压测")
+    parser.add_argument("--traces", help="调用记录文件（JSON Lines），不指定时使用合成数据")
+    parser.add_argument("--write-traces", help="把合成的调用记录写入该文件后退出，可作为录制记录的模板")
+    parser.add_argument("--requests", type=int, default=100, help="总调用次数，调用记录按顺序循环使用")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发调用数")
+    parser.add_argument("--llm-latency", type=float, default=500, help="假大模型的平均延迟（毫秒）")
+    parser.add_argument("--llm-jitter", type=float, default=100, help="假大模型延迟的随机波动（毫秒）")
+    parser.add_argument("--decision-cache", help="决策缓存文件路径，用于验证缓存命中后的延迟")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="在一个线程的事件循环中并发调用，而不是每个调用占用一个线程")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出统计结果")
+    args = parser.parse_args(argv)
+
+    if args.write_traces:
+        with open(args.write_traces, "w", encoding="utf-8") as f:
+            for trace in synthetic_traces():
+                f.write(json.dumps(trace, ensure_ascii=False) + "\n")
+        print(f"已写入调用记录: {args.write_traces}")
+        return 0
+
+    if args.decision_cache:
+        # 决策缓存在首次使用时按环境变量初始化，需要在导入工具之前设置
+        os.environ["JSON2CHART_DECISION_CACHE"] = args.decision_cache
+    traces = load_traces(args.traces) if args.traces else synthetic_traces()
+    if not traces:
+        print("没有可以重放的调用记录")
+        return 1
+
+    # 每个线程使用独立的随机数生成器，延迟波动可复现
+    local = threading.local()
+
+    def worker(index: int) -> dict:
+        if not hasattr(local, "rng"):
+            local.rng = random.Random(threading.get_ident())
+        return run_invocation(traces[index % len(traces)], args.llm_latency, args.llm_jitter, local.rng)
+
+    # 先执行一次，排除模块导入与首次初始化的耗时
+    run_invocation(traces[0], 0, 0, random.Random(0))
+    start = time.perf_counter()
+    if args.use_async:
+        results = asyncio.run(run_async(traces, args.requests, args.concurrency, args.llm_latency, args.llm_jitter))
+    else:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(worker, range(args.requests)))
+    summary = summarize(results, time.perf_counter() - start)
+    summary["concurrency"] = args.concurrency
+    summary["mode"] = "async" if args.use_async else "threads"
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(f"调用 {summary['requests']} 次，并发 {args.concurrency}（{summary['mode']}），失败 {summary['failed']} 次，"
+              f"耗时 {summary['elapsed_s']} 秒，吞吐量 {summary['throughput_rps']} 次/秒")
+        print(f"{'阶段':<28}{'平均(ms)':>12}{'p50(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}")
+        for stage in STAGES:
+            stats = summary["stages"][stage]
+            print(f"{STAGE_LABELS[stage]:<28}{stats['mean_ms']:>12}{stats['p50_ms']:>12}"
+                  f"{stats['p95_ms']:>12}{stats['p99_ms']:>12}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,58 @@
+# 测量模块的导入耗时与常驻内存，用于对比冷启动开销
+# 用法: python scripts/measure_startup.py [模块名 ...]
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 默认对比：pandas 本身，以及插件数据处理链路用到的模块
+DEFAULT_TARGETS = [
+    "pandas",
+    "utils.ingest,utils.flatten,utils.readers,utils.table,utils.executor",
+]
+
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+for name in sys.argv[1].split(","):
+    __import__(name)
+elapsed = time.perf_counter() - start
+with open("/proc/self/statm") as f:
+    rss_pages = int(f.read().split()[1])
+print(json.dumps({
+    "import_ms": round(elapsed * 1000, 1),
+    "rss_mb": round(rss_pages * resource.getpagesize() / 1024 / 1024, 1),
+    "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+}))
+"""
+
+
+def measure(modules: str, repeat: int = 5) -> dict:
+    """在全新的解释器中导入模块，取多次测量中导入耗时最短的一次"""
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _PROBE, modules], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        if best is None or result["import_ms"] < best["import_ms"]:
+            best = result
+    return best
+
+
+def main(argv: list) -> None:
+    targets = argv or DEFAULT_TARGETS
+    baseline = measure("json")
+    print(f"{'模块':<70}{'导入耗时(ms)':>14}{'RSS(MB)':>10}{'增量RSS(MB)':>14}")
+    for target in targets:
+        try:
+            result = measure(target)
+        except subprocess.CalledProcessError as e:
+            print(f"{target:<70}导入失败: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{target:<70}{result['import_ms']:>14}{result['rss_mb']:>10}{result['rss_mb'] - baseline['rss_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,230 @@
+# 内存剖析：用 tracemalloc 测量代表性输入在各阶段（解析、抽样、读取列、验证、各图表构建、序列化）的
+# 分配峰值与阶段结束后仍保留的内存，标记产生了输入副本的阶段，并与基线对比
+# 用法: python scripts/memory_profile.py [--rows 10000,100000] [--inputs json,csv] [--charts 柱状图] [--update-baseline]
+# 任一阶段的峰值或保留内存超出基线的 (1 + threshold) 倍时以退出码 1 结束
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.registry import CHART_TYPES  # noqa: E402
+
+BASELINE_PATH = os.path.join(ROOT, "scripts", "memory_baseline.json")
+
+# 数据行数
+SIZES = (10_000, 100_000)
+# 输入形式：顶层数组的 JSON 字符串、嵌套对象的 JSON 字符串（需要展开路径）、CSV 文件
+INPUTS = ("json", "nested", "csv")
+# 分组数，只对支持分组的图表使用
+GROUPS = 10
+# 阶段内的临时分配（峰值减去保留）达到输入体积的该比例时，认为阶段复制了一份输入
+COPY_RATIO = 0.8
+# 输入小于该值（字节）时不判断副本，避免小数据误报
+MIN_COPY_BYTES = 256 * 1024
+# 与基线的差值小于该值（字节）时不算回退，避免分配器抖动造成误报
+MIN_COMPARE_BYTES = 64 * 1024
+
+
+def make_records(rows: int, nested: bool, seed: int = 0) -> list:
+    """生成测试数据：类别 name、分组 group、整数 v0 与小数 v1、v2；nested 时数值字段放在 stats 对象中"""
+    rng = random.Random(seed)
+    categories = max(1, rows // GROUPS)
+    records = []
+    for i in range(rows):
+        values = {"v0": rng.randint(0, 100_000), "v1": round(rng.random() * 1000, 3),
+                  "v2": round(rng.gauss(50, 15), 3)}
+        record = {"name": f"c{i % categories:07d}", "group": f"g{i // categories % GROUPS}"}
+        if nested:
+            record["stats"] = values
+        else:
+            record.update(values)
+        records.append(record)
+    return records
+
+
+def make_input(kind: str, rows: int, directory: str) -> tuple:
+    """
+    生成一种输入
+    :return: (chart_data 或 None, 文件路径或 None, 数值字段列表, 输入字节数)
+    """
+    records = make_records(rows, kind == "nested")
+    if kind == "csv":
+        path = os.path.join(directory, f"data_{rows}.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("name,group,v0,v1,v2\n")
+            for record in records:
+                f.write(f"{record['name']},{record['group']},{record['v0']},{record['v1']},{record['v2']}\n")
+        return None, path, ["v0", "v1", "v2"], os.path.getsize(path)
+    text = json.dumps(records, ensure_ascii=False)
+    value_keys = ["stats.v0", "stats.v1", "stats.v2"] if kind == "nested" else ["v0", "v1", "v2"]
+    return text, None, value_keys, sys.getsizeof(text)
+
+
+def measure(function):
+    """执行一个阶段，返回 (结果, 分配峰值, 保留内存)；均相对阶段开始时 tracemalloc 统计的内存"""
+    gc.collect()
+    start = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    result = function()
+    current, peak = tracemalloc.get_traced_memory()
+    return result, max(0, peak - start), current - start
+
+
+def consume(fragments) -> int:
+    """按输出时的方式逐段消费序列化片段，只统计长度，不保留完整字符串"""
+    if isinstance(fragments, str):
+        return len(fragments.encode("utf-8"))
+    return sum(len(fragment.encode("utf-8")) for fragment in fragments)
+
+
+def chart_keys(spec, value_keys: list) -> list:
+    count = len(value_keys)
+    if spec.max_value_keys is not None:
+        count = min(count, spec.max_value_keys)
+    return value_keys[:max(count, spec.min_value_keys)]
+
+
+def profile_input(kind: str, rows: int, charts: list, directory: str) -> dict:
+    """按工具的处理顺序逐个阶段测量，返回 {阶段名: 结果}"""
+    from utils.flatten import flatten_source
+    from utils.ingest import open_json_source
+    from utils.readers import open_file_source
+    from utils.table import has_numeric
+
+    chart_data, path, value_keys, input_bytes = make_input(kind, rows, directory)
+    stages = {}
+
+    def record(stage: str, peak: int, retained: int, source_bytes: int, floor: int = 0):
+        # 阶段中释放了之前的对象时（如序列化完成后释放配置对象）保留内存记为 0
+        retained = max(0, retained)
+        transient = peak - retained
+        stages[stage] = {
+            "peak": peak,
+            "retained": retained,
+            # 临时分配接近输入体积（或 floor），说明阶段中同时存在一份输入的副本（如完整的对象列表或字符串）
+            "copy": source_bytes >= MIN_COPY_BYTES and transient >= max(source_bytes, floor) * COPY_RATIO,
+            "input": source_bytes,
+        }
+
+    source, peak, retained = measure(
+        lambda: flatten_source(open_file_source(path) if path else open_json_source(chart_data)))
+    record("ingest", peak, retained, input_bytes)
+    sample, peak, retained = measure(lambda: source.sample(20))
+    record("sample", peak, retained, input_bytes)
+    keys = ["name", "group"] + value_keys
+    columns, peak, retained = measure(lambda: source.load(keys))
+    record("load", peak, retained, input_bytes)
+    # 验证与构建阶段同样与输入体积比较：类别列按字典编码保存后列数据远小于输入，以列数据为参照时副本标记失去意义
+    _, peak, retained = measure(lambda: [has_numeric(columns[key]) for key in value_keys])
+    record("validate", peak, retained, input_bytes)
+    del sample
+
+    for spec in CHART_TYPES.values():
+        if charts and spec.name not in charts:
+            continue
+        options = {"name_key": "name", "value_keys": chart_keys(spec, value_keys), "chunked": True}
+        if spec.supports_group:
+            options["group_key"] = "group"
+        builder = spec.load()
+        # 构建阶段生成配置对象；序列化阶段按输出方式逐段生成文本，两者分开统计
+        fragments, peak, retained = measure(lambda: builder(columns, **options))
+        # 构建阶段本身就要生成配置对象，临时分配与输入体积和生成的配置对象中较大的一个比较，
+        # 只有排序、分箱等复制了数值的构建函数才会被标记
+        record(f"build/{spec.name}", peak, retained, input_bytes, floor=retained)
+        output_bytes, peak, retained = measure(lambda: consume(fragments))
+        record(f"serialize/{spec.name}", peak, retained, output_bytes)
+        del fragments
+    return stages
+
+
+def compare(name: str, result: dict, baseline: dict, threshold: float) -> list:
+    """与基线对比峰值与保留内存，返回超出阈值的说明"""
+    problems = []
+    expected = baseline.get(name)
+    if expected is None:
+        return problems
+    for field, label in (("peak", "峰值"), ("retained", "保留")):
+        value, base = result[field], expected[field]
+        if value - base >= MIN_COMPARE_BYTES and value > base * (1 + threshold):
+            problems.append(f"{label} {value / 1024:.0f} KB，基线 {base / 1024:.0f} KB")
+    if result["copy"] and not expected.get("copy"):
+        problems.append("新出现输入副本")
+    return problems
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="各阶段内存剖析")
+    parser.add_argument("--rows", default=",".join(str(size) for size in SIZES), help="数据行数，逗号分隔")
+    parser.add_argument("--inputs", default=",".join(INPUTS), help="输入形式，逗号分隔")
+    parser.add_argument("--charts", default="", help="只测试这些图表类型，逗号分隔")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允许超出基线的比例")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出测量结果")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.rows.split(",") if size.strip()]
+    inputs = [kind.strip() for kind in args.inputs.split(",") if kind.strip()]
+    charts = [name.strip() for name in args.charts.split(",") if name.strip()]
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in inputs:
+            for rows in sizes:
+                for stage, result in profile_input(kind, rows, charts, directory).items():
+                    results[f"{kind}/{rows}/{stage}"] = result
+    tracemalloc.stop()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'用例':<40}{'峰值(KB)':>12}{'保留(KB)':>12}{'基线峰值(KB)':>14}{'输入(KB)':>12}  副本")
+    for name, result in results.items():
+        if not args.json:
+            expected = baseline.get(name, {}).get("peak")
+            expected = f"{expected / 1024:.0f}" if expected is not None else "-"
+            print(f"{name:<40}{result['peak'] / 1024:>12.0f}{result['retained'] / 1024:>12.0f}{expected:>14}"
+                  f"{result['input'] / 1024:>12.0f}  {'是' if result['copy'] else ''}")
+        problems = compare(name, result, baseline, args.threshold)
+        if problems:
+            regressions.append((name, problems))
+
+    if args.update_baseline:
+        # 只覆盖本次运行的用例，保留其他用例的基线
+        baseline.update({name: {"peak": result["peak"], "retained": result["retained"], "copy": result["copy"]}
+                         for name, result in results.items()})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(baseline.items())), f, ensure_ascii=False, indent=2)
+        print(f"已更新基线: {args.baseline}")
+        return 0
+
+    copies = [name for name, result in results.items() if result["copy"]]
+    if copies and not args.json:
+        print(f"\n{len(copies)} 个阶段的临时分配达到输入体积的 {COPY_RATIO:.0%}，可能复制了一份输入：")
+        for name in copies:
+            print(f"  {name}")
+    if regressions:
+        print(f"\n{len(regressions)} 个阶段超出基线 {args.threshold:.0%}：")
+        for name, problems in regressions:
+            print(f"  {name}: {'；'.join(problems)}")
+        return 1
+    if not args.json:
+        print(f"\n全部 {len(results)} 个阶段均在基线的 {args.threshold:.0%} 以内")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
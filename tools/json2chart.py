@@ -1,243 +1,282 @@
 #第四版，更智能的图表生成方案
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Any
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
+import asyncio
 import json
-from utils.pie import generate_echarts_pie
-from utils.line import generate_echarts_line
-from utils.bar import generate_echarts_bar
-from utils.radar import generate_echarts_radar
-from utils.funnel import generate_echarts_funnel
-from utils.scatter import generate_echarts_scatter
+import logging
+from itertools import chain
+from utils.executor import build_charts
+from utils.ingest import ChartDataError, open_json_source
+from utils.readers import open_file_source
+from utils.flatten import flatten_source
+from utils.decisions import decision_key, get_decision_cache
+from utils.guardrail import parse_series_budget
+from utils.governor import parse_output_budget
+from utils.memory import MEMORY_POLICIES, MemoryBudgetError, MemoryTracker
+from utils.quantize import parse_precision
+from utils.serialize import iter_chunks
+from utils.trace import start_trace
+from utils.metrics import Invocation
+from utils.pipeline import (split_chart_types, request_decision, parse_decision, auto_decision, needs_name_key,
+                            prefetch_columns, load_chart_data, prepare_jobs)
+from utils.aio import iterate_async, iterate_blocking, run_blocking, submit_blocking
 
+logger = logging.getLogger(__name__)
 
-from dify_plugin.entities.model.llm import LLMModelConfig
-from dify_plugin.entities.model.message import SystemPromptMessage, UserPromptMessage
-import pandas as pd
 
 class Json2chartTool(Tool):
     
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
-        chart_data = tool_parameters.get("chart_data", [])
+        # Dify 以同步生成器调用工具：在进程共享的事件循环中驱动异步实现，当前线程只等待消息
+        yield from iterate_async(self._ainvoke(tool_parameters))
+
+    async def _ainvoke(self, tool_parameters: dict[str, Any]) -> AsyncGenerator[ToolInvokeMessage]:
+        """
+        异步实现：等待大模型时不占用事件循环，同一个事件循环中可以同时进行多个调用
+        调用结束时（包括提前返回）把阶段耗时、输出体积、内存峰值等记入进程级指标，由 /metrics 端点输出
+        """
+        invocation = Invocation()
+        try:
+            async for message in self._agenerate(tool_parameters, invocation):
+                yield message
+        finally:
+            invocation.finish()
+
+    async def _agenerate(self, tool_parameters: dict[str, Any], invocation: Invocation) -> AsyncGenerator[ToolInvokeMessage]:
+        chart_data = tool_parameters.get("chart_data")
+        chart_file = tool_parameters.get("chart_file")
         chart_title = tool_parameters.get("chart_title")
         chart_type = tool_parameters.get("chart_type")
+        # 用户可以用逗号等分隔符一次指定多个图表类型，此时对同一份数据分别生成多个图表
+        requested_chart_types = split_chart_types(chart_type)
         model = tool_parameters.get("model")
         saturation = tool_parameters.get("saturation", 0.5)
         brightness = tool_parameters.get("brightness", 0.95)
+        # 横轴为日期时间字段时的时间粒度与聚合方式（折线图、柱状图）
+        time_bucket = tool_parameters.get("time_bucket") or "auto"
+        time_agg = tool_parameters.get("time_agg") or "mean"
+        # 分组图表的系列数上限，以及超出上限时的处理方式（合并为"其他"、改用热力图或拒绝）
+        series_budget = tool_parameters.get("series_budget")
+        series_overflow = tool_parameters.get("series_overflow") or "fold"
+        # 预计内存峰值超过插件内存上限时的处理方式（抽样、按类别汇总或拒绝），以及是否在结果中附上内存报告
+        memory_policy = tool_parameters.get("memory_policy") or "sample"
+        memory_report = bool(tool_parameters.get("memory_report"))
+        memory = MemoryTracker()
+        # 开启 debug_trace 时记录各阶段耗时，并在结果中附上 JSON 格式的耗时汇总
+        debug_trace = bool(tool_parameters.get("debug_trace"))
+        trace = start_trace(debug_trace or invocation.enabled)
+        invocation.trace = trace
+        invocation.memory = memory
+        # 单个图表配置的输出体积上限（KB），超出时自动压缩、降低精度、抽样或合并类别
+        output_budget = tool_parameters.get("output_budget")
+        # 输出方式：text 为分段的 Markdown 文本消息，variable 为流式变量 echarts（SDK 不支持时退回文本）
+        output_mode = tool_parameters.get("output_mode") or "text"
+        # 数值精度：auto（按每个系列的取值范围）、小数位数（如 2）或有效数字（如 4s），off 为保留原始数值
+        precision = tool_parameters.get("precision") or "auto"
+        try:
+            parse_precision(precision)
+            series_budget = parse_series_budget(series_budget)
+            output_budget = parse_output_budget(output_budget)
+        except ValueError as e:
+            yield self.create_text_message(str(e))
+            return
+        if memory_policy not in MEMORY_POLICIES:
+            yield self.create_text_message(f"不支持的内存处理方式: {memory_policy}，可选值为 {', '.join(MEMORY_POLICIES)}")
+            return
+        # 两种数据输入都没有时直接说明，不再抽取空样本和调用大模型
+        if not chart_file and (chart_data is None or isinstance(chart_data, str) and not chart_data.strip()):
+            yield self.create_text_message("缺少图表数据：请填写 chart_data（JSON 数据）或上传 chart_file（数据文件）")
+            return
         
-        # 检查 chart_data 是否为字符串，若是则尝试解析为 JSON
-        if isinstance(chart_data, str):
-            try:
-                chart_data = json.loads(chart_data)
-            except json.JSONDecodeError:
-                yield self.create_text_message("图表数据不是有效的 JSON 格式")
+        # chart_data 为顶层数组的 JSON 字符串时按元素流式解析：先读样本给大模型判断字段，
+        # 再只读取图表需要的列，避免同时持有原始字符串、完整的对象列表和 DataFrame 多份数据
+        # 上传了数据文件（CSV、NDJSON、Arrow、Parquet 等）时优先使用文件，同样只读取需要的列
+        # 嵌套对象按 父字段.子字段 路径展开，对象数组展开为多行，且只计算被选中的路径
+        try:
+            with trace.span("sample"):
+                source = open_file_source(chart_file) if chart_file else open_json_source(chart_data)
+                source = flatten_source(source)
+                # 提取数据样本时，优先使用去重后的数据，确保展示所有类型
+                sample_records = source.sample(20)
+            memory.mark("读取样本")
+            if not any(sample_records):
+                yield self.create_text_message("图表数据为空：chart_data 或 chart_file 中没有包含字段的数据行")
                 return
+        except ChartDataError as e:
+            yield self.create_text_message(str(e))
+            return
 
         try:
-            df = pd.DataFrame(chart_data)
-            data_list = df.to_dict(orient='records')  # 将 DataFrame 转换为列表
-
-            # 提取数据样本时，优先使用去重后的数据，确保展示所有类型
-            unique_df = df.drop_duplicates()
-            if len(unique_df) > 20:
-                sample_df = unique_df.head(20)
-            else:
-                sample_df = unique_df
-            # 转换为类似 Markdown 格式，设置 index=False 避免输出索引列
-            sample_data = sample_df.to_csv(sep='|', na_rep='nan', index=False)
-            sample_markdown = '|' + sample_data.replace('\n', '\n|')
-
-            # 调用大模型生成配置参数
+            # 设置了决策缓存时，同样字段结构和参数的数据直接复用之前的字段选择，不再调用大模型
+            cache_key = None
+            cached_decision = None
+            decision_cache = get_decision_cache()
+            # 字段选择通过了字段检查（decided），以及成功生成的图表数（built），决定调用结束后是否缓存
+            decision = None
+            decided = False
+            built = 0
+            if decision_cache.enabled:
+                columns = list(dict.fromkeys(key for item in sample_records for key in item))
+                cache_key = decision_key(columns, chart_type, chart_title, model)
+                cached_decision = decision_cache.get(cache_key)
+
+            # 调用大模型生成配置参数；字段少的窄数据在等待期间由另一个线程预读全部字段，大模型返回后直接取用
+            llm_span = trace.span("llm", cached=cached_decision is not None).start()
+            prefetch = None
+            if cached_decision is None:
+                invocation.llm_call()
+                prefetch = submit_blocking(prefetch_columns, source, sample_records, memory, trace)
             try:
-                response = self.session.model.llm.invoke(
-                    model_config=LLMModelConfig(
-                        provider=model.get('provider'),
-                        model=model.get('model'),
-                        mode=model.get('mode'),
-                        completion_params=model.get('completion_params'),
-                    ),
-                    prompt_messages=[
-                        SystemPromptMessage(
-                            content="""
-                            你是一个专业的数据可视化专家，需要根据给定的 Markdown 表格数据，判断合适的横坐标和纵坐标，用于生成可视化图表。请遵循以下规则：
-                            1. 输出格式必须为 JSON，包含`chart_type`, `chart_title`, `name_key`, `value_keys`, `series_names` 字段。
-                            2. `chart_type` 的值为字符串，代表图表类型，目前支持"柱状图"、"折线图"、"饼状图"、"雷达图"、"漏斗图"、"散点图"。若用户指定了图表类型，则按用户的来，若没有指定，则你根据表格样例信息自动判断。
-                            3. `chart_title` 的值为字符串，代表图表标题，若用户指定了标题，则按用户的来，若没有指定，则你根据表格样例信息自动生成。
-                            4. `name_key` 的值为一个字符串，代表横坐标的 key，必须为 Markdown 表格中已有的表头字段，且应为类别型数据。
-                            5. `value_keys` 的值为一个字符串数组，代表纵坐标的 key，这些 key 必须为 Markdown 表格中已有的表头字段，且必须为数值类型数据。
-                            6. `series_names` 的值为一个字符串数组，是 `value_keys` 对应 key 的中文翻译，与 `value_keys` 数组元素一一对应。
-                            7. `group_key` 的值为一个字符串（可选），代表用于分组的字段名。当数据需要按某个维度分组展示多系列图表时使用，如课程号、产品类别等。
-                            8. 请根据 markdown 表格数据内容，抓取对数据分析有展现价值的 key。
-                            9. 确保横纵坐标的选取有数据分析意义，避免选取序号等无分析价值的字段。
-                            10. 雷达图适合多维度对比分析，至少需要3个数值字段；散点图适合两个数值指标间的相关性分析，必须选择两个数值字段作为value_keys，name_key应选择类别型或ID型字段（不是数值字段）；漏斗图适合流程转化率分析，需要有明确的先后顺序。
-                            11. 饼图通常只使用一个数值字段和一个类别字段；柱状图和折线图适合展示类别与数值的关系。
-                            12. 当数据中存在明显的分组维度（如多个课程、多个产品等）且需要比较它们在同一指标上的差异时，应识别出合适的`group_key`，group_key应是类别型字段。
-                            13. 对于散点图，当需要按类别区分不同数据点时，应将类别型字段设置为group_key，而不是name_key。
-                            14. 请仔细识别数据类型，确保value_keys只包含可以进行数学运算的数值字段，避免选择文本或混合类型字段。
-                            15. 只输出标准的 json 格式内容，不要包含```json```标签，不要输出其他任何文字。
-                            
-                            示例：
-                            表格数据：
-                            |产品|销量|利润|
-                            |---|---|---|
-                            |A|100|20|
-                            |B|200|50|
-                            |C|150|30|
-                            
-                            柱状图输出：
-                            {"chart_type":"柱状图","chart_title":"产品销量与利润分析","name_key":"产品","value_keys":["销量","利润"],"series_names":["销量","利润"]}
-                            
-                            饼图输出：
-                            {"chart_type":"饼状图","chart_title":"产品销量分布","name_key":"产品","value_keys":["销量"],"series_names":["销量"]}
-                            
-                            带分组的折线图输出（例如课程成绩数据）：
-                            {"chart_type":"折线图","chart_title":"各课程成绩对比","name_key":"score_month","value_keys":["score"],"series_names":["成绩"],"group_key":"course_no"}
-                            
-                            散点图输出（例如产品价格与销量关系分析）：
-                            {"chart_type":"散点图","chart_title":"产品价格与销量关系分析","name_key":"产品名称","value_keys":["价格(元)","月销量(台)"],"series_names":["价格(元)","月销量(台)"],"group_key":"品牌"}
-                            """
-                        ),
-                        UserPromptMessage(
-                            content=f"用户指定的类型：{chart_type}\n用户指定的标题：{chart_title}\n表格的样例数据:\n{sample_markdown}"
-                        )
-                    ],
-                    stream=False
-                )
+                response = None if cached_decision is not None else await run_blocking(request_decision, self.session.model.llm, model, chart_type, chart_title, sample_records)
+                llm_span.end()
             except Exception as e:
+                llm_span.end(error=type(e).__name__)
+                invocation.llm_failure("error")
+                # 线程中的预读无法中断：等它结束再返回（只预读窄数据，读取量有上限），不让读取在调用结束后继续占用内存
+                if prefetch is not None:
+                    await asyncio.wait([prefetch])
                 yield self.create_text_message(f"调用大模型生成配置失败: {str(e)}")
                 return
 
+            prefetched = await prefetch if prefetch is not None else None
+
             # 提取大模型返回的 JSON 数据
             try:
-                print("大模型输出的json:", response.message.content)
-                config_params = json.loads(response.message.content)
-                required_fields = ["chart_type", "chart_title", "name_key", "value_keys", "series_names"]
-                for field in required_fields:
-                    if field not in config_params:
-                        raise ValueError(f"大模型返回的 JSON 缺少必要字段: {field}")
-
-                chart_type = config_params["chart_type"]
-                chart_title = config_params["chart_title"]
-                name_key = config_params["name_key"]
-                value_keys = config_params["value_keys"]
-                series_names = config_params["series_names"]
-                # group_key是可选的
-                group_key = config_params.get("group_key")
-
-                if len(value_keys) != len(series_names):
-                    raise ValueError("value_keys 和 series_names 的长度不一致")
-
-                if name_key not in df.columns:
-                    raise ValueError(f"name_key {name_key} 不存在于 DataFrame 中")
+                if response is None:
+                    decision = parse_decision(cached_decision)
+                else:
+                    logger.debug("大模型输出的json: %s", response)
+                    decision = parse_decision(response)
+                chart_type = decision["chart_type"]
+                chart_title = decision["chart_title"]
+                name_key = decision["name_key"]
+                value_keys = decision["value_keys"]
+
+                chart_types = requested_chart_types if len(requested_chart_types) > 1 else [chart_type]
+                data_list, memory_notice = await run_blocking(load_chart_data, source, sample_records, chart_types, decision, memory_policy, memory, trace, prefetched)
+                if memory_notice:
+                    invocation.fallback(f"memory_{memory_policy}")
+                    yield self.create_text_message(memory_notice)
+
+                if name_key not in data_list and needs_name_key(chart_types):
+                    raise ValueError(f"name_key {name_key} 不存在于数据中")
 
                 for value_key in value_keys:
-                    if value_key not in df.columns:
-                        yield self.create_text_message(f"value_key {value_key} 不存在于 DataFrame 中")
+                    if value_key not in data_list:
+                        yield self.create_text_message(f"value_key {value_key} 不存在于数据中")
                         return
 
+                decided = True
+
+            except ChartDataError as e:
+                if isinstance(e, MemoryBudgetError):
+                    # 内存处理方式为拒绝生成
+                    invocation.status = "rejected"
+                yield self.create_text_message(str(e))
+                memory.log()
+                return
             except json.JSONDecodeError:
+                invocation.llm_failure("invalid_json")
                 yield self.create_text_message(f"大模型返回的内容不是有效的 JSON 格式")
                 return
             except Exception as e:
-                # 当大模型配置无效时，尝试使用auto_detect_keys作为后备方案
+                # 当大模型配置无效时，尝试使用自动检测字段作为后备方案
+                if response is not None:
+                    invocation.llm_failure("invalid_config")
+                invocation.fallback("auto_detect")
                 yield self.create_text_message(f"大模型配置验证失败: {str(e)}")
-                # 导入auto_detect_keys函数
-                from utils.chart import auto_detect_keys
                 try:
                     yield self.create_text_message("正在尝试使用自动检测字段作为后备方案...")
-                    # 自动检测合适的字段
-                    detected_name_key, detected_value_keys = auto_detect_keys(data_list)
-                    
-                    # 根据检测到的字段自动选择图表类型
-                    if chart_type is None:
-                        if len(detected_value_keys) >= 3:
-                            chart_type = "雷达图"
-                        elif len(detected_value_keys) == 2:
-                            chart_type = "散点图"
-                        else:
-                            chart_type = "柱状图"
-                    
-                    # 设置默认的series_names
-                    detected_series_names = detected_value_keys
-                    
-                    yield self.create_text_message(f"自动检测结果: 图表类型={chart_type}, 类别字段={detected_name_key}, 数值字段={detected_value_keys}")
-                    
-                    # 使用检测到的字段继续处理
-                    name_key = detected_name_key
-                    value_keys = detected_value_keys
-                    series_names = detected_series_names
-                    group_key = None  # 自动检测模式下暂不支持group_key
-                    
-                    # 重新设置图表标题（如果未指定）
-                    if chart_title is None:
-                        chart_title = f"{name_key} 数据分析图表"
+                    decision = auto_decision(sample_records, chart_type, chart_title)
+                    chart_type = decision["chart_type"]
+                    yield self.create_text_message(f"自动检测结果: 图表类型={chart_type}, 类别字段={decision['name_key']}, 数值字段={decision['value_keys']}")
+
+                    chart_types = requested_chart_types if len(requested_chart_types) > 1 else [chart_type]
+                    data_list, memory_notice = await run_blocking(load_chart_data, source, sample_records, chart_types, decision, memory_policy, memory, trace, prefetched, fallback=True)
+                    if memory_notice:
+                        invocation.fallback(f"memory_{memory_policy}")
+                        yield self.create_text_message(memory_notice)
                 except Exception as fallback_error:
                     yield self.create_text_message(f"自动检测字段也失败: {str(fallback_error)}")
                     return
 
+            # 只保留图表用到的列，释放预读的其他字段
+            prefetched = None
+
             # 根据图表类型验证配置参数
             try:
-                # 验证数据类型是否适合所选图表
-                if chart_type == "散点图":
-                    # 检查name_key是否是数值字段且value_keys只有一个元素
-                    if len(value_keys) == 1 and name_key in df.columns:
-                        try:
-                            # 尝试将name_key转换为数值类型，检查是否为有效数值
-                            df[name_key] = pd.to_numeric(df[name_key], errors='coerce')
-                            if not df[name_key].isna().all():
-                                # 如果name_key是数值字段，将其也加入value_keys
-                                yield self.create_text_message(f"检测到name_key '{name_key}' 是数值字段，已自动将其作为第二个数值轴")
-                                value_keys = [name_key] + value_keys
-                                series_names = [name_key] + series_names
-                        except:
-                            pass
-                    
-                    # 如果最终还是少于两个数值字段，使用scatter.py中的自动补充逻辑
-                    if len(value_keys) < 1:
-                        raise ValueError("散点图需要至少一个数值字段")
-                elif chart_type == "雷达图" and len(value_keys) < 3:
-                    raise ValueError("雷达图需要至少三个数值字段进行多维度分析")
-                elif chart_type == "饼状图" and len(value_keys) != 1:
-                    # 饼图只使用第一个数值字段
-                    yield self.create_text_message("饼图只支持一个数值字段，将使用第一个字段")
-                    value_keys = value_keys[:1]
-                    series_names = series_names[:1]
-                
-                # 验证字段是否为数值类型
-                for value_key in value_keys:
-                    try:
-                        # 尝试将数据转换为数值类型，验证是否为有效数值
-                        df[value_key] = pd.to_numeric(df[value_key], errors='coerce')
-                        # 检查是否有值被转换为NaN
-                        if df[value_key].isna().all():
-                            raise ValueError(f"字段 {value_key} 无法转换为数值类型")
-                    except Exception as e:
-                        raise ValueError(f"字段 {value_key} 不是有效的数值类型: {str(e)}")
-                
-                # 根据图表类型生成 ECharts 配置
-                supported_chart_types = ["饼状图", "柱状图", "折线图", "雷达图", "漏斗图", "散点图"]
-                if chart_type not in supported_chart_types:
-                    yield self.create_text_message(f"不支持的图表类型: {chart_type}")
-                    return
+                jobs = []
+                options = {
+                    "saturation": saturation,
+                    "brightness": brightness,
+                    "time_bucket": time_bucket,
+                    "time_agg": time_agg,
+                    "precision": precision,
+                    "series_budget": series_budget,
+                    "series_overflow": series_overflow,
+                    "output_budget": output_budget,
+                }
+                # 读取数据、估算输出体积、构建和序列化都在线程池中执行，不阻塞共享事件循环中的其他调用
+                async for kind, payload in iterate_blocking(prepare_jobs(chart_types, data_list, decision, options, trace)):
+                    if kind == "job":
+                        jobs.append(payload)
+                        continue
+                    yield self.create_text_message(payload)
+                    if kind == "unsupported":
+                        return
+                    if kind != "message":
+                        # 系列上限或输出体积上限触发的缩减
+                        invocation.fallback(kind)
+                memory.mark("准备图表")
 
-                if chart_type == "饼状图":
-                    echarts_config = generate_echarts_pie(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness)
-                elif chart_type == "柱状图":
-                    echarts_config = generate_echarts_bar(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness, group_key=group_key)
-                elif chart_type == "折线图":
-                    echarts_config = generate_echarts_line(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness, group_key=group_key)
-                elif chart_type == "雷达图":
-                    echarts_config = generate_echarts_radar(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness, group_key=group_key)
-                elif chart_type == "漏斗图":
-                    echarts_config = generate_echarts_funnel(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness)
-                elif chart_type == "散点图":
-                    echarts_config = generate_echarts_scatter(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness, group_key=group_key)
-
-                yield self.create_text_message(f"\n```echarts\n{echarts_config}\n```")
+                # 多个图表时，数据量大的图表会分发到进程池并行构建
+                # 当前进程构建的图表返回文本片段的生成器，边序列化边输出，不在内存中保留完整的配置字符串
+                with trace.span("build", charts=len(jobs)):
+                    results = await run_blocking(build_charts, jobs, chunked=True)
+                # 序列化在输出时逐段进行，耗时计入 output
+                with trace.span("output"):
+                    for job, (echarts_config, error) in zip(jobs, results):
+                        invocation.chart(job["chart_type"], error is None)
+                        if error is not None:
+                            yield self.create_text_message(f"生成失败！错误信息: {str(error)}")
+                            continue
+                        built += 1
+                        if output_mode == "variable" and hasattr(self, "create_stream_variable_message"):
+                            # 以流式变量 echarts 输出原始配置，多个图表之间用换行分隔
+                            async for chunk in iterate_blocking(iter_chunks(echarts_config)):
+                                invocation.output(chunk)
+                                yield self.create_stream_variable_message("echarts", chunk)
+                            yield self.create_stream_variable_message("echarts", "\n")
+                        else:
+                            if output_mode == "variable":
+                                invocation.fallback("text_output")
+                            # 配置较大时分成多条文本消息依次输出，拼接后与一次输出的内容相同
+                            async for chunk in iterate_blocking(iter_chunks(chain(("\n```echarts\n",), iter_chunks(echarts_config), ("\n```",)))):
+                                invocation.output(chunk)
+                                yield self.create_text_message(chunk)
+                # 没有生成任何图表任务时（如分组超过系列上限且处理方式为拒绝）记为 rejected，不计入成功
+                invocation.status = "ok" if built else "rejected" if not jobs else "error"
+                memory.mark("输出图表")
 
             except Exception as e:
                 yield self.create_text_message(f"生成失败！错误信息: {str(e)}")
         except Exception as e:
-            yield self.create_text_message(f"生成失败！错误信息: {str(e)}")
\ No newline at end of file
+            yield self.create_text_message(f"生成失败！错误信息: {str(e)}")
+        except GeneratorExit:
+            # 调用方提前停止读取，不能说明字段选择有问题，不更新缓存
+            cache_key = None
+            raise
+        finally:
+            # 大模型的字段选择至少生成了一个图表才写入缓存；缓存的字段选择没能生成任何图表时移出缓存
+            if cache_key is not None:
+                decision_cache.settle(cache_key, decision, decided and built > 0, cached_decision is not None)
+
+        # 每次调用的预估与实际内存峰值写入插件日志，需要时也附在结果中
+        memory.log()
+        if memory_report:
+            yield self.create_text_message(memory.report())
+        if debug_trace:
+            yield self.create_json_message(trace.summary(invocation.status))
\ No newline at end of file
@@ -0,0 +1,79 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+
+# 执行阻塞调用（等待大模型、读取数据）的线程数，也就是一个进程中可以同时等待大模型的调用数
+BLOCKING_THREADS = int(os.getenv("JSON2CHART_BLOCKING_THREADS", "64"))
+
+_executor = None
+_executor_lock = Lock()
+_loop = None
+_loop_pid = None
+_loop_lock = Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """进程内共享的线程池，所有事件循环共用"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix="json2chart")
+    return _executor
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    进程内共享的事件循环，在专用的守护线程中一直运行，所有同步调用方都把协程提交到这里
+    不在调用方线程中新建并运行事件循环：调用方线程已有运行中的事件循环时（例如 gevent 或异步框架中）会报错
+    fork 出的子进程中没有运行该循环的线程，按进程号重新创建
+    """
+    global _loop, _loop_pid
+    if _loop is None or _loop_pid != os.getpid():
+        with _loop_lock:
+            if _loop is None or _loop_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                Thread(target=loop.run_forever, name="json2chart-loop", daemon=True).start()
+                _loop, _loop_pid = loop, os.getpid()
+    return _loop
+
+
+def submit_blocking(function, *args, **kwargs) -> asyncio.Future:
+    """在线程池中开始执行阻塞调用，返回可以稍后 await 的 Future，调用方可以同时做其他工作"""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(get_executor(), functools.partial(function, *args, **kwargs))
+
+
+async def run_blocking(function, *args, **kwargs):
+    """在线程池中执行阻塞调用并等待结果，不阻塞事件循环中的其他调用"""
+    return await submit_blocking(function, *args, **kwargs)
+
+
+async def iterate_blocking(iterator):
+    """在线程池中逐条取出同步迭代器的元素（例如边序列化边输出的文本片段），不阻塞事件循环中的其他调用"""
+    iterator = iter(iterator)
+    done = object()
+    while True:
+        item = await run_blocking(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def iterate_async(agen):
+    """
+    把异步生成器适配为同步生成器：在共享事件循环中逐条取出消息，当前线程只等待结果
+    调用方提前停止迭代时关闭异步生成器（包括其中嵌套的异步生成器），使其中的 finally 照常执行
+    """
+    loop = get_loop()
+    try:
+        while True:
+            try:
+                item = asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
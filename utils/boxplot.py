@@ -0,0 +1,140 @@
+from utils.chart import generate_colors
+from utils.columns import as_columns, column_length
+from utils.quantize import make_quantizer
+from utils.serialize import dumps_config
+from utils.distribution import split_by_group, box_summary
+from utils.table import has_numeric
+
+def generate_echarts_boxplot(
+    data_list,
+    name_key: str = None,
+    value_keys: list = None,
+    title: str = None,
+    series_names: list = None,
+    saturation=0.5,  # 新增饱和度参数
+    brightness=0.95,  # 新增亮度参数
+    group_key=None,  # 新增分组参数
+    precision=None,  # 数值精度：auto、小数位数（如 2）或有效数字（如 4s），为空时保留原始数值
+    compact=False,  # 为 True 时输出不带缩进的紧凑 JSON
+    chunked=False  # 为 True 时返回 JSON 文本片段的生成器，用于分段输出
+) -> str:
+    """
+    生成 ECharts 箱线图配置：在服务端计算分位数，每个箱只输出五个统计量和少量异常值
+    不分组时每个数值字段一个箱；有 group_key 时横轴为分组，每个数值字段一个系列
+    """
+    if not data_list:
+        raise ValueError("数据列表不能为空")
+    # 统一转换为列式数据 {字段名: 值列表}，data_list 也可以直接传入列式数据
+    columns = as_columns(data_list)
+    if not column_length(columns):
+        raise ValueError("数据列表不能为空")
+
+    if not value_keys:
+        value_keys = [key for key, values in columns.items() if key != group_key and has_numeric(values)]
+        if not value_keys:
+            raise ValueError("数据中不包含数值类型的字段，无法生成箱线图")
+
+    if series_names is None:
+        series_names = list(value_keys)
+
+    # 验证字段存在
+    for field in list(value_keys) + ([group_key] if group_key else []):
+        if field not in columns:
+            raise KeyError(f"数据中未找到字段: '{field}'")
+
+    # 自动生成标题
+    if not title:
+        title = f"{', '.join(value_keys)}分布箱线图" if not group_key else f"不同{group_key}的{', '.join(value_keys)}分布箱线图"
+
+    names = [series_names[i] if i < len(series_names) else value_key for i, value_key in enumerate(value_keys)]
+    series = []
+    if group_key:
+        # 横轴为分组，每个数值字段一个箱线系列；横轴取所有数值字段中出现过的分组，某个字段在该分组没有数值时输出空箱
+        color_list = generate_colors(len(value_keys), saturation=saturation, brightness=brightness)
+        grouped_by_key = [split_by_group(columns, value_key, group_key) for value_key in value_keys]
+        categories = sorted({group for grouped in grouped_by_key for group in grouped}, key=str)
+        for i, grouped in enumerate(grouped_by_key):
+            summaries = [box_summary(grouped.get(group, [])) for group in categories]
+            series.append((names[i], color_list[i], summaries))
+        categories = [str(group) for group in categories]
+    else:
+        # 横轴为数值字段，所有箱在同一个系列中
+        categories = names
+        color_list = generate_colors(1, saturation=saturation, brightness=brightness)
+        summaries = [box_summary(split_by_group(columns, value_key)[None]) for value_key in value_keys]
+        series.append(("分布", color_list[0], summaries))
+
+    config = {
+        "animation": True,
+        "animationDuration": 1000,
+        "title": {"text": title, "left": "center"},
+        "tooltip": {
+            "trigger": "item",
+            "backgroundColor": 'rgba(50,50,50,0.9)',
+            "textStyle": {
+                "color": '#fff'
+            },
+            "borderColor": '#333',
+            "borderWidth": 1
+        },
+        "legend": {
+            "left": "center",
+            "bottom": "0%",
+            "textStyle": {
+                "fontSize": 12
+            }
+        },
+        "xAxis": {
+            "type": "category",
+            "data": categories,
+            "boundaryGap": True,
+            "splitLine": {
+                "show": False
+            }
+        },
+        "yAxis": {
+            "type": "value",
+            "scale": True,
+            "splitLine": {
+                "show": True,
+                "lineStyle": {
+                    "color": ['#eee'],
+                    "type": 'dashed'
+                }
+            }
+        },
+        "series": []
+    }
+
+    legend_data = []
+    for name, color, summaries in series:
+        # 分位数按系列统一处理精度，auto 模式下按该系列统计量的取值范围计算小数位数
+        quantize = make_quantizer([value for box, values in summaries for value in (box or []) + values], precision)
+        if quantize is not None:
+            summaries = [([quantize(value) for value in box] if box is not None else None, [quantize(value) for value in values])
+                         for box, values in summaries]
+        config["series"].append({
+            "name": name,
+            "type": "boxplot",
+            # 没有数值的分组输出空箱
+            "data": [box if box is not None else [] for box, _ in summaries],
+            "itemStyle": {
+                "color": "#fff",
+                "borderColor": color,
+                "borderWidth": 2
+            }
+        })
+        outliers = [[index, value] for index, (_, values) in enumerate(summaries) for value in values]
+        if outliers:
+            config["series"].append({
+                "name": name,
+                "type": "scatter",
+                "data": outliers,
+                "itemStyle": {
+                    "color": color
+                }
+            })
+        legend_data.append(name)
+    config["legend"]["data"] = legend_data
+
+    return dumps_config(config, compact, chunked)
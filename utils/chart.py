@@ -1,13 +1,16 @@
 import colorsys
+from functools import lru_cache
 
+from utils.columns import is_columns, first_row
 
-def auto_detect_keys(data_list: list) -> tuple:
-    """自动检测数据中的名称字段和值字段"""
+
+def auto_detect_keys(data_list) -> tuple:
+    """自动检测数据中的名称字段和值字段，data_list 可以是记录列表或列式数据"""
     if not data_list:
         raise ValueError("数据列表不能为空")
     
     # 获取第一个数据项的键值对
-    sample = data_list[0]
+    sample = first_row(data_list) if is_columns(data_list) else data_list[0]
     
     # 候选名称字段（字符串类型）
     name_candidates = [k for k, v in sample.items() if isinstance(v, str)]
@@ -41,10 +44,16 @@ def generate_colors(num_colors, saturation=0.5, brightness=0.7):
     :param brightness: 颜色的亮度，默认值为 0.95
     :return: 颜色列表
     """
+    # 同样参数的调色板只计算一次，返回副本避免调用方修改缓存
+    return list(_palette(num_colors, saturation, brightness))
+
+
+@lru_cache(maxsize=256)
+def _palette(num_colors, saturation, brightness) -> tuple:
     colors = []
     for i in range(num_colors):
         hue = i / num_colors
         # 使用用户传入的饱和度和亮度生成颜色
         rgb = colorsys.hsv_to_rgb(hue, saturation, brightness)
         colors.append('#%02x%02x%02x' % tuple(int(c * 255) for c in rgb))
-    return colors
\ No newline at end of file
+    return tuple(colors)
\ No newline at end of file
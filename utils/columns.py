@@ -0,0 +1,183 @@
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+
+# 字典编码的类别列超过该类别数、且超过一半的行取值各不相同时退回普通列表（字典反而比逐行保存更占内存）
+MAX_CATEGORIES = 1 << 16
+
+
+class CategoryColumn(Sequence):
+    """
+    字典编码的类别列：每行只保存类别编码（array('I')），每个不同的字符串只保存一次
+    与列表一样可以取下标、切片和迭代，构建函数不需要区分；去重、计数、分组直接在整数编码上进行
+    只保存字符串和空值，其他类型的值由 ColumnBuffer 退回普通列表
+    """
+
+    __slots__ = ("codes", "categories", "complete")
+
+    def __init__(self, codes: array = None, categories: list = None, complete: bool = True):
+        self.codes = codes if codes is not None else array('I')
+        self.categories = categories if categories is not None else []
+        # 为 True 时每个类别都至少出现一次（切片、抽行之后不一定成立）
+        self.complete = complete
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CategoryColumn(self.codes[index], self.categories, False)
+        return self.categories[self.codes[index]]
+
+    def __iter__(self):
+        return map(self.categories.__getitem__, self.codes)
+
+    def __repr__(self):
+        return f"CategoryColumn({len(self.codes)} 行, {len(self.categories)} 个类别)"
+
+    def take(self, rows) -> "CategoryColumn":
+        """按行号取出若干行，共用类别表"""
+        codes = self.codes
+        return CategoryColumn(array('I', [codes[row] for row in rows]), self.categories, False)
+
+    def used_codes(self):
+        return range(len(self.categories)) if self.complete else set(self.codes)
+
+    def distinct(self) -> list:
+        categories = self.categories
+        return list(categories) if self.complete else [categories[code] for code in set(self.codes)]
+
+    def value_counts(self) -> Counter:
+        categories = self.categories
+        return Counter({categories[code]: count for code, count in Counter(self.codes).items()})
+
+
+def is_columns(data) -> bool:
+    """判断数据是否为列式数据 {字段名: 值列表}"""
+    return isinstance(data, dict) and all(not isinstance(v, (str, bytes, dict)) and hasattr(v, '__len__') for v in data.values())
+
+
+def records_to_columns(records: list, keys: list = None) -> dict:
+    """把记录列表转换为列式数据，keys 为空时保留所有出现过的字段（按首次出现的顺序），缺失值补 None"""
+    if keys is None:
+        keys = []
+        seen = set()
+        for item in records:
+            for key in item:
+                if key not in seen:
+                    seen.add(key)
+                    keys.append(key)
+    return {key: [item.get(key) for item in records] for key in keys}
+
+
+def columns_to_records(columns: dict, keys: list = None) -> list:
+    """把列式数据转换回记录列表，keys 为空时转换全部字段"""
+    if keys is None:
+        keys = list(columns)
+    cols = [columns[key] for key in keys]
+    return [dict(zip(keys, row)) for row in zip(*cols)]
+
+
+def as_columns(data) -> dict:
+    """把记录列表或列式数据统一转换为列式数据"""
+    if is_columns(data):
+        return data
+    if isinstance(data, dict):
+        raise ValueError("数据格式不支持，请传入记录列表或 {字段名: 值列表} 形式的列式数据")
+    return records_to_columns(list(data))
+
+
+def project_columns(columns: dict, keys: list) -> dict:
+    """只保留图表需要的字段，忽略重复和空字段名"""
+    projected = {}
+    for key in keys:
+        if key and key in columns and key not in projected:
+            projected[key] = columns[key]
+    return projected
+
+
+def column_length(columns: dict) -> int:
+    """列式数据的行数"""
+    for values in columns.values():
+        return len(values)
+    return 0
+
+
+def first_row(columns: dict) -> dict:
+    """取列式数据的第一行，供字段类型推断使用"""
+    if not column_length(columns):
+        return {}
+    return {key: values[0] for key, values in columns.items()}
+
+
+def distinct_values(values) -> list:
+    """列中出现过的不同取值（顺序不定，调用方按需排序）；字典编码的列直接取类别表，不逐行比较字符串"""
+    if isinstance(values, CategoryColumn):
+        return values.distinct()
+    return list(set(values))
+
+
+def value_counts(values) -> Counter:
+    """每个取值出现的行数"""
+    if isinstance(values, CategoryColumn):
+        return values.value_counts()
+    return Counter(values)
+
+
+def take_rows(values, rows: list):
+    """按行号取出若干行，字典编码的列保持编码形式"""
+    if isinstance(values, CategoryColumn):
+        return values.take(rows)
+    return [values[row] for row in rows]
+
+
+def group_rows(values) -> dict:
+    """一次遍历记录每个取值所在的行号（保持原始顺序），返回 {取值: 行号列表}"""
+    rows_by_value = {}
+    if isinstance(values, CategoryColumn):
+        for row, code in enumerate(values.codes):
+            rows = rows_by_value.get(code)
+            if rows is None:
+                rows = rows_by_value[code] = []
+            rows.append(row)
+        categories = values.categories
+        return {categories[code]: rows for code, rows in rows_by_value.items()}
+    for row, value in enumerate(values):
+        rows = rows_by_value.get(value)
+        if rows is None:
+            rows = rows_by_value[value] = []
+        rows.append(row)
+    return rows_by_value
+
+
+def decode_rows(values, rows) -> list:
+    """按行号取出若干行的取值；字典编码的列直接查类别表，不经过逐行的下标调用"""
+    if isinstance(values, CategoryColumn):
+        codes, categories = values.codes, values.categories
+        return [categories[codes[row]] for row in rows]
+    return [values[row] for row in rows]
+
+
+def pivot_rows(groups, names, group_labels: list, name_labels: list) -> list:
+    """
+    透视表的行号：按 group_labels 的顺序，返回每个分组在 name_labels 各个取值上首次出现的行号（不存在为 None）
+    两列都是字典编码时在编码上建立 编码组合 -> 行号 的索引，只把坐标轴标签换成编码，不为每行生成 (分组, 类别) 元组
+    """
+    if isinstance(groups, CategoryColumn) and isinstance(names, CategoryColumn):
+        width = len(names.categories)
+        row_index = {}
+        for row, (group, name) in enumerate(zip(groups.codes, names.codes)):
+            row_index.setdefault(group * width + name, row)
+        group_codes = {label: code for code, label in enumerate(groups.categories)}
+        name_codes = {label: code for code, label in enumerate(names.categories)}
+        name_codes = [name_codes.get(label) for label in name_labels]
+        pivot = []
+        for group in group_labels:
+            base = group_codes.get(group)
+            pivot.append([None if base is None or code is None else row_index.get(base * width + code)
+                          for code in name_codes])
+        return pivot
+    row_index = {}
+    for row, key in enumerate(zip(groups, names)):
+        row_index.setdefault(key, row)
+    return [[row_index.get((group, name)) for name in name_labels] for group in group_labels]
@@ -0,0 +1,167 @@
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from threading import Lock, Timer
+
+from utils.prompt import PROMPT_ID
+
+# 设置该环境变量后，大模型的字段选择结果会缓存并保存到这个文件中
+DECISION_CACHE_ENV = "JSON2CHART_DECISION_CACHE"
+# 缓存的最大条目数，超出后淘汰最久未使用的结果
+MAX_ENTRIES = int(os.getenv("JSON2CHART_DECISION_CACHE_SIZE", "1024"))
+# 新增条目后延迟多少秒写入文件，期间的多次新增合并为一次写入；为 0 时每次新增立即写入
+SAVE_DELAY = float(os.getenv("JSON2CHART_DECISION_CACHE_SAVE_DELAY", "2"))
+
+
+def decision_key(columns: list, chart_type, chart_title, model: dict = None) -> str:
+    """
+    缓存键：数据的字段结构加上用户参数和提示词版本
+    同样字段的数据、同样的图表类型、标题和模型，大模型给出的字段选择基本一致，可以直接复用；
+    提示词修改后 PROMPT_ID 随之变化，旧提示词得到的选择不再命中
+    """
+    model = model or {}
+    payload = json.dumps([PROMPT_ID, list(columns), chart_type, chart_title, model.get("provider"), model.get("model")],
+                         ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class DecisionCache:
+    """大模型字段选择结果的 LRU 缓存，可以持久化到 JSON 文件，插件重启后继续使用"""
+
+    def __init__(self, path: str = None, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        # 同一时间只有一个线程写文件
+        self._save_lock = Lock()
+        # 有尚未写入文件的新增条目，以及等待写入的定时器
+        self._dirty = False
+        self._timer = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def get(self, key: str):
+        with self._lock:
+            decision = self.entries.get(key)
+            if decision is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(decision)
+
+    def put(self, key: str, decision: dict):
+        with self._lock:
+            self.entries[key] = dict(decision)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        self._schedule_save()
+
+    def discard(self, key: str):
+        """移除一条缓存，例如复用后没能生成任何图表的字段选择"""
+        with self._lock:
+            if self.entries.pop(key, None) is None:
+                return
+        self._schedule_save()
+
+    def settle(self, key: str, decision: dict, built: bool, cached: bool):
+        """
+        调用结束后更新缓存：大模型新给出的字段选择至少生成了一个图表才写入；
+        从缓存取出的字段选择没能生成任何图表时移除，下次重新询问大模型
+        """
+        if built and not cached:
+            self.put(key, decision)
+        elif not built and cached:
+            self.discard(key)
+
+    def _schedule_save(self):
+        """标记有尚未写入的修改，并安排写入文件"""
+        with self._lock:
+            self._dirty = True
+            if SAVE_DELAY <= 0 or not self.path:
+                timer = None
+            elif self._timer is None:
+                timer = self._timer = Timer(SAVE_DELAY, self.flush)
+                timer.daemon = True
+            else:
+                # 已经有等待中的写入，本次修改随它一起写入
+                return
+        if timer is None:
+            self.flush()
+        else:
+            timer.start()
+
+    def load(self) -> int:
+        """从文件加载缓存，文件不存在或损坏时忽略，返回加载的条目数"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if not isinstance(entries, dict):
+            return 0
+        with self._lock:
+            for key, decision in entries.items():
+                if isinstance(decision, dict):
+                    self.entries[key] = decision
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            return len(self.entries)
+
+    def flush(self):
+        """把尚未写入的新增条目写入文件；没有新增时什么也不做"""
+        with self._lock:
+            self._timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+        self.save()
+
+    def save(self):
+        """先写临时文件再替换，避免写到一半时进程退出留下损坏的文件；临时文件名唯一，并发写入不会互相覆盖"""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                payload = json.dumps(self.entries, ensure_ascii=False)
+            tmp_path = None
+            try:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False,
+                                                 prefix=os.path.basename(self.path) + ".", suffix=".tmp") as f:
+                    tmp_path = f.name
+                    f.write(payload)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                # 缓存只是加速手段，写入失败不影响图表生成
+                if tmp_path is not None:
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+
+
+_cache = None
+
+
+def get_decision_cache() -> DecisionCache:
+    """进程内共享的缓存；第一次使用时从文件加载"""
+    global _cache
+    if _cache is None:
+        _cache = DecisionCache(os.getenv(DECISION_CACHE_ENV))
+        _cache.load()
+        if _cache.enabled:
+            # 进程退出前写入还在等待中的新增条目
+            atexit.register(_cache.flush)
+    return _cache
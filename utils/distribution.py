@@ -0,0 +1,126 @@
+import math
+from array import array
+
+from utils.table import to_number
+
+# 自动分箱时的箱数范围
+MIN_BINS = 5
+MAX_BINS = 50
+# 箱线图中每个箱最多输出的异常值个数（取离箱体最远的），避免大数据量时输出过多的点
+MAX_OUTLIERS = 50
+
+
+def numeric_values(values) -> list:
+    """取出一列中可以转换为数值的值，无法转换的值跳过"""
+    if isinstance(values, array) and values.typecode == 'q':
+        return values.tolist()
+    if isinstance(values, array) and values.typecode == 'd':
+        return [value for value in values if math.isfinite(value)]
+    numbers = []
+    for value in values:
+        number = to_number(value)
+        if number is not None and not (isinstance(number, float) and math.isinf(number)):
+            numbers.append(number)
+    return numbers
+
+
+def split_by_group(columns: dict, value_key: str, group_key: str = None) -> dict:
+    """一次遍历把数值按分组拆开，返回 {分组: 数值列表}（分组排序）；不分组时分组为 None"""
+    values = columns[value_key]
+    if not group_key:
+        return {None: numeric_values(values)}
+    grouped = {}
+    for group, value in zip(columns[group_key], values):
+        number = to_number(value)
+        if number is None or (isinstance(number, float) and math.isinf(number)):
+            continue
+        grouped.setdefault(group, []).append(number)
+    return {group: grouped[group] for group in sorted(grouped, key=str)}
+
+
+def _nice_width(raw_width: float) -> float:
+    """把箱宽取整为 1、2、2.5、5 乘以 10 的幂，方便阅读"""
+    if raw_width <= 0:
+        return 1
+    exponent = math.floor(math.log10(raw_width))
+    base = 10 ** exponent
+    for step in (1, 2, 2.5, 5, 10):
+        if raw_width <= step * base:
+            return step * base
+    return 10 * base
+
+
+def histogram_edges(value_lists, bins: int = None) -> list:
+    """
+    按所有分组的最小值、最大值计算共用的箱边界
+    bins 为空时按 Sturges 规则 ceil(log2(n)) + 1 估算箱数，再把箱宽取整
+    """
+    low = high = None
+    count = 0
+    for values in value_lists:
+        if not values:
+            continue
+        count += len(values)
+        group_low, group_high = min(values), max(values)
+        low = group_low if low is None or group_low < low else low
+        high = group_high if high is None or group_high > high else high
+    if low is None:
+        raise ValueError("没有可以统计分布的数值")
+    if bins is None:
+        bins = min(MAX_BINS, max(MIN_BINS, math.ceil(math.log2(count)) + 1))
+    width = _nice_width((high - low) / bins) if high > low else 1
+    start = math.floor(low / width) * width
+    edges = [start]
+    while edges[-1] <= high:
+        edges.append(start + len(edges) * width)
+    # 消除浮点累加误差，如 0.30000000000000004
+    digits = max(0, -math.floor(math.log10(width))) if width < 1 else 0
+    return [round(edge, digits + 6) for edge in edges]
+
+
+def histogram_counts(values, edges: list) -> list:
+    """统计每个箱中的个数，区间为左闭右开"""
+    start = edges[0]
+    width = edges[1] - edges[0]
+    last = len(edges) - 2
+    counts = [0] * (last + 1)
+    for value in values:
+        index = int((value - start) // width)
+        counts[min(max(index, 0), last)] += 1
+    return counts
+
+
+def _quantile(sorted_values: list, q: float):
+    """线性插值的分位数（与 numpy 默认算法一致）"""
+    position = (len(sorted_values) - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def box_summary(values: list) -> tuple:
+    """
+    箱线图的统计量：排序一次后读取分位数
+    :return: ([下须, Q1, 中位数, Q3, 上须], 异常值列表)，须线取 1.5 倍四分位距以内的最远值
+    """
+    if not values:
+        return None, []
+    ordered = sorted(values)
+    q1, median, q3 = (_quantile(ordered, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    low_fence, high_fence = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    lower_whisker = next(value for value in ordered if value >= low_fence)
+    upper_whisker = next(value for value in reversed(ordered) if value <= high_fence)
+    outliers = [value for value in ordered if value < low_fence or value > high_fence]
+    if len(outliers) > MAX_OUTLIERS:
+        outliers.sort(key=lambda value: abs(value - median), reverse=True)
+        outliers = outliers[:MAX_OUTLIERS]
+    return [lower_whisker, q1, median, q3, upper_whisker], outliers
+
+
+def format_edge(value) -> str:
+    """箱边界的显示文本，整数不带小数点"""
+    if float(value).is_integer():
+        return str(int(value))
+    return f"{value:g}"
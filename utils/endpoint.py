@@ -0,0 +1,18 @@
+import hmac
+import json
+
+from werkzeug import Request, Response
+
+
+def authorized(r: Request, token: str) -> bool:
+    """未配置令牌时允许访问；配置了令牌时校验 Authorization: Bearer <令牌>，使用常量时间比较"""
+    if not token:
+        return True
+    provided = r.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    return hmac.compare_digest(provided.encode("utf-8"), token.encode("utf-8"))
+
+
+def json_response(payload, status: int = 200) -> Response:
+    """payload 为字典时序列化为 JSON；为字符串时视为已经序列化好的 JSON 原样返回"""
+    body = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+    return Response(body, status=status, content_type="application/json; charset=utf-8")
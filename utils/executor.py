@@ -0,0 +1,135 @@
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.columns import as_columns, column_length, project_columns
+from utils.quantize import parse_precision
+from utils.registry import get_chart_type
+
+# 进程池最大进程数，受 CPU 核数限制，可通过环境变量调整
+MAX_WORKERS = max(1, min(os.cpu_count() or 1, int(os.getenv("JSON2CHART_MAX_WORKERS", "4"))))
+
+# 单个任务的数据量（行数 × 字段数）低于该阈值时直接在当前进程执行，避免进程间传输的开销
+INLINE_CELL_THRESHOLD = int(os.getenv("JSON2CHART_INLINE_CELLS", "200000"))
+
+_pool = None
+
+
+def make_chart_job(chart_type: str, data, name_key: str, value_keys: list, title: str = None,
+                   series_names: list = None, saturation=0.5, brightness=0.95, group_key: str = None,
+                   precision=None, **extra_options) -> dict:
+    """
+    构造一个图表构建任务，数据只保留图表用到的字段，以列式结构传递；chart_type 可以是别名
+    extra_options 中只有图表类型声明支持且值不为空的参数会传给构建函数
+    precision 为数值精度（所有图表类型都支持），无法识别时抛出 ValueError
+    """
+    spec = get_chart_type(chart_type)
+    if spec is None:
+        raise ValueError(f"不支持的图表类型: {chart_type}")
+    options = {
+        "name_key": name_key,
+        "value_keys": list(value_keys) if value_keys is not None else None,
+        "title": title,
+        "series_names": list(series_names) if series_names is not None else None,
+        "saturation": saturation,
+        "brightness": brightness,
+    }
+    if spec.supports_group:
+        options["group_key"] = group_key
+    if parse_precision(precision) is not None:
+        options["precision"] = precision
+    for option, value in extra_options.items():
+        if option in spec.extra_options and value is not None:
+            options[option] = value
+
+    columns = as_columns(data)
+    # 字段齐全时只保留需要的列；缺字段时构建函数会自动推断或补充，需要保留全部列
+    if value_keys and (name_key or not spec.uses_name_key) and not spec.needs_all_columns(value_keys):
+        columns = project_columns(columns, [name_key] + list(value_keys) + [options.get("group_key")])
+    return {"chart_type": spec.name, "columns": columns, "options": options}
+
+
+def run_chart_job(job: dict, chunked: bool = False):
+    """
+    执行单个图表构建任务并返回 ECharts 配置字符串，可在子进程中执行
+    chunked 为 True 时返回文本片段的生成器（生成器无法跨进程传递，只用于当前进程执行的任务）
+    """
+    builder = get_chart_type(job["chart_type"]).load()
+    if chunked:
+        return builder(job["columns"], **job["options"], chunked=True)
+    return builder(job["columns"], **job["options"])
+
+
+def job_cells(job: dict) -> int:
+    """任务的数据量（行数 × 字段数）"""
+    return column_length(job["columns"]) * len(job["columns"])
+
+
+def _run_inline(job: dict, chunked: bool = False) -> tuple:
+    try:
+        return run_chart_job(job, chunked), None
+    except Exception as e:
+        return None, e
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # 插件进程的 __main__ 会启动 Plugin，spawn/forkserver 会重新导入它，因此优先使用 fork
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=context)
+        atexit.register(shutdown_pool)
+    return _pool
+
+
+def shutdown_pool():
+    """关闭进程池"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def build_charts(jobs: list, max_workers: int = None, chunked: bool = False) -> list:
+    """
+    并行构建多个图表
+    :param jobs: make_chart_job 生成的任务列表
+    :param max_workers: 为 1 时不使用进程池，全部在当前进程执行；默认使用 MAX_WORKERS
+    :param chunked: 为 True 时当前进程执行的任务返回文本片段的生成器，在输出时才逐段序列化；
+                    进程池中的任务仍返回完整字符串
+    :return: 与 jobs 顺序一致的 (配置字符串或片段生成器, 异常) 列表，成功时异常为 None
+    """
+    max_workers = MAX_WORKERS if max_workers is None else max_workers
+    # 只有多个任务且存在大任务时才值得使用进程池，小任务始终在当前进程执行
+    large = [i for i, job in enumerate(jobs) if job_cells(job) >= INLINE_CELL_THRESHOLD]
+    if max_workers <= 1 or len(jobs) < 2 or not large:
+        return [_run_inline(job, chunked) for job in jobs]
+
+    results = [None] * len(jobs)
+    futures = {}
+    try:
+        pool = _get_pool()
+        for i in large:
+            futures[i] = pool.submit(run_chart_job, jobs[i])
+    except (OSError, RuntimeError, BrokenProcessPool):
+        # 运行环境不允许创建子进程时退回到当前进程执行
+        shutdown_pool()
+        futures = {}
+
+    # 子进程工作的同时，当前进程处理小任务
+    for i, job in enumerate(jobs):
+        if i not in futures:
+            results[i] = _run_inline(job, chunked)
+
+    for i, future in futures.items():
+        try:
+            results[i] = future.result(), None
+        except BrokenProcessPool:
+            shutdown_pool()
+            results[i] = _run_inline(jobs[i], chunked)
+        except Exception as e:
+            results[i] = None, e
+    return results
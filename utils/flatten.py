@@ -0,0 +1,156 @@
+from itertools import islice
+
+from utils.ingest import ChartDataError, ColumnBuffer, RecordSource
+
+# 分析结构时读取的记录数
+PROFILE_RECORDS = 200
+# 分析对象数组结构时每个数组最多查看的元素数
+PROFILE_ELEMENTS = 20
+
+
+class PathProfile:
+    """
+    从样本中分析出的嵌套结构
+    leaves: 叶子路径（用 . 连接）-> (是否位于对象数组内, 路径段)，位于数组内时路径段相对于数组元素
+    array_segments: 需要展开成多行的对象数组的路径段，只展开一层
+    """
+
+    def __init__(self):
+        self.leaves = {}
+        self.array_segments = None
+        self.nested = False
+
+    def add_record(self, record: dict):
+        for key, value in record.items():
+            self._add_value(value, (key,), None)
+
+    def _add_value(self, value, segments: tuple, array_segments):
+        if isinstance(value, dict) and value:
+            self.nested = True
+            for key, child in value.items():
+                self._add_value(child, segments + (key,), array_segments)
+        elif (array_segments is None and isinstance(value, list) and value and isinstance(value[0], dict)
+              and self.array_segments in (None, segments)):
+            # 对象数组：每个元素展开为一行，同一条记录中的其他字段在各行中重复
+            self.nested = True
+            self.array_segments = segments
+            for element in value[:PROFILE_ELEMENTS]:
+                if isinstance(element, dict):
+                    for key, child in element.items():
+                        self._add_value(child, segments + (key,), segments)
+        else:
+            path = ".".join(segments)
+            if path not in self.leaves:
+                if array_segments is None:
+                    self.leaves[path] = (False, segments)
+                else:
+                    self.leaves[path] = (True, segments[len(array_segments):])
+
+    def resolve(self, path: str) -> tuple:
+        """返回路径对应的 (是否位于对象数组内, 路径段)，样本中没有出现的路径按 . 拆分"""
+        if path in self.leaves:
+            return self.leaves[path]
+        return False, tuple(path.split("."))
+
+
+def profile_records(records) -> PathProfile:
+    """分析记录的嵌套结构"""
+    profile = PathProfile()
+    for record in records:
+        if not isinstance(record, dict):
+            raise ChartDataError("数据中的每一项都必须是 JSON 对象")
+        profile.add_record(record)
+    return profile
+
+
+def get_path(value, segments: tuple):
+    """按路径段逐层取值，中途缺失时返回 None"""
+    for segment in segments:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(segment)
+        if value is None:
+            return None
+    return value
+
+
+class FlattenedSource(RecordSource):
+    """把嵌套记录按叶子路径展开的数据源，load 时只计算被选中的路径"""
+
+    def __init__(self, source: RecordSource, profile: PathProfile):
+        self.source = source
+        self.profile = profile
+
+    def _plan(self, keys: list) -> tuple:
+        outer = []
+        inner = []
+        for key in keys:
+            in_array, segments = self.profile.resolve(key)
+            (inner if in_array else outer).append((key, segments))
+        return outer, inner
+
+    def _rows(self, keys: list):
+        """按选中的路径逐条产生展开后的行（每行是与 keys 顺序一致的值列表）"""
+        outer, inner = self._plan(keys)
+        order = [key for key, _ in outer] + [key for key, _ in inner]
+        positions = [order.index(key) for key in keys]
+        array_segments = self.profile.array_segments
+        for record in self.source.iter_records():
+            if not isinstance(record, dict):
+                raise ChartDataError("数据中的每一项都必须是 JSON 对象")
+            outer_values = [get_path(record, segments) for _, segments in outer]
+            elements = get_path(record, array_segments) if inner else None
+            if not inner or not isinstance(elements, list) or not elements:
+                row = outer_values + [None] * len(inner)
+                yield [row[i] for i in positions]
+                continue
+            for element in elements:
+                row = outer_values + [get_path(element, segments) for _, segments in inner]
+                yield [row[i] for i in positions]
+
+    def iter_records(self):
+        keys = list(self.profile.leaves)
+        for row in self._rows(keys):
+            yield dict(zip(keys, row))
+
+    def iter_rows(self, keys: list):
+        return self._rows(keys)
+
+    def size_hint(self):
+        return self.source.size_hint()
+
+    def estimate_rows(self, sample_records: list):
+        # 原始数据大小未知时（已解析好的记录）按原始记录数估算，展开对象数组后的实际行数可能更多
+        if self.size_hint() is None:
+            return self.source.estimate_rows(sample_records)
+        return super().estimate_rows(sample_records)
+
+    def load(self, keys: list, stride: int = 1) -> dict:
+        keys = list(dict.fromkeys(key for key in keys if key))
+        buffers = [ColumnBuffer() for _ in keys]
+        # 样本中没有出现过的路径，只有在数据中取到值时才认为存在
+        missing = {key for key in keys if key not in self.profile.leaves}
+        for row in islice(self._rows(keys), 0, None, stride):
+            for key, buffer, value in zip(keys, buffers, row):
+                buffer.append(value)
+                if missing and value is not None:
+                    missing.discard(key)
+        return {key: buffer.values for key, buffer in zip(keys, buffers) if key not in missing}
+
+
+def flatten_source(source: RecordSource) -> RecordSource:
+    """用开头的少量记录分析结构，有嵌套对象或对象数组时返回按路径展开的数据源，否则原样返回"""
+    if not source.streams_records:
+        # Arrow/Parquet 等列式格式自行处理嵌套结构
+        return source
+    records = source.iter_records()
+    try:
+        head = []
+        for record in records:
+            head.append(record)
+            if len(head) >= PROFILE_RECORDS:
+                break
+    finally:
+        records.close()
+    profile = profile_records(head)
+    return FlattenedSource(source, profile) if profile.nested else source
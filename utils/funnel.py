@@ -1,24 +1,33 @@
 from utils.chart import generate_colors, auto_detect_keys
-import json
+from utils.columns import as_columns, column_length
+from utils.quantize import quantize_columns
+from utils.serialize import dumps_config
 
 def generate_echarts_funnel(
-    data_list: list,
+    data_list,
     name_key: str = None,
     value_keys: list = None,
     title: str = None,
     series_names: list = None,
     saturation=0.5,  # 新增饱和度参数
-    brightness=0.95  # 新增亮度参数
+    brightness=0.95,  # 新增亮度参数
+    precision=None,  # 数值精度：auto、小数位数（如 2）或有效数字（如 4s），为空时保留原始数值
+    compact=False,  # 为 True 时输出不带缩进的紧凑 JSON
+    chunked=False  # 为 True 时返回 JSON 文本片段的生成器，用于分段输出
 ) -> str:
     """生成通用 ECharts 漏斗图配置，支持自动推断字段和多维数据"""
     if not data_list:
         raise ValueError("数据列表不能为空")
+    # 统一转换为列式数据 {字段名: 值列表}，data_list 也可以直接传入列式数据
+    columns = as_columns(data_list)
+    if not column_length(columns):
+        raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(columns)
     
     if not value_keys:
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(columns)
         value_keys = [value_key]
     
     if series_names is None:
@@ -26,13 +35,17 @@ def generate_echarts_funnel(
     
     # 验证字段存在
     for value_key in value_keys:
-        if value_key not in data_list[0] or name_key not in data_list[0]:
+        if value_key not in columns or name_key not in columns:
             raise KeyError(f"数据中未找到推断的字段: '{value_key}' 或 '{name_key}'")
     
+    # 按精度处理数值字段，auto 模式下按取值范围计算小数位数
+    columns = quantize_columns(columns, value_keys[:1], precision)
+
     # 准备漏斗图数据，保持原始顺序
+    names = columns[name_key]
     echarts_data = [
-        {"value": item[value_keys[0]], "name": item[name_key]}
-        for item in data_list
+        {"value": value, "name": name}
+        for value, name in zip(columns[value_keys[0]], names)
     ]
     
     # 自动生成标题
@@ -40,7 +53,7 @@ def generate_echarts_funnel(
         title = f"{name_key} {value_keys[0]}漏斗图"
 
     # 动态生成颜色列表
-    color_list = generate_colors(len(data_list), saturation=saturation, brightness=brightness)
+    color_list = generate_colors(len(names), saturation=saturation, brightness=brightness)
 
     # 构造配置
     config = {
@@ -58,7 +71,7 @@ def generate_echarts_funnel(
             "borderWidth": 1
         },
         "legend": {
-            "data": [item[name_key] for item in data_list],
+            "data": list(names),
             "left": "center",
             "bottom": "0%",
             "textStyle": {
@@ -105,4 +118,4 @@ def generate_echarts_funnel(
         "color": color_list
     }
     
-    return json.dumps(config, indent=4, ensure_ascii=False)
\ No newline at end of file
+    return dumps_config(config, compact, chunked)
\ No newline at end of file
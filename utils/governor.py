@@ -0,0 +1,228 @@
+import json
+import math
+import os
+from itertools import islice
+
+from utils.columns import CategoryColumn, column_length, distinct_values, take_rows
+from utils.guardrail import OTHER_LABEL, fold_groups
+from utils.registry import get_chart_type
+from utils.table import to_number
+from utils.timeaxis import TARGET_POINTS, is_temporal
+
+# 单个图表配置的输出体积上限（字节），可通过环境变量或工具参数调整
+OUTPUT_BUDGET = int(os.getenv("JSON2CHART_OUTPUT_BUDGET", str(2 * 1024 * 1024)))
+# 估算体积时用两份抽样数据实际构建图表，拟合出固定部分和每个数据元素的字节数
+ESTIMATE_ROWS = (100, 200)
+# 超出上限时小数保留的有效数字位数
+REDUCED_DIGITS = 4
+# 快速估算的上限：标题、坐标轴、提示框等固定部分，以及每个系列的名称和样式（字节）
+FIXED_BOUND = 8 * 1024
+SERIES_BOUND = 1024
+# 估算标签宽度时最多查看的取值个数
+LABEL_SAMPLE = 1000
+# 快速估算的上限不超过 budget 的该比例时，认为远低于上限，不再抽样构建
+QUICK_RATIO = 0.5
+
+
+def parse_output_budget(value, unit: int = 1024) -> int:
+    """
+    解析输出体积上限，返回字节数；value 以 unit 字节为单位（工具参数为 KB），为空时使用默认值
+    必须是正数，0 或负数会把每个图表都缩减到最小，按无效参数处理
+    """
+    if value is None or value == "":
+        return OUTPUT_BUDGET
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = None
+    if isinstance(value, bool) or number is None or not math.isfinite(number) or number <= 0:
+        raise ValueError(f"无法识别的输出上限: {value}，应为正数")
+    return max(1, int(number * unit))
+
+
+def _sample_rows(columns: dict, count: int) -> dict:
+    """在全部数据中等间隔抽取 count 行"""
+    rows = column_length(columns)
+    step = rows / count
+    indexes = [int(i * step) for i in range(count)]
+    return {key: [values[i] for i in indexes] for key, values in columns.items()}
+
+
+def _float_columns(columns: dict, keys: list) -> bool:
+    """数值字段中是否有小数（整数缓冲区不需要处理精度）"""
+    for key in keys:
+        values = columns.get(key)
+        if values is None or getattr(values, "typecode", None) == 'q':
+            continue
+        if any(type(value) is float for value in values):
+            return True
+    return False
+
+
+def _time_mode(spec, columns: dict, options: dict) -> bool:
+    name_key = options.get("name_key")
+    return bool(options.get("time_bucket")) and name_key in columns and is_temporal(columns[name_key])
+
+
+def count_elements(spec, columns: dict, options: dict) -> int:
+    """按图表的输出结构计算数据元素个数（类目标签、数值、对象、坐标点或单元格），输出体积与它近似成正比"""
+    rows = column_length(columns)
+    name_key = options.get("name_key")
+    value_keys = options.get("value_keys") or []
+    group_key = options.get("group_key")
+    layout = spec.output_layout
+    if layout == "summary":
+        return 0
+    if layout == "category":
+        if _time_mode(spec, columns, options):
+            groups = len(distinct_values(columns[group_key])) if group_key else 1
+            # 时间轴按时间粒度聚合，点数有上限
+            return min(rows, TARGET_POINTS * groups) * len(value_keys)
+        if group_key and spec.grouped_series:
+            labels = len(distinct_values(columns[name_key]))
+            series = spec.series_count(value_keys, len(distinct_values(columns[group_key])))
+            return labels * series + labels
+        return rows * (len(value_keys) + 1)
+    if layout == "cells":
+        if group_key:
+            return len(set(zip(columns[name_key], columns[group_key])))
+        return rows * len(value_keys)
+    # items、points：每行一个对象或坐标点
+    return rows
+
+
+def _label_width(values) -> int:
+    """标签编码为 JSON 字符串后的最大字节数（按前 LABEL_SAMPLE 个取值，字典编码的列查看类别表）"""
+    if isinstance(values, CategoryColumn):
+        values = values.categories
+    width = 0
+    for value in set(islice(values, LABEL_SAMPLE)):
+        width = max(width, len(json.dumps(value if isinstance(value, str) else str(value), ensure_ascii=False).encode("utf-8")))
+    return width
+
+
+def quick_estimate_bytes(spec, columns: dict, options: dict) -> int:
+    """
+    不构建图表，按数据元素个数和每个元素的宽度上限估算输出体积的上限（按缩进格式计算，偏大）
+    远低于上限的图表据此直接跳过抽样构建
+    """
+    name_key = options.get("name_key")
+    value_keys = options.get("value_keys") or []
+    group_key = options.get("group_key")
+    label = sum(_label_width(columns[key]) for key in (name_key, group_key) if key and key in columns)
+    numbers = max(1, len(value_keys)) if spec.output_layout in ("items", "points") else 1
+    groups = len(distinct_values(columns[group_key])) if group_key and group_key in columns else 1
+    series = groups * max(1, len(value_keys))
+    elements = count_elements(spec, columns, options)
+    # 每个数值都可能带着标签输出（雷达图每个系列各有一份 {name, value}），按数值个数计入标签宽度
+    return FIXED_BOUND + SERIES_BOUND * series + elements * (spec.element_bytes + numbers * (label + spec.value_bytes))
+
+
+def _fit_output_size(job: dict) -> tuple:
+    """
+    用两份抽样数据实际构建图表，拟合出输出中的固定部分和每个数据元素的平均字节数
+    :return: (固定字节数, 每个元素的字节数, 完整数据的元素个数)
+    """
+    spec = get_chart_type(job["chart_type"])
+    columns = job["columns"]
+    options = job["options"]
+    builder = spec.load()
+    elements = count_elements(spec, columns, options)
+    if column_length(columns) <= ESTIMATE_ROWS[-1]:
+        # 数据量很小时直接构建
+        return len(builder(columns, **options).encode("utf-8")), 0, elements
+    points = []
+    for count in ESTIMATE_ROWS:
+        sample = _sample_rows(columns, count)
+        points.append((count_elements(spec, sample, options), len(builder(sample, **options).encode("utf-8"))))
+    (e1, b1), (e2, b2) = points
+    if e2 > e1:
+        per_element = (b2 - b1) / (e2 - e1)
+    else:
+        per_element = b2 / e2 if e2 else 0
+    fixed = max(0, b2 - per_element * e2)
+    return fixed, per_element, elements
+
+
+def estimate_output_bytes(job: dict) -> int:
+    """在构建前估算完整输出的字节数：按抽样拟合的结果和完整数据的元素个数推算"""
+    fixed, per_element, elements = _fit_output_size(job)
+    return int(fixed + per_element * elements)
+
+
+def _top_categories(columns: dict, name_key: str, value_keys: list, group_key: str, count: int) -> dict:
+    """保留第一个数值字段合计最大的 count 个类别，其余类别合并为"其他"（分组时每个分组各一个）"""
+    totals = {}
+    for name, value in zip(columns[name_key], columns[value_keys[0]]):
+        number = to_number(value)
+        totals[name] = totals.get(name, 0) + (abs(number) if number is not None else 0)
+    keep = set(sorted(totals, key=totals.get, reverse=True)[:count])
+    folded = fold_groups(columns, group_key, value_keys, name_key, keep)
+    return folded
+
+
+def _downsample(columns: dict, name_key: str, group_key: str, stride: int, grouped_labels: bool) -> dict:
+    """按步长抽样；分组的类目图按类目抽样，保证各分组的类目一致"""
+    if grouped_labels:
+        labels = sorted(distinct_values(columns[name_key]), key=str)
+        keep = set(labels[::stride])
+        indexes = [row for row, name in enumerate(columns[name_key]) if name in keep]
+        return {key: take_rows(values, indexes) for key, values in columns.items()}
+    return {key: values[::stride] for key, values in columns.items()}
+
+
+def govern_job(job: dict, budget: int = OUTPUT_BUDGET) -> tuple:
+    """
+    估算图表配置的体积，超出 budget 时依次采用：紧凑 JSON、降低小数精度、抽样或只保留最大的若干类别
+    :return: (调整后的任务, 说明)，未超出时原样返回且说明为 None
+    """
+    spec = get_chart_type(job["chart_type"])
+    # 远低于上限时不构建抽样图表，避免每个图表都多构建一次；只有接近或超过上限时才抽样估算
+    if quick_estimate_bytes(spec, job["columns"], job["options"]) <= budget * QUICK_RATIO:
+        return job, None
+    estimate = estimate_output_bytes(job)
+    if estimate <= budget:
+        return job, None
+
+    columns = job["columns"]
+    options = dict(job["options"])
+    name_key = options.get("name_key")
+    value_keys = options.get("value_keys") or []
+    group_key = options.get("group_key")
+    reductions = []
+
+    options["compact"] = True
+    job = dict(job, options=options)
+    current = estimate_output_bytes(job)
+    reductions.append("紧凑 JSON")
+
+    if current > budget and _float_columns(columns, value_keys):
+        # 由构建函数在生成系列时处理精度，聚合后的结果（均值、合计等）也会一并处理
+        options["precision"] = f"{REDUCED_DIGITS}s"
+        current = estimate_output_bytes(job)
+        reductions.append(f"小数保留 {REDUCED_DIGITS} 位有效数字")
+
+    if current > budget and spec.size_reduction and not _time_mode(spec, columns, options):
+        # 扣除固定部分（标题、样式等）后，按剩余空间与数据元素体积的比例缩减
+        fixed, per_element, elements = _fit_output_size(job)
+        # 预留 5% 余量，抵消抽样估算的误差
+        ratio = max(0.0, budget * 0.95 - fixed) / (per_element * elements) if per_element and elements else 1
+        if ratio <= 0:
+            ratio = 1 / max(elements, 1)
+        if spec.size_reduction == "downsample":
+            stride = max(2, math.ceil(1 / ratio))
+            grouped_labels = bool(group_key) and spec.output_layout == "category"
+            columns = _downsample(columns, name_key, group_key, stride, grouped_labels)
+            reductions.append(f"每 {stride} 个数据点抽取 1 个")
+        elif name_key in columns and value_keys:
+            labels = len(distinct_values(columns[name_key]))
+            keep = max(1, int(labels * ratio) - 1)
+            columns = _top_categories(columns, name_key, value_keys, group_key, keep)
+            reductions.append(f"只保留数值最大的 {keep} 个类别，其余合并为\"{OTHER_LABEL}\"")
+        job = dict(job, columns=columns)
+        current = estimate_output_bytes(job)
+
+    notice = f"{spec.name}预计输出 {estimate / 1024:.0f} KB，超过上限 {budget / 1024:.0f} KB，已采用：{'、'.join(reductions)}，预计输出 {current / 1024:.0f} KB"
+    if current > budget:
+        notice += "，仍超出上限"
+    return job, notice
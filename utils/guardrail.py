@@ -0,0 +1,104 @@
+import os
+from collections import Counter
+
+from utils.columns import value_counts
+
+from utils.registry import get_chart_type
+from utils.table import to_number
+
+# 单个图表允许的最大系列数（分组数 × 数值字段数），可通过环境变量或工具参数调整
+SERIES_BUDGET = int(os.getenv("JSON2CHART_SERIES_BUDGET", "20"))
+# 超出系列上限时的处理方式：fold 把较小的分组合并为"其他"，heatmap 改用热力图，reject 拒绝生成
+OVERFLOW_ACTIONS = ("fold", "heatmap", "reject")
+OTHER_LABEL = "其他"
+
+
+def parse_series_budget(value) -> int:
+    """解析系列上限：正整数（允许 20.0 这样的整数值），为空时使用默认值，其他写法抛出 ValueError"""
+    if value is None or value == "":
+        return SERIES_BUDGET
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = None
+    if isinstance(value, bool) or number is None or not number.is_integer() or number < 1:
+        raise ValueError(f"无法识别的系列上限: {value}，应为正整数")
+    return int(number)
+
+
+def group_cardinality(columns: dict, group_key: str) -> Counter:
+    """统计每个分组的行数，多个图表共用同一次统计结果"""
+    return value_counts(columns[group_key])
+
+
+def fold_groups(columns: dict, name_key: str, value_keys: list, group_key: str, keep: set,
+                aggregate: bool = True) -> dict:
+    """
+    保留 keep 中的分组，其余分组合并为"其他"，返回新的列式数据
+    aggregate 为 True 时"其他"在每个 name_key 取值上只保留一行，数值字段求和（柱状图、折线图、雷达图按类别取值，只保留图表用到的字段）；
+    为 False 时只替换分组名（散点图每行都是一个点）
+    """
+    groups = columns[group_key]
+    if not aggregate:
+        folded = dict(columns)
+        folded[group_key] = [str(group) if group in keep else OTHER_LABEL for group in groups]
+        return folded
+
+    # name_key 为空时所有被合并的行汇总为一行
+    keys = [key for key in dict.fromkeys([name_key] + list(value_keys)) if key]
+    folded = {key: [] for key in keys}
+    folded[group_key] = []
+    names = columns[name_key] if name_key else None
+    # name_key 取值 -> 各数值字段的合计
+    other_rows = {}
+    for row, group in enumerate(groups):
+        if group in keep:
+            for key in keys:
+                folded[key].append(columns[key][row])
+            # 分组名统一为字符串，避免数字分组与"其他"混在一起无法排序
+            folded[group_key].append(str(group))
+            continue
+        name = names[row] if names is not None else None
+        totals = other_rows.get(name)
+        if totals is None:
+            totals = other_rows[name] = [None] * len(value_keys)
+        for i, value_key in enumerate(value_keys):
+            number = to_number(columns[value_key][row])
+            if number is not None:
+                totals[i] = number if totals[i] is None else totals[i] + number
+    for name, totals in other_rows.items():
+        row = dict(zip(value_keys, totals))
+        if name_key:
+            row[name_key] = name
+        for key in keys:
+            folded[key].append(row[key])
+        folded[group_key].append(OTHER_LABEL)
+    return folded
+
+
+def apply_series_budget(spec, columns: dict, name_key: str, value_keys: list, group_key: str,
+                        group_counts: Counter, budget: int = SERIES_BUDGET, action: str = "fold") -> tuple:
+    """
+    检查分组图表的系列数是否超出上限，超出时按 action 处理
+    :return: (图表类型, 列式数据, 说明)，未超出时原样返回且说明为 None；action 为 reject 时抛出 ValueError
+    """
+    if action not in OVERFLOW_ACTIONS:
+        raise ValueError(f"不支持的超限处理方式: {action}，可选值为 {', '.join(OVERFLOW_ACTIONS)}")
+    if not group_key or not spec.supports_group or not group_counts:
+        return spec, columns, None
+    series_count = spec.series_count(value_keys, len(group_counts))
+    if series_count <= budget:
+        return spec, columns, None
+
+    summary = f"分组字段 {group_key} 有 {len(group_counts)} 个取值，{spec.name}将生成 {series_count} 个系列，超过上限 {budget}"
+    if action == "reject":
+        raise ValueError(f"{summary}，请换用分组较少的字段、改用热力图或调大系列上限")
+    if action == "heatmap" and spec.uses_name_key and name_key in columns:
+        return get_chart_type("热力图"), columns, f"{summary}，已改用热力图展示"
+
+    # 保留行数最多的分组，给"其他"留出一个分组的位置
+    per_group = spec.series_count(value_keys, 1)
+    keep_count = max(1, budget // per_group - 1)
+    keep = {group for group, _ in group_counts.most_common(keep_count)}
+    folded = fold_groups(columns, name_key, value_keys, group_key, keep, aggregate=spec.value_keys_are_series)
+    return spec, folded, f"{summary}，已保留行数最多的 {len(keep)} 个分组，其余 {len(group_counts) - len(keep)} 个分组合并为\"{OTHER_LABEL}\""
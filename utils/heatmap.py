@@ -0,0 +1,168 @@
+from utils.chart import generate_colors, auto_detect_keys
+from utils.columns import as_columns, column_length
+from utils.quantize import make_quantizer
+from utils.serialize import dumps_config
+from utils.table import to_number
+
+# 单元格数量不超过该值时在格子上显示数值
+LABEL_CELL_LIMIT = 200
+
+def generate_echarts_heatmap(
+    data_list,
+    name_key: str = None,
+    value_keys: list = None,
+    title: str = None,
+    series_names: list = None,
+    saturation=0.5,  # 新增饱和度参数
+    brightness=0.95,  # 新增亮度参数
+    group_key=None,  # 新增分组参数
+    precision=None,  # 数值精度：auto、小数位数（如 2）或有效数字（如 4s），为空时保留原始数值
+    compact=False,  # 为 True 时输出不带缩进的紧凑 JSON
+    chunked=False  # 为 True 时返回 JSON 文本片段的生成器，用于分段输出
+) -> str:
+    """
+    生成 ECharts 热力图配置：横轴为 name_key，纵轴为 group_key（不分组时为各个数值字段）
+    透视表稀疏存储，只输出有数据的单元格 [x 序号, y 序号, 值]；同一单元格出现多次时求和
+    """
+    if not data_list:
+        raise ValueError("数据列表不能为空")
+    # 统一转换为列式数据 {字段名: 值列表}，data_list 也可以直接传入列式数据
+    columns = as_columns(data_list)
+    if not column_length(columns):
+        raise ValueError("数据列表不能为空")
+
+    if not name_key:
+        name_key, _ = auto_detect_keys(columns)
+
+    if not value_keys:
+        _, value_key = auto_detect_keys(columns)
+        value_keys = [value_key]
+
+    if series_names is None:
+        series_names = list(value_keys)
+
+    # 验证字段存在
+    required_fields = [name_key] + list(value_keys)
+    if group_key:
+        required_fields.append(group_key)
+    for field in required_fields:
+        if field not in columns:
+            raise KeyError(f"数据中未找到字段: '{field}'")
+
+    # 一次遍历建立稀疏透视表 {(x 序号, y 序号): 值}，类别按首次出现的顺序编号
+    x_index = {}
+    y_index = {}
+    cells = {}
+    names = columns[name_key]
+    if group_key:
+        # 分组时只使用第一个数值字段
+        value_label = series_names[0] if series_names else value_keys[0]
+        row_sources = [(columns[group_key], columns[value_keys[0]])]
+    else:
+        value_label = "、".join(series_names) if series_names else "、".join(value_keys)
+        row_sources = [([series_names[i] if i < len(series_names) else value_key] * len(names), columns[value_key])
+                       for i, value_key in enumerate(value_keys)]
+    for y_values, values in row_sources:
+        for x, y, value in zip(names, y_values, values):
+            number = to_number(value)
+            if number is None:
+                continue
+            xi = x_index.setdefault(x, len(x_index))
+            yi = y_index.setdefault(y, len(y_index))
+            key = (xi, yi)
+            cells[key] = cells.get(key, 0) + number
+
+    if not cells:
+        raise ValueError("没有可以绘制热力图的数值")
+
+    # 横轴、纵轴类别排序，确保展示顺序一致；不分组时纵轴保持数值字段的顺序
+    x_categories = sorted(x_index, key=str)
+    y_categories = sorted(y_index, key=str) if group_key else list(y_index)
+    x_position = {x_index[x]: i for i, x in enumerate(x_categories)}
+    y_position = {y_index[y]: i for i, y in enumerate(y_categories)}
+
+    # 输出单元格的同时计算 visualMap 的范围；合计值在求和之后再处理精度
+    quantize = make_quantizer(list(cells.values()), precision)
+    data = []
+    low = high = None
+    for (xi, yi), value in cells.items():
+        if quantize is not None:
+            value = quantize(value)
+        data.append([x_position[xi], y_position[yi], value])
+        if low is None or value < low:
+            low = value
+        if high is None or value > high:
+            high = value
+
+    # 自动生成标题
+    if not title:
+        title = f"{name_key}与{group_key}的{value_label}热力图" if group_key else f"{name_key} {value_label}热力图"
+
+    # 颜色由浅到深，深色使用配色方案的第一个颜色
+    color_list = generate_colors(1, saturation=saturation, brightness=brightness)
+
+    config = {
+        "animation": True,
+        "animationDuration": 1000,
+        "title": {"text": title, "left": "center"},
+        "tooltip": {
+            "position": "top",
+            "backgroundColor": 'rgba(50,50,50,0.9)',
+            "textStyle": {
+                "color": '#fff'
+            },
+            "borderColor": '#333',
+            "borderWidth": 1
+        },
+        "grid": {
+            "top": 60,
+            "bottom": 100,
+            "containLabel": True
+        },
+        "xAxis": {
+            "type": "category",
+            "data": [str(x) for x in x_categories],
+            "splitArea": {
+                "show": True
+            },
+            "axisLabel": {
+                "rotate": 45
+            }
+        },
+        "yAxis": {
+            "type": "category",
+            "data": [str(y) for y in y_categories],
+            "splitArea": {
+                "show": True
+            }
+        },
+        "visualMap": {
+            "min": low,
+            "max": high,
+            "calculable": True,
+            "orient": "horizontal",
+            "left": "center",
+            "bottom": "0%",
+            "inRange": {
+                "color": ['#f7fbff', color_list[0]]
+            }
+        },
+        "series": [
+            {
+                "name": value_label,
+                "type": "heatmap",
+                "data": data,
+                "label": {
+                    "show": len(data) <= LABEL_CELL_LIMIT
+                },
+                "emphasis": {
+                    "itemStyle": {
+                        "shadowBlur": 10,
+                        "shadowColor": 'rgba(0, 0, 0, 0.5)'
+                    }
+                }
+            }
+        ]
+    }
+
+    return dumps_config(config, compact, chunked)
@@ -0,0 +1,127 @@
+from utils.chart import generate_colors
+from utils.columns import as_columns, column_length
+from utils.quantize import quantize_values
+from utils.serialize import dumps_config
+from utils.distribution import split_by_group, histogram_edges, histogram_counts, format_edge
+from utils.table import has_numeric
+
+def generate_echarts_histogram(
+    data_list,
+    name_key: str = None,
+    value_keys: list = None,
+    title: str = None,
+    series_names: list = None,
+    saturation=0.5,  # 新增饱和度参数
+    brightness=0.95,  # 新增亮度参数
+    group_key=None,  # 新增分组参数
+    bins: int = None,  # 箱数，为空时自动计算
+    precision=None,  # 数值精度：auto、小数位数（如 2）或有效数字（如 4s），为空时保留原始数值
+    compact=False,  # 为 True 时输出不带缩进的紧凑 JSON
+    chunked=False  # 为 True 时返回 JSON 文本片段的生成器，用于分段输出
+) -> str:
+    """
+    生成 ECharts 直方图配置：在服务端完成分箱统计，输出的数据量只与箱数有关，与行数无关
+    name_key 不参与计算；有 group_key 时每个分组一个系列，所有分组使用相同的箱边界
+    """
+    if not data_list:
+        raise ValueError("数据列表不能为空")
+    # 统一转换为列式数据 {字段名: 值列表}，data_list 也可以直接传入列式数据
+    columns = as_columns(data_list)
+    if not column_length(columns):
+        raise ValueError("数据列表不能为空")
+
+    if not value_keys:
+        # 取第一个数值字段
+        value_key = next((key for key, values in columns.items() if has_numeric(values)), None)
+        if value_key is None:
+            raise ValueError("数据中不包含数值类型的字段，无法生成直方图")
+        value_keys = [value_key]
+    value_key = value_keys[0]
+
+    if series_names is None:
+        series_names = [f"{value_key}分布"]
+    series_name = series_names[0] if series_names else value_key
+
+    # 验证字段存在
+    for field in [value_key] + ([group_key] if group_key else []):
+        if field not in columns:
+            raise KeyError(f"数据中未找到字段: '{field}'")
+
+    # 按分组拆分数值，所有分组共用箱边界，便于对比
+    grouped = split_by_group(columns, value_key, group_key)
+    edges = histogram_edges(grouped.values(), bins)
+    # 频数都是整数，精度只作用于箱边界的显示文本
+    shown = quantize_values(edges, precision)
+    labels = [f"{format_edge(left)}~{format_edge(right)}" for left, right in zip(shown, shown[1:])]
+
+    # 自动生成标题
+    if not title:
+        title = f"{value_key}分布直方图" if not group_key else f"不同{group_key}的{value_key}分布直方图"
+
+    # 动态生成颜色列表（按分组数量生成）
+    color_list = generate_colors(len(grouped), saturation=saturation, brightness=brightness)
+
+    config = {
+        "animation": True,
+        "animationDuration": 1000,
+        "title": {"text": title, "left": "center"},
+        "tooltip": {
+            "trigger": "axis",
+            "axisPointer": {
+                "type": "shadow"
+            },
+            "backgroundColor": 'rgba(50,50,50,0.9)',
+            "textStyle": {
+                "color": '#fff'
+            },
+            "borderColor": '#333',
+            "borderWidth": 1
+        },
+        "legend": {
+            "left": "center",
+            "bottom": "0%",
+            "textStyle": {
+                "fontSize": 12
+            }
+        },
+        "xAxis": {
+            "type": "category",
+            "name": value_key,
+            "data": labels,
+            "axisLabel": {
+                "rotate": 45
+            }
+        },
+        "yAxis": {
+            "type": "value",
+            "name": "频数",
+            "splitLine": {
+                "show": True,
+                "lineStyle": {
+                    "color": ['#eee'],
+                    "type": 'dashed'
+                }
+            }
+        },
+        "series": []
+    }
+
+    legend_data = []
+    for i, (group, values) in enumerate(grouped.items()):
+        name = series_name if group is None else f"{group}-{series_name}"
+        config["series"].append({
+            "name": name,
+            "type": "bar",
+            # 只有一个系列时柱子之间不留空隙，符合直方图的习惯
+            "barCategoryGap": "0%" if len(grouped) == 1 else "20%",
+            "data": histogram_counts(values, edges),
+            "itemStyle": {
+                "color": color_list[i],
+                "borderColor": "#fff",
+                "borderWidth": 1
+            }
+        })
+        legend_data.append(name)
+    config["legend"]["data"] = legend_data
+
+    return dumps_config(config, compact, chunked)
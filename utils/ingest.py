@@ -0,0 +1,262 @@
+import json
+import re
+from array import array
+from itertools import islice
+
+from utils.columns import MAX_CATEGORIES, CategoryColumn
+
+# 跳过 JSON 中的空白字符
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+
+class ChartDataError(ValueError):
+    """图表数据本身无法解析（格式错误、结构不支持等）"""
+
+
+class ColumnBuffer:
+    """
+    按值类型自动选择存储方式的列缓冲区：全是整数时用 array('q')，出现小数后用 array('d')，
+    以字符串开头的列按字典编码保存（CategoryColumn），其他情况退回 list
+    """
+
+    __slots__ = ("values", "index")
+
+    def __init__(self):
+        self.values = array('q')
+        # 字典编码时 取值 -> 编码
+        self.index = None
+
+    def append(self, value):
+        values = self.values
+        if type(values) is list:
+            values.append(value)
+            return
+        if type(values) is CategoryColumn:
+            # 已有的类别直接取编码；类别表中只有字符串和空值，其他类型的值不会与之相等
+            try:
+                values.codes.append(self.index[value])
+                return
+            except KeyError:
+                if type(value) is str or value is None:
+                    code = len(values.categories)
+                    if code < MAX_CATEGORIES or code * 2 <= len(values.codes):
+                        self.index[value] = code
+                        values.categories.append(value)
+                        values.codes.append(code)
+                        return
+                    # 取值几乎各不相同，字典编码没有收益
+            except TypeError:
+                # 不可哈希的值（对象、数组）
+                pass
+            self._to_list(value)
+            return
+        value_type = type(value)
+        if value_type is int:
+            try:
+                values.append(value)
+                return
+            except OverflowError:
+                pass
+        elif value_type is float:
+            if values.typecode == 'q':
+                # 与 pandas 一致：整数列中出现小数时整列提升为浮点数
+                self.values = values = array('d', values)
+            values.append(value)
+            return
+        elif not values and (value_type is str or value is None):
+            # 类别字段（name_key、group_key）的取值大量重复，每个不同的字符串只保存一次
+            self.values = CategoryColumn()
+            self.index = {}
+            self.append(value)
+            return
+        # 字符串、布尔、空值等无法用定长数组保存，退回普通列表
+        self._to_list(value)
+
+    def _to_list(self, value):
+        self.values = list(self.values)
+        self.values.append(value)
+        self.index = None
+
+
+class RecordSource:
+    """
+    逐条产生记录（dict）的数据源
+    先用 sample 读取少量样本供大模型判断字段，确定字段后再用 load 只读取需要的列，
+    整个过程中不会同时持有完整的记录列表
+    """
+
+    # iter_records 是否会产生全部记录（列式文件格式只在抽样时逐行读取）
+    streams_records = True
+
+    def iter_records(self):
+        raise NotImplementedError
+
+    def iter_rows(self, keys: list):
+        """逐条产生只包含指定字段的行（与 keys 顺序一致的值列表）"""
+        for item in self.iter_records():
+            if not isinstance(item, dict):
+                raise ChartDataError("数据中的每一项都必须是 JSON 对象")
+            yield [item.get(key) for key in keys]
+
+    def size_hint(self):
+        """原始输入的大小（字符数或字节数），未知时返回 None"""
+        return None
+
+    def record_width(self, record: dict) -> int:
+        """一条记录在原始输入中大约占用的长度"""
+        return len(json.dumps(record, ensure_ascii=False, default=str)) + 1
+
+    def estimate_rows(self, sample_records: list):
+        """按原始输入大小与样本记录的平均长度估算总行数，无法估算时返回 None"""
+        size = self.size_hint()
+        if size is None or not sample_records:
+            return None
+        width = sum(self.record_width(record) for record in sample_records) / len(sample_records)
+        return max(len(sample_records), int(size / max(width, 1)))
+
+    def sample(self, limit: int = 20) -> list:
+        """按原始顺序返回前 limit 条不重复的记录，读满后立即停止解析"""
+        samples = []
+        seen = set()
+        for item in self.iter_records():
+            if not isinstance(item, dict):
+                raise ChartDataError("数据中的每一项都必须是 JSON 对象")
+            key = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+            if key in seen:
+                continue
+            seen.add(key)
+            samples.append(item)
+            if len(samples) >= limit:
+                break
+        return samples
+
+    def load(self, keys: list, stride: int = 1) -> dict:
+        """
+        流式读取指定字段，直接写入列缓冲区；数据中完全不存在的字段不会出现在结果中
+        stride 大于 1 时每 stride 行只读取一行（按内存上限抽样）
+        """
+        keys = list(dict.fromkeys(key for key in keys if key))
+        buffers = [(key, ColumnBuffer()) for key in keys]
+        missing = set(keys)
+        for item in islice(self.iter_records(), 0, None, stride):
+            if not isinstance(item, dict):
+                raise ChartDataError("数据中的每一项都必须是 JSON 对象")
+            if missing:
+                missing.difference_update(item.keys())
+            for key, buffer in buffers:
+                buffer.append(item.get(key))
+        return {key: buffer.values for key, buffer in buffers if key not in missing}
+
+
+class JsonArraySource(RecordSource):
+    """顶层为 JSON 数组的字符串，逐个元素解析，不会一次性构建整个列表"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def size_hint(self):
+        return len(self.text)
+
+    def iter_records(self):
+        text = self.text
+        end = len(text)
+        idx = _WHITESPACE.match(text, 0).end()
+        if idx >= end or text[idx] != '[':
+            raise ChartDataError("图表数据不是有效的 JSON 格式: 顶层必须是数组")
+        idx = _WHITESPACE.match(text, idx + 1).end()
+        if idx < end and text[idx] == ']':
+            return
+        try:
+            while True:
+                item, idx = _decoder.raw_decode(text, idx)
+                yield item
+                idx = _WHITESPACE.match(text, idx).end()
+                if idx < end and text[idx] == ',':
+                    idx = _WHITESPACE.match(text, idx + 1).end()
+                elif idx < end and text[idx] == ']':
+                    break
+                else:
+                    raise json.JSONDecodeError("Expecting ',' delimiter", text, idx)
+            if _WHITESPACE.match(text, idx + 1).end() != end:
+                raise json.JSONDecodeError("Extra data", text, idx + 1)
+        except json.JSONDecodeError as e:
+            raise ChartDataError(f"图表数据不是有效的 JSON 格式: {e}") from e
+
+
+def find_record_array(document, segments: tuple = ()) -> tuple:
+    """在 JSON 对象中查找元素最多的对象数组（如接口返回的 data.items），返回 (路径段, 数组)，找不到时数组为 None"""
+    best_segments, best = segments, None
+    if isinstance(document, list):
+        if document and isinstance(document[0], dict):
+            return segments, document
+        return best_segments, best
+    if isinstance(document, dict):
+        for key, value in document.items():
+            found_segments, found = find_record_array(value, segments + (key,))
+            if found is not None and (best is None or len(found) > len(best)):
+                best_segments, best = found_segments, found
+    return best_segments, best
+
+
+class RecordListSource(RecordSource):
+    """已经解析好的记录列表，或 {字段名: 值列表} 形式的列式数据，或包裹着对象数组的 JSON 对象"""
+
+    def __init__(self, data):
+        # 包裹在对象中的对象数组（如 {"code": 0, "data": {"items": [...]}}），直接使用其中的数组
+        self.record_path = None
+        if isinstance(data, dict) and not all(isinstance(values, list) for values in data.values()):
+            segments, records = find_record_array(data)
+            if records is not None:
+                self.record_path = ".".join(str(segment) for segment in segments)
+                data = records
+        self.data = data
+
+    def iter_records(self):
+        data = self.data
+        if isinstance(data, dict):
+            if not all(isinstance(values, list) for values in data.values()):
+                raise ChartDataError("JSON 对象形式的数据必须是 {字段名: 值列表}，或包含对象数组")
+            keys = list(data)
+            for row in zip(*data.values()):
+                yield dict(zip(keys, row))
+        elif isinstance(data, list):
+            yield from data
+        else:
+            raise ChartDataError("图表数据必须是 JSON 数组")
+
+    def _is_columns(self) -> bool:
+        return isinstance(self.data, dict) and all(isinstance(values, list) for values in self.data.values())
+
+    def estimate_rows(self, sample_records: list):
+        # 数据已经解析好，行数是确定的
+        if self._is_columns():
+            return len(next(iter(self.data.values()), []))
+        return len(self.data) if isinstance(self.data, list) else None
+
+    def iter_rows(self, keys: list):
+        if self._is_columns():
+            rows = self.estimate_rows(None)
+            columns = [self.data[key] if key in self.data else [None] * rows for key in keys]
+            return map(list, zip(*columns))
+        return super().iter_rows(keys)
+
+    def load(self, keys: list, stride: int = 1) -> dict:
+        if isinstance(self.data, dict):
+            # 列式数据直接取列，不需要逐行转换
+            return {key: self.data[key][::stride] if stride > 1 else self.data[key]
+                    for key in dict.fromkeys(keys) if key in self.data}
+        return super().load(keys, stride)
+
+
+def open_json_source(chart_data) -> RecordSource:
+    """根据 chart_data 的形式创建数据源：顶层数组的字符串按元素流式解析，其他 JSON 整体解析"""
+    if isinstance(chart_data, str):
+        idx = _WHITESPACE.match(chart_data, 0).end()
+        if chart_data[idx:idx + 1] == '[':
+            return JsonArraySource(chart_data)
+        try:
+            chart_data = json.loads(chart_data)
+        except json.JSONDecodeError as e:
+            raise ChartDataError(f"图表数据不是有效的 JSON 格式: {e}") from e
+    return RecordListSource(chart_data)
@@ -1,25 +1,37 @@
 from utils.chart import generate_colors, auto_detect_keys
-import json
+from utils.columns import as_columns, column_length, distinct_values, pivot_rows
+from utils.quantize import quantize_columns
+from utils.serialize import dumps_config
+from utils.timeaxis import resample_time_series, time_axis_config
 
 def generate_echarts_line(
-    data_list: list,
+    data_list,
     name_key: str = None,
     value_keys: list = None,
     title: str = None,
     series_names: list = None,
     saturation=0.5,  # 新增饱和度参数
     brightness=0.95,  # 新增亮度参数
-    group_key=None  # 新增分组参数
+    group_key=None,  # 新增分组参数
+    time_bucket=None,  # 时间粒度：auto/raw/minute/hour/day/week，为空时不识别时间字段
+    time_agg="mean",  # 同一时间粒度内的聚合方式：sum/mean/max
+    precision=None,  # 数值精度：auto、小数位数（如 2）或有效数字（如 4s），为空时保留原始数值
+    compact=False,  # 为 True 时输出不带缩进的紧凑 JSON
+    chunked=False  # 为 True 时返回 JSON 文本片段的生成器，用于分段输出
 ) -> str:
     """生成通用 ECharts 折线图配置，支持自动推断字段和多维数据，支持按字段分组"""
     if not data_list:
         raise ValueError("数据列表不能为空")
+    # 统一转换为列式数据 {字段名: 值列表}，data_list 也可以直接传入列式数据
+    columns = as_columns(data_list)
+    if not column_length(columns):
+        raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(columns)
     
     if not value_keys:
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(columns)
         value_keys = [value_key]
     
     if series_names is None:
@@ -31,7 +43,7 @@ def generate_echarts_line(
         required_fields.append(group_key)
     
     for field in required_fields:
-        if field not in data_list[0]:
+        if field not in columns:
             raise KeyError(f"数据中未找到字段: '{field}'")
     
     # 构造配置
@@ -59,13 +71,72 @@ def generate_echarts_line(
         "series": []
     }
     
+    # name_key 为时间字段时使用时间轴，并按时间粒度聚合，避免每行一个类目标签
+    time_series = None
+    if time_bucket:
+        time_series = resample_time_series(columns, name_key, value_keys, group_key, time_bucket, time_agg or "mean",
+                                           precision=precision)
+    if time_series is None:
+        # 按精度处理数值字段，auto 模式下每个系列按自身的取值范围计算小数位数
+        columns = quantize_columns(columns, value_keys, precision)
+
+    if time_series is not None:
+        _, series_by_group = time_series
+        groups = sorted(series_by_group, key=str)
+        
+        # 时间轴的数据点为 [时间, 值]，使用默认的提示框格式
+        config["tooltip"].pop("formatter", None)
+        config["xAxis"] = time_axis_config()
+        config["yAxis"] = {
+            "type": "value",
+            "splitLine": {
+                "show": True,
+                "lineStyle": {
+                    "color": ['#eee'],
+                    "type": 'dashed'
+                }
+            }
+        }
+        
+        color_list = generate_colors(len(groups) * len(value_keys), saturation=saturation, brightness=brightness)
+        legend_data = []
+        color_index = 0
+        for group in groups:
+            for i, value_key in enumerate(value_keys):
+                series_name = series_names[i] if i < len(series_names) else value_key
+                full_series_name = series_name if group is None else f"{group}-{series_name}"
+                series_config = {
+                    "name": full_series_name,
+                    "type": "line",
+                    "data": series_by_group[group][value_key],
+                    "smooth": True,
+                    "lineStyle": {
+                        "width": 2,
+                        "color": color_list[color_index]
+                    },
+                    "itemStyle": {
+                        "color": color_list[color_index]
+                    },
+                    "symbol": 'circle',
+                    "symbolSize": 8,
+                    "connectNulls": True  # 连接空值点
+                }
+                config["series"].append(series_config)
+                legend_data.append(full_series_name)
+                color_index += 1
+        
+        config["legend"]["data"] = legend_data
+        
+        # 自动生成标题
+        if not title:
+            title = f"{name_key} {', '.join(value_keys)}趋势折线图"
     # 按group_key分组生成多系列折线图
-    if group_key:
+    elif group_key:
         # 获取所有唯一的分组值
-        groups = list(set(item[group_key] for item in data_list))
+        groups = distinct_values(columns[group_key])
         groups.sort()  # 排序确保展示顺序一致
         # 获取所有唯一的x轴值
-        x_axis_data = list(set(item[name_key] for item in data_list))
+        x_axis_data = distinct_values(columns[name_key])
         x_axis_data.sort()  # 排序确保展示顺序一致
         
         # 为x轴配置
@@ -104,25 +175,17 @@ def generate_echarts_line(
         legend_data = []
         color_index = 0
         
+        # 每个分组在每个x轴值上首次出现的行号（不存在则为None），字典编码的列直接在编码上建立索引
+        pivot = pivot_rows(columns[group_key], columns[name_key], groups, x_axis_data)
+        
         # 为每个分组-指标组合生成一个系列
-        for group in groups:
-            # 过滤出该分组的数据
-            group_data = [item for item in data_list if item[group_key] == group]
+        for group, group_rows in zip(groups, pivot):
             
             # 为每个value_key生成一个系列
             for i, value_key in enumerate(value_keys):
-                # 为每个x轴值准备数据，确保顺序一致
-                series_data = []
-                for x_value in x_axis_data:
-                    # 查找对应的y值，如果不存在则用None表示
-                    found = False
-                    for item in group_data:
-                        if item[name_key] == x_value:
-                            series_data.append(item[value_key])
-                            found = True
-                            break
-                    if not found:
-                        series_data.append(None)
+                # 为每个x轴值准备数据，确保顺序一致，如果不存在则用None表示
+                values = columns[value_key]
+                series_data = [values[row] if row is not None else None for row in group_rows]
                 
                 # 使用series_names中的名称或默认名称
                 series_name = series_names[i] if i < len(series_names) else value_key
@@ -156,10 +219,10 @@ def generate_echarts_line(
             title = f"不同{group_key}的{', '.join(value_keys)}对比折线图"
     else:
         # 原有逻辑 - 基于value_keys生成多系列
-        x_axis_data = [item[name_key] for item in data_list]
+        x_axis_data = list(columns[name_key])
         series_data_list = []
         for value_key in value_keys:
-            series_data = [item[value_key] for item in data_list]
+            series_data = list(columns[value_key])
             series_data_list.append(series_data)
         
         # 自动生成标题
@@ -221,4 +284,4 @@ def generate_echarts_line(
     # 更新标题
     config["title"]["text"] = title
     
-    return json.dumps(config, indent=4, ensure_ascii=False)
\ No newline at end of file
+    return dumps_config(config, compact, chunked)
\ No newline at end of file
@@ -0,0 +1,192 @@
+import logging
+import math
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from utils.ingest import ChartDataError
+from utils.table import to_number
+
+logger = logging.getLogger(__name__)
+
+# 插件进程的内存上限（字节），与 manifest.yaml 中的 resource.memory 一致
+MEMORY_LIMIT = int(os.getenv("JSON2CHART_MEMORY_LIMIT", str(256 * 1024 * 1024)))
+# 预估峰值超过上限的该比例时触发策略，为框架和输出消息预留余量
+MEMORY_HEADROOM = 0.8
+# 超出上限时的处理方式：抽样读取、按类别汇总读取、拒绝生成
+MEMORY_POLICIES = ("sample", "aggregate", "reject")
+# 构建图表时的临时对象（数值列表、配置对象、序列化片段）与列数据本身合计，约为列数据的倍数（实测 1.2～2.0，留有余量）
+BUILD_FACTOR = 2.5
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_MB = 1024 * 1024
+
+
+class MemoryBudgetError(ChartDataError):
+    """预计内存超出上限，且处理方式为拒绝生成"""
+
+
+def peak_rss() -> int:
+    """进程的内存峰值（字节），优先读取 /proc/self/status 中的 VmHWM"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        # Linux 下 ru_maxrss 的单位为 KB
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return 0
+
+
+def current_rss() -> int:
+    """进程当前占用的物理内存（字节）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+class MemoryTracker:
+    """
+    记录一次调用中各阶段的内存占用，以及预估峰值与实际峰值
+    VmHWM 是整个进程的峰值，不能为单次调用重置（会影响同一进程中的其他调用），实际峰值取各阶段采样的最大值；
+    只有 VmHWM 在本次调用期间升高时，才说明进程峰值出现在本次调用中，此时也计入
+    """
+
+    def __init__(self, limit: int = MEMORY_LIMIT):
+        self.limit = limit
+        self.baseline = current_rss()
+        self.start_peak = peak_rss()
+        self.estimate = None
+        self.stages = []
+
+    def mark(self, stage: str) -> int:
+        """记录阶段结束时的内存占用"""
+        rss = current_rss()
+        self.stages.append((stage, rss))
+        return rss
+
+    def peak(self) -> int:
+        peaks = [self.baseline] + [rss for _, rss in self.stages]
+        process_peak = peak_rss()
+        if process_peak > self.start_peak:
+            peaks.append(process_peak)
+        return max(peaks)
+
+    def report(self) -> str:
+        stages = "、".join(f"{stage} {rss / _MB:.0f} MB" for stage, rss in self.stages)
+        estimate = f"{self.estimate / _MB:.0f} MB" if self.estimate is not None else "未知"
+        return (f"内存：预估峰值 {estimate}，实际峰值 {self.peak() / _MB:.0f} MB，上限 {self.limit / _MB:.0f} MB；"
+                f"开始时 {self.baseline / _MB:.0f} MB" + (f"，{stages}" if stages else ""))
+
+    def log(self):
+        logger.info(self.report())
+
+
+def _column_bytes(values: list) -> float:
+    """
+    一列数据在列缓冲区中每行占用的字节数：纯数值列存放在 array 中，其他列为对象列表
+    字符串列按字典编码保存，重复的取值不再占用内存，但样本无法反映整列的类别数，按每行一个字符串的上限估算
+    """
+    if all(type(value) in (int, float) for value in values):
+        return 8
+    total = 0
+    for value in values:
+        # None、布尔值是单例，只占列表中的一个指针
+        total += 8 if value is None or type(value) is bool else sys.getsizeof(value) + 8
+    return total / len(values)
+
+
+def row_bytes(sample_records: list, keys: list) -> float:
+    """按样本估算读取指定字段后每行占用的字节数"""
+    if not sample_records:
+        return 0
+    return sum(_column_bytes([record.get(key) for record in sample_records]) for key in keys)
+
+
+def estimate_load(source, sample_records: list, keys: list, baseline: int) -> tuple:
+    """
+    读取数据前估算内存占用
+    :return: (预估行数, 列数据字节数, 预估峰值字节数)，无法估算行数时返回 None
+    """
+    rows = source.estimate_rows(sample_records)
+    if rows is None:
+        return None
+    load_bytes = int(rows * row_bytes(sample_records, keys))
+    return rows, load_bytes, int(baseline + load_bytes * BUILD_FACTOR)
+
+
+def aggregate_rows(rows, name_key: str, value_keys: list, group_key: str, limit: int):
+    """
+    流式按 (name_key, group_key) 汇总数值字段（求和），不保留明细行
+    汇总后的行数超过 limit 时返回 None（类别太多，汇总无法减少数据量）
+    :param rows: 按 [name_key, group_key, *value_keys] 顺序产生的行，不分组时没有 group_key
+    """
+    totals = {}
+    offset = 2 if group_key else 1
+    width = len(value_keys)
+    for row in rows:
+        key = tuple(row[:offset])
+        sums = totals.get(key)
+        if sums is None:
+            if len(totals) >= limit:
+                return None
+            sums = totals[key] = [None] * width
+        for i in range(width):
+            number = to_number(row[offset + i])
+            if number is not None:
+                sums[i] = number if sums[i] is None else sums[i] + number
+    columns = {name_key: [key[0] for key in totals]}
+    if group_key:
+        columns[group_key] = [key[1] for key in totals]
+    for i, value_key in enumerate(value_keys):
+        columns[value_key] = [sums[i] for sums in totals.values()]
+    return columns
+
+
+def load_within_budget(source, sample_records: list, keys: list, name_key: str, value_keys: list,
+                       group_key: str = None, policy: str = "sample", can_aggregate: bool = True,
+                       tracker: MemoryTracker = None, limit: int = MEMORY_LIMIT) -> tuple:
+    """
+    读取图表需要的字段；预估峰值超过上限时按 policy 抽样读取、按类别汇总读取或拒绝生成
+    :param can_aggregate: 图表是否可以按类别汇总（散点图、直方图、箱线图需要明细数据，只能抽样）
+    :return: (列式数据, 说明)，未触发策略时说明为 None
+    """
+    if policy not in MEMORY_POLICIES:
+        raise ValueError(f"不支持的内存处理方式: {policy}，可选值为 {', '.join(MEMORY_POLICIES)}")
+    keys = [key for key in dict.fromkeys(keys) if key]
+    baseline = current_rss()
+    estimate = estimate_load(source, sample_records, keys, baseline)
+    if tracker is not None and estimate is not None:
+        tracker.estimate = estimate[2]
+    budget = limit * MEMORY_HEADROOM
+    if estimate is None or estimate[2] <= budget:
+        return source.load(keys), None
+
+    rows, load_bytes, peak = estimate
+    prefix = f"数据约 {rows} 行，预计内存峰值 {peak / _MB:.0f} MB，超过上限 {limit / _MB:.0f} MB 的 {MEMORY_HEADROOM:.0%}"
+    available = budget - baseline
+    if policy == "reject" or available <= 0:
+        raise MemoryBudgetError(f"{prefix}，已拒绝生成；请减少数据量，或把内存处理方式设置为抽样或汇总")
+    # 按剩余空间与预估占用的比例缩减行数
+    ratio = available / (load_bytes * BUILD_FACTOR)
+    limit_rows = max(1, int(rows * ratio))
+
+    if policy == "aggregate" and can_aggregate and name_key and value_keys:
+        row_keys = [name_key] + ([group_key] if group_key else []) + list(value_keys)
+        columns = aggregate_rows(source.iter_rows(row_keys), name_key, value_keys, group_key, limit_rows)
+        if columns is not None:
+            by = f"{name_key}和{group_key}" if group_key else name_key
+            return columns, f"{prefix}，已按{by}汇总数值字段（求和），汇总后 {len(columns[name_key])} 行"
+        prefix += "，类别过多无法汇总"
+
+    stride = max(2, math.ceil(1 / ratio))
+    return source.load(keys, stride), f"{prefix}，已每 {stride} 行抽取 1 行"
@@ -0,0 +1,239 @@
+import math
+import os
+import time
+from threading import Lock
+
+# 设置为 0 时不统计指标，调用中也不再为阶段计时（除非开启了 debug_trace）
+METRICS_ENV = "JSON2CHART_METRICS"
+# 阶段耗时的分桶上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 输出体积的分桶上限（字节）
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# 内存峰值的分桶上限（字节）
+MEMORY_BUCKETS = tuple(mb * 1024 * 1024 for mb in (32, 64, 96, 128, 160, 192, 224, 256, 384, 512))
+
+
+def metrics_enabled() -> bool:
+    return os.getenv(METRICS_ENV, "1") != "0"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+class Counter:
+    """只增不减的计数，按标签值分别累计"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            return [(self.name, _labels(self.labels, key), value) for key, value in sorted(self.values.items())]
+
+
+class Gauge(Counter):
+    """可增可减的当前值"""
+
+    kind = "gauge"
+
+    def set(self, *label_values, value: float):
+        with self._lock:
+            self.values[label_values] = value
+
+    def set_max(self, *label_values, value: float):
+        with self._lock:
+            self.values[label_values] = max(self.values.get(label_values, value), value)
+
+
+class Histogram:
+    """按上限分桶的分布，输出累计计数、总和与总数"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各桶计数..., 总和, 总数]
+        self.values = {}
+        self._lock = Lock()
+
+    def observe(self, *label_values, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            state = self.values.get(label_values)
+            if state is None:
+                state = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> list:
+        samples = []
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self.values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state):
+                cumulative += count
+                le = 'le="' + _number(float(bound)) + '"'
+                samples.append((f"{self.name}_bucket", _labels(self.labels, key, le), cumulative))
+            samples.append((f"{self.name}_sum", _labels(self.labels, key), round(state[-2], 6)))
+            samples.append((f"{self.name}_count", _labels(self.labels, key), state[-1]))
+        return samples
+
+
+class Registry:
+    """进程内的指标集合；collector 在输出时调用，用于读取其他模块自己维护的统计（如缓存命中数）"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式（0.0.4）输出全部指标"""
+        metrics = list(self.metrics)
+        for collector in self.collectors:
+            metrics.extend(collector())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+INVOCATIONS = REGISTRY.register(Counter(
+    "json2chart_invocations_total", "工具调用次数，status 为 ok、rejected（按策略拒绝生成，没有图表）或 error", ("status",)))
+CHARTS = REGISTRY.register(Counter(
+    "json2chart_charts_total", "按图表类型统计的图表生成次数", ("chart_type", "status")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "json2chart_stage_duration_seconds", "各阶段耗时（秒）", ("stage",)))
+INVOCATION_SECONDS = REGISTRY.register(Histogram(
+    "json2chart_invocation_duration_seconds", "一次调用的总耗时（秒）"))
+LLM_CALLS = REGISTRY.register(Counter(
+    "json2chart_llm_calls_total", "调用大模型的次数（命中决策缓存时不调用）"))
+LLM_FAILURES = REGISTRY.register(Counter(
+    "json2chart_llm_failures_total", "大模型调用失败或返回内容无法使用的次数", ("reason",)))
+FALLBACKS = REGISTRY.register(Counter(
+    "json2chart_fallback_total", "降级处理的次数，path 为自动检测字段、内存策略、系列上限、输出体积缩减、文本输出等", ("path",)))
+OUTPUT_BYTES = REGISTRY.register(Histogram(
+    "json2chart_output_bytes", "每次调用输出的图表配置字节数", buckets=BYTES_BUCKETS))
+PEAK_MEMORY = REGISTRY.register(Histogram(
+    "json2chart_peak_memory_bytes", "每次调用的进程内存峰值（字节）", buckets=MEMORY_BUCKETS))
+MAX_PEAK_MEMORY = REGISTRY.register(Gauge(
+    "json2chart_max_peak_memory_bytes", "进程启动以来单次调用的最大内存峰值（字节）"))
+
+
+def _cache_metrics() -> list:
+    """决策缓存与调色板缓存的命中情况，直接读取各自维护的计数"""
+    from utils.chart import _palette
+    from utils.decisions import get_decision_cache
+
+    requests = Counter("json2chart_cache_requests_total", "缓存查询次数，result 为 hit 或 miss", ("cache", "result"))
+    ratio = Gauge("json2chart_cache_hit_ratio", "缓存命中率", ("cache",))
+    decision_cache = get_decision_cache()
+    palette = _palette.cache_info()
+    for cache, hits, misses in (("decision", decision_cache.hits, decision_cache.misses),
+                                ("palette", palette.hits, palette.misses)):
+        requests.inc(cache, "hit", amount=hits)
+        requests.inc(cache, "miss", amount=misses)
+        ratio.set(cache, value=round(hits / (hits + misses), 4) if hits + misses else 0.0)
+    return [requests, ratio]
+
+
+REGISTRY.add_collector(_cache_metrics)
+
+
+class Invocation:
+    """一次工具调用的统计，调用结束时（包括提前返回和异常）调用 finish 记入进程级指标"""
+
+    def __init__(self, trace=None, memory=None, enabled: bool = None):
+        self.enabled = metrics_enabled() if enabled is None else enabled
+        self.trace = trace
+        self.memory = memory
+        self.started = time.perf_counter()
+        self.status = "error"
+        self.charts = []
+        self.output_bytes = 0
+
+    def chart(self, chart_type: str, ok: bool = True):
+        self.charts.append((chart_type, "ok" if ok else "error"))
+
+    def llm_call(self):
+        if self.enabled:
+            LLM_CALLS.inc()
+
+    def llm_failure(self, reason: str):
+        if self.enabled:
+            LLM_FAILURES.inc(reason)
+
+    def fallback(self, path: str):
+        if self.enabled:
+            FALLBACKS.inc(path)
+
+    def output(self, text: str):
+        if self.enabled:
+            self.output_bytes += len(text.encode("utf-8"))
+
+    def finish(self):
+        if not self.enabled:
+            return
+        INVOCATIONS.inc(self.status)
+        INVOCATION_SECONDS.observe(value=time.perf_counter() - self.started)
+        for chart_type, status in self.charts:
+            CHARTS.inc(chart_type, status)
+        if self.trace is not None and self.trace.enabled:
+            for record in self.trace.spans:
+                STAGE_SECONDS.observe(record["name"], value=record["ms"] / 1000)
+        if self.output_bytes:
+            OUTPUT_BYTES.observe(value=self.output_bytes)
+        if self.memory is not None:
+            peak = self.memory.peak()
+            PEAK_MEMORY.observe(value=peak)
+            MAX_PEAK_MEMORY.set_max(value=peak)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
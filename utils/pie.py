@@ -1,24 +1,33 @@
 from utils.chart import generate_colors, auto_detect_keys
-import json
+from utils.columns import as_columns, column_length
+from utils.quantize import quantize_columns
+from utils.serialize import dumps_config
 
 def generate_echarts_pie(
-    data_list: list,
+    data_list,
     name_key: str = None,
     value_keys: list = None,
     title: str = None,
     series_names: list = None,
     saturation=0.5,  # 新增饱和度参数
-    brightness=0.95  # 新增亮度参数
+    brightness=0.95,  # 新增亮度参数
+    precision=None,  # 数值精度：auto、小数位数（如 2）或有效数字（如 4s），为空时保留原始数值
+    compact=False,  # 为 True 时输出不带缩进的紧凑 JSON
+    chunked=False  # 为 True 时返回 JSON 文本片段的生成器，用于分段输出
 ) -> str:
     """生成通用 ECharts 饼图配置，支持自动推断字段和多维数据"""
     if not data_list:
         raise ValueError("数据列表不能为空")
+    # 统一转换为列式数据 {字段名: 值列表}，data_list 也可以直接传入列式数据
+    columns = as_columns(data_list)
+    if not column_length(columns):
+        raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(columns)
     
     if not value_keys:
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(columns)
         value_keys = [value_key]
     
     if series_names is None:
@@ -26,14 +35,17 @@ def generate_echarts_pie(
     
     # 验证字段存在
     for value_key in value_keys:
-        if value_key not in data_list[0] or name_key not in data_list[0]:
+        if value_key not in columns or name_key not in columns:
             raise KeyError(f"数据中未找到推断的字段: '{value_key}' 或 '{name_key}'")
     
+    # 按精度处理数值字段，auto 模式下每个系列按自身的取值范围计算小数位数
+    columns = quantize_columns(columns, value_keys, precision)
+    names = columns[name_key]
     all_echarts_data = []
     for value_key in value_keys:
         echarts_data = [
-            {"value": item[value_key], "name": item[name_key]}
-            for item in data_list
+            {"value": value, "name": name}
+            for value, name in zip(columns[value_key], names)
         ]
         all_echarts_data.append(echarts_data)
     
@@ -41,14 +53,14 @@ def generate_echarts_pie(
     if not title:
         title = f"{name_key} {', '.join(value_keys)}分布饼图"
 
-    legend_data = [item[name_key] for item in data_list]
+    legend_data = list(names)
 
     max_radius = 70  # 最大半径
     min_radius = 30   # 最小内径
     ring_width = (max_radius - min_radius) / len(all_echarts_data) if len(all_echarts_data) > 1 else 20
 
     # 生成颜色列表，按数据项数量生成，传入饱和度和亮度
-    color_list = generate_colors(len(data_list), saturation=saturation, brightness=brightness)
+    color_list = generate_colors(len(names), saturation=saturation, brightness=brightness)
 
     # 构造单个配置对象
     config = {
@@ -116,14 +128,14 @@ def generate_echarts_pie(
             },
             "data": [
                 {
-                    "value": item[value_keys[i]],
-                    "name": item[name_key],
+                    "value": value,
+                    "name": name,
                     # 保持颜色与图例一致
                     "itemStyle": {"color": color_list[j]}
                 }
-                for j, item in enumerate(data_list)
+                for j, (value, name) in enumerate(zip(columns[value_keys[i]], names))
             ]
         }
         config["series"].append(series_config)
 
-    return json.dumps(config, indent=4, ensure_ascii=False)
\ No newline at end of file
+    return dumps_config(config, compact, chunked)
\ No newline at end of file
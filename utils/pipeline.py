@@ -0,0 +1,278 @@
+import json
+import os
+import re
+
+from utils.columns import column_length
+from utils.executor import make_chart_job
+from utils.governor import OUTPUT_BUDGET, govern_job
+from utils.guardrail import SERIES_BUDGET, apply_series_budget, group_cardinality
+from utils.memory import MEMORY_HEADROOM, MEMORY_LIMIT, current_rss, estimate_load, load_within_budget
+from utils.registry import get_chart_type
+from utils.prompt import SYSTEM_PROMPT, completion_params, user_prompt
+from utils.table import has_numeric
+from utils.trace import NULL_TRACE
+
+# 字段选择结果必须包含的字段
+REQUIRED_FIELDS = ("chart_type", "chart_title", "name_key", "value_keys", "series_names")
+# 生成图表时的默认参数，调用方按需覆盖
+DEFAULT_OPTIONS = {
+    "saturation": 0.5,
+    "brightness": 0.95,
+    "time_bucket": "auto",
+    "time_agg": "mean",
+    "precision": "auto",
+    "series_budget": SERIES_BUDGET,
+    "series_overflow": "fold",
+    "output_budget": OUTPUT_BUDGET,
+}
+# 等待大模型时预读字段的条件：样本中的字段数（嵌套数据为展开后的路径数）不超过该值，为 0 时不预读；
+# 字段多的宽数据中图表只用到少数几列，预读全部字段会浪费内存
+PREFETCH_MAX_KEYS = int(os.getenv("JSON2CHART_PREFETCH_MAX_KEYS", "8"))
+# 预读的列数据预计占用不超过内存上限的该比例，多个调用同时预读时合计也不会逼近上限
+PREFETCH_SHARE = 0.1
+
+
+def split_chart_types(chart_type) -> list:
+    """用户可以用逗号等分隔符一次指定多个图表类型，此时对同一份数据分别生成多个图表"""
+    return [t.strip() for t in re.split(r"[,，、;；]", chart_type or "") if t.strip()]
+
+
+def request_decision(llm, model: dict, chart_type, chart_title, sample_records: list) -> str:
+    """
+    调用大模型选择字段，返回大模型输出的文本
+    :param llm: Dify 会话中的 session.model.llm
+    """
+    from dify_plugin.entities.model.llm import LLMModelConfig
+    from dify_plugin.entities.model.message import SystemPromptMessage, UserPromptMessage
+
+    response = llm.invoke(
+        model_config=LLMModelConfig(
+            provider=model.get('provider'),
+            model=model.get('model'),
+            mode=model.get('mode'),
+            completion_params=completion_params(model),
+        ),
+        prompt_messages=[
+            SystemPromptMessage(content=SYSTEM_PROMPT),
+            UserPromptMessage(content=user_prompt(chart_type, chart_title, sample_records)),
+        ],
+        stream=False
+    )
+    return response.message.content
+
+
+def parse_decision(decision) -> dict:
+    """
+    校验字段选择结果（大模型输出的 JSON 文本、缓存或调用方给出的字典）
+    :return: 只包含图表需要的字段的字典，group_key 可选
+    """
+    if isinstance(decision, str):
+        decision = json.loads(decision)
+    if not isinstance(decision, dict):
+        raise ValueError("字段选择结果必须是 JSON 对象")
+    for field in REQUIRED_FIELDS:
+        if field not in decision:
+            raise ValueError(f"大模型返回的 JSON 缺少必要字段: {field}")
+    if len(decision["value_keys"]) != len(decision["series_names"]):
+        raise ValueError("value_keys 和 series_names 的长度不一致")
+    parsed = {field: decision[field] for field in REQUIRED_FIELDS}
+    parsed["group_key"] = decision.get("group_key")
+    return parsed
+
+
+def explicit_decision(spec: dict):
+    """
+    调用方直接给出了图表类型和字段时，不需要大模型选择；字段不完整时返回 None
+    series_names 缺省时与 value_keys 相同，chart_title 缺省时按字段生成
+    """
+    chart_types = split_chart_types(spec.get("chart_type"))
+    value_keys = spec.get("value_keys")
+    if isinstance(value_keys, str):
+        value_keys = [value_keys]
+    if not chart_types or not value_keys:
+        return None
+    name_key = spec.get("name_key") or None
+    if name_key is None and needs_name_key(chart_types):
+        return None
+    series_names = spec.get("series_names") or list(value_keys)
+    return parse_decision({
+        "chart_type": spec.get("chart_type"),
+        "chart_title": spec.get("chart_title") or f"{name_key or value_keys[0]} 数据分析图表",
+        "name_key": name_key,
+        "value_keys": list(value_keys),
+        "series_names": list(series_names),
+        "group_key": spec.get("group_key") or None,
+    })
+
+
+def auto_decision(sample_records: list, chart_type=None, chart_title=None) -> dict:
+    """不使用大模型、按样本自动检测字段，作为大模型配置无效时的后备方案；无法检测时抛出 ValueError"""
+    from utils.chart import auto_detect_keys
+    # 自动检测合适的字段（auto_detect_keys 只返回一个数值字段）
+    try:
+        name_key, value_key = auto_detect_keys(sample_records)
+        value_keys = [value_key]
+    except ValueError:
+        # 只有数值字段、没有类别字段时，逐行画柱状图或散点图没有意义，改为统计第一个数值字段的分布
+        sample_keys = dict.fromkeys(key for item in sample_records for key in item)
+        numeric_keys = [key for key in sample_keys if has_numeric([item.get(key) for item in sample_records])]
+        if not numeric_keys:
+            raise
+        name_key = None
+        value_keys = numeric_keys[:1]
+        spec = get_chart_type(chart_type)
+        if spec is None or spec.uses_name_key:
+            chart_type = "直方图"
+
+    # 根据检测到的字段自动选择图表类型
+    if chart_type is None:
+        if len(value_keys) >= 3:
+            chart_type = "雷达图"
+        elif len(value_keys) == 2:
+            chart_type = "散点图"
+        else:
+            chart_type = "柱状图"
+    # 重新设置图表标题（如果未指定）
+    if chart_title is None:
+        chart_title = f"{name_key or value_keys[0]} 数据分析图表"
+    # 自动检测模式下暂不支持group_key
+    return {"chart_type": chart_type, "chart_title": chart_title, "name_key": name_key,
+            "value_keys": value_keys, "series_names": list(value_keys), "group_key": None}
+
+
+def chart_keys(chart_types: list, name_key: str, value_keys: list, group_key: str, sample_records: list) -> list:
+    """图表需要读取的字段；数值字段不足、需要构建函数自动补充时（如散点图），保留样本中出现的全部字段"""
+    keys = [name_key] + list(value_keys) + [group_key]
+    specs = [get_chart_type(chart_type) for chart_type in chart_types]
+    if any(spec is not None and spec.needs_all_columns(value_keys) for spec in specs):
+        for item in sample_records:
+            keys.extend(item.keys())
+    return keys
+
+
+def can_aggregate(chart_types: list) -> bool:
+    """按类目展示的图表可以先按类别汇总再绘制；散点图、直方图、箱线图需要明细数据"""
+    specs = [get_chart_type(chart_type) for chart_type in chart_types]
+    return all(spec is not None and spec.output_layout in ("category", "items", "cells") for spec in specs)
+
+
+def needs_name_key(chart_types: list) -> bool:
+    """直方图、箱线图只统计数值分布，不需要类别字段"""
+    specs = [get_chart_type(chart_type) for chart_type in chart_types]
+    return any(spec is None or spec.uses_name_key for spec in specs)
+
+
+def prefetch_columns(source, sample_records: list, memory=None, trace=NULL_TRACE):
+    """
+    等待大模型选择字段时，预先读取样本中出现的全部字段，选择结果返回后直接取用，不再重新解析数据
+    只对窄数据预读：字段数超过 PREFETCH_MAX_KEYS、无法估算行数、预计列数据超过内存上限的 PREFETCH_SHARE
+    或预估峰值超过内存上限的余量时不预读（之后只读取图表需要的字段）；预读失败时返回 None，由正常读取报告错误
+    :return: {"keys": 预读的字段, "columns": 列式数据} 或 None
+    """
+    keys = list(dict.fromkeys(key for item in sample_records for key in item))
+    limit = memory.limit if memory is not None else MEMORY_LIMIT
+    if not keys or len(keys) > PREFETCH_MAX_KEYS:
+        return None
+    try:
+        with trace.span("prefetch") as span:
+            estimate = estimate_load(source, sample_records, keys, current_rss())
+            if estimate is None or estimate[1] > limit * PREFETCH_SHARE or estimate[2] > limit * MEMORY_HEADROOM:
+                span.set(skipped=True)
+                return None
+            columns = source.load(keys)
+            span.set(rows=column_length(columns), columns=len(columns))
+    except Exception:
+        return None
+    if memory is not None:
+        memory.estimate = estimate[2]
+    return {"keys": set(keys), "columns": columns}
+
+
+def load_chart_data(source, sample_records: list, chart_types: list, decision: dict, memory_policy: str = "sample",
+                    memory=None, trace=NULL_TRACE, prefetched: dict = None, **span_attrs) -> tuple:
+    """
+    只读取图表需要的列；先按样本估算内存，超出上限时按 memory_policy 抽样、汇总或拒绝，而不是在读取中途被终止
+    prefetched 为 prefetch_columns 的结果，包含需要的全部字段时直接从中取列
+    :return: (列式数据, 内存策略的说明)，未触发策略时说明为 None
+    """
+    name_key, value_keys, group_key = decision["name_key"], decision["value_keys"], decision["group_key"]
+    keys = chart_keys(chart_types, name_key, value_keys, group_key, sample_records)
+    if prefetched is not None and all(key in prefetched["keys"] for key in keys if key):
+        # 预读时内存预估没有超出上限，只取其中的部分字段同样不会超出，与 load_within_budget 未触发策略时的结果一致
+        with trace.span("load", prefetched=True, **span_attrs) as span:
+            columns = prefetched["columns"]
+            data_list = {key: columns[key] for key in dict.fromkeys(keys) if key and key in columns}
+            span.set(rows=column_length(data_list), columns=len(data_list))
+        if memory is not None:
+            memory.mark("加载数据")
+        return data_list, None
+    with trace.span("load", **span_attrs) as span:
+        data_list, notice = load_within_budget(source, sample_records, keys, name_key, value_keys, group_key,
+                                               memory_policy, can_aggregate(chart_types), memory)
+        span.set(rows=column_length(data_list), columns=len(data_list))
+    if memory is not None:
+        memory.mark("加载数据")
+    return data_list, notice
+
+
+def prepare_jobs(chart_types: list, data_list: dict, decision: dict, options: dict = None, trace=NULL_TRACE):
+    """
+    按图表类型校验字段、处理系列上限与输出体积上限，生成构建任务
+    依次产生 (类型, 内容)：message 为提示文本；series_budget、output_budget 为对应上限触发时的说明；
+    unsupported 为不支持的图表类型，此后不再产生任务；job 为 make_chart_job 生成的任务
+    """
+    options = dict(DEFAULT_OPTIONS, **(options or {}))
+    name_key, value_keys, group_key = decision["name_key"], decision["value_keys"], decision["group_key"]
+    validated_keys = set()
+    # 分组数只统计一次，所有图表共用
+    group_counts = group_cardinality(data_list, group_key) if group_key and group_key in data_list else None
+    for chart_type in chart_types:
+        # 按图表类型声明的字段要求调整数值字段（如饼图只取一个、雷达图至少三个）
+        spec = get_chart_type(chart_type)
+        if spec is None:
+            yield "unsupported", f"不支持的图表类型: {chart_type}"
+            return
+        job_value_keys, job_series_names, messages = spec.prepare_keys(name_key, value_keys, decision["series_names"], data_list)
+        for message in messages:
+            yield "message", message
+
+        # 验证字段是否为数值类型（多个图表共用的字段只验证一次）
+        with trace.span("validate", chart_type=spec.name):
+            for value_key in job_value_keys:
+                if value_key in validated_keys:
+                    continue
+                try:
+                    # 尝试将数据转换为数值类型，检查是否所有值都无法转换
+                    if not has_numeric(data_list[value_key]):
+                        raise ValueError(f"字段 {value_key} 无法转换为数值类型")
+                except Exception as e:
+                    raise ValueError(f"字段 {value_key} 不是有效的数值类型: {str(e)}")
+                validated_keys.add(value_key)
+
+        # 分组过多时按系列上限合并分组、改用热力图或拒绝生成
+        try:
+            spec, job_data, notice = apply_series_budget(spec, data_list, name_key, job_value_keys, group_key, group_counts,
+                                                         options["series_budget"], options["series_overflow"])
+        except ValueError as e:
+            yield "message", str(e)
+            continue
+        if notice:
+            yield "series_budget", notice
+
+        with trace.span("prepare_job", chart_type=spec.name):
+            job = make_chart_job(spec.name, job_data, name_key=name_key, title=decision["chart_title"],
+                                 value_keys=job_value_keys, series_names=job_series_names,
+                                 saturation=options["saturation"], brightness=options["brightness"],
+                                 group_key=group_key, time_bucket=options["time_bucket"],
+                                 time_agg=options["time_agg"], precision=options["precision"])
+
+        # 按输出体积上限调整任务，并说明采用了哪些缩减
+        with trace.span("govern", chart_type=spec.name) as span:
+            try:
+                job, notice = govern_job(job, options["output_budget"])
+            except Exception:
+                notice = None
+            span.set(reduced=notice is not None)
+        if notice:
+            yield "output_budget", notice
+        yield "job", job
@@ -0,0 +1,87 @@
+import hashlib
+import os
+
+from utils.table import records_to_markdown
+
+# 字段选择提示词的版本，修改提示词内容时递增
+PROMPT_VERSION = 1
+
+# 系统提示词：规则与示例都是固定内容，不带缩进，每次调用发送完全相同的字节，
+# 作为请求的固定前缀命中服务商的提示词缓存（前缀缓存按字节匹配，任何变化都会导致之后的内容无法命中）
+SYSTEM_PROMPT = """\
+你是一个专业的数据可视化专家，需要根据给定的 Markdown 表格数据，判断合适的横坐标和纵坐标，用于生成可视化图表。请遵循以下规则：
+1. 输出格式必须为 JSON，包含`chart_type`, `chart_title`, `name_key`, `value_keys`, `series_names` 字段。
+2. `chart_type` 的值为字符串，代表图表类型，目前支持"柱状图"、"折线图"、"饼状图"、"雷达图"、"漏斗图"、"散点图"、"直方图"、"箱线图"、"热力图"。若用户指定了图表类型，则按用户的来，若没有指定，则你根据表格样例信息自动判断。
+3. `chart_title` 的值为字符串，代表图表标题，若用户指定了标题，则按用户的来，若没有指定，则你根据表格样例信息自动生成。
+4. `name_key` 的值为一个字符串，代表横坐标的 key，必须为 Markdown 表格中已有的表头字段，且应为类别型数据。
+5. `value_keys` 的值为一个字符串数组，代表纵坐标的 key，这些 key 必须为 Markdown 表格中已有的表头字段，且必须为数值类型数据。
+6. `series_names` 的值为一个字符串数组，是 `value_keys` 对应 key 的中文翻译，与 `value_keys` 数组元素一一对应。
+7. `group_key` 的值为一个字符串（可选），代表用于分组的字段名。当数据需要按某个维度分组展示多系列图表时使用，如课程号、产品类别等。
+8. 请根据 markdown 表格数据内容，抓取对数据分析有展现价值的 key。
+9. 确保横纵坐标的选取有数据分析意义，避免选取序号等无分析价值的字段。
+10. 雷达图适合多维度对比分析，至少需要3个数值字段；散点图适合两个数值指标间的相关性分析，必须选择两个数值字段作为value_keys，name_key应选择类别型或ID型字段（不是数值字段）；漏斗图适合流程转化率分析，需要有明确的先后顺序。
+11. 饼图通常只使用一个数值字段和一个类别字段；柱状图和折线图适合展示类别与数值的关系；直方图适合查看单个数值字段的分布，箱线图适合比较多个数值字段或不同分组的数值分布，当数据只有数值字段、或每行都是独立样本（行数很多且没有合适的类别字段）时应优先使用这两种图表，此时 name_key 输出空字符串。
+12. 当数据中存在明显的分组维度（如多个课程、多个产品等）且需要比较它们在同一指标上的差异时，应识别出合适的`group_key`，group_key应是类别型字段。
+13. 当分组字段的取值很多、分组数乘以 value_keys 个数会超过 20 个系列时，不要使用分组的柱状图、折线图或雷达图，应使用热力图：name_key 为横轴类别字段，group_key 为纵轴类别字段，value_keys 只取一个数值字段。
+14. 对于散点图，当需要按类别区分不同数据点时，应将类别型字段设置为group_key，而不是name_key。
+15. 请仔细识别数据类型，确保value_keys只包含可以进行数学运算的数值字段，避免选择文本或混合类型字段。
+16. 只输出标准的 json 格式内容，不要包含```json```标签，不要输出其他任何文字。
+
+示例：
+表格数据：
+|产品|销量|利润|
+|---|---|---|
+|A|100|20|
+|B|200|50|
+|C|150|30|
+
+柱状图输出：
+{"chart_type":"柱状图","chart_title":"产品销量与利润分析","name_key":"产品","value_keys":["销量","利润"],"series_names":["销量","利润"]}
+
+饼图输出：
+{"chart_type":"饼状图","chart_title":"产品销量分布","name_key":"产品","value_keys":["销量"],"series_names":["销量"]}
+
+带分组的折线图输出（例如课程成绩数据）：
+{"chart_type":"折线图","chart_title":"各课程成绩对比","name_key":"score_month","value_keys":["score"],"series_names":["成绩"],"group_key":"course_no"}
+
+散点图输出（例如产品价格与销量关系分析）：
+{"chart_type":"散点图","chart_title":"产品价格与销量关系分析","name_key":"产品名称","value_keys":["价格(元)","月销量(台)"],"series_names":["价格(元)","月销量(台)"],"group_key":"品牌"}
+
+热力图输出（例如大量门店在各月份的销售额）：
+{"chart_type":"热力图","chart_title":"各门店月度销售额","name_key":"月份","value_keys":["销售额"],"series_names":["销售额"],"group_key":"门店"}"""
+
+# 提示词内容的摘要，与版本号一起标识固定前缀；忘记递增版本号时摘要同样会变化
+PROMPT_DIGEST = hashlib.sha1(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+PROMPT_ID = f"json2chart-selection-v{PROMPT_VERSION}-{PROMPT_DIGEST}"
+
+# 用户消息：所有可变内容都放在固定前缀之后，按变化从少到多排列，样例数据最长且每次不同，放在最后
+USER_TEMPLATE = "用户指定的类型：{chart_type}\n用户指定的标题：{chart_title}\n表格的样例数据:\n{sample}"
+
+# 服务商用于把请求路由到同一份前缀缓存的参数名（如 OpenAI 的 prompt_cache_key）
+CACHE_KEY_PARAMS = ("prompt_cache_key",)
+# 设置后总是在模型参数中加入该参数，值为 PROMPT_ID；未设置时只填写模型参数中已经出现但没有值的参数
+CACHE_KEY_PARAM_ENV = "JSON2CHART_PROMPT_CACHE_PARAM"
+
+
+def user_prompt(chart_type, chart_title, sample_records: list) -> str:
+    # 转换为类似 Markdown 格式
+    return USER_TEMPLATE.format(chart_type=chart_type, chart_title=chart_title,
+                                sample=records_to_markdown(sample_records))
+
+
+def completion_params(model: dict) -> dict:
+    """
+    调用大模型时的模型参数：在用户设置的参数上加入提示词缓存的提示
+    插件 SDK 的提示词消息不支持 cache_control 之类的标记，只能通过服务商支持的模型参数传递；
+    模型参数中出现缓存键参数（模型的参数规则支持该参数）或设置了 JSON2CHART_PROMPT_CACHE_PARAM 时，
+    填入固定前缀的标识，同一前缀的请求路由到同一份缓存；用户已经填写的值保持不变
+    """
+    params = dict(model.get("completion_params") or {})
+    names = [name for name in CACHE_KEY_PARAMS if name in params]
+    forced = os.getenv(CACHE_KEY_PARAM_ENV)
+    if forced:
+        names.append(forced)
+    for name in names:
+        if not params.get(name):
+            params[name] = PROMPT_ID
+    return params
@@ -0,0 +1,101 @@
+import math
+import re
+from array import array
+
+# auto 模式下保留的有效数字：按系列的取值范围计算小数位数，使范围内保留约 6 位有效数字
+AUTO_DIGITS = 6
+# 精度写法：auto、2（2 位小数）、2d（2 位小数）、4s（4 位有效数字）
+_PRECISION_PATTERN = re.compile(r'^\s*(\d+)\s*([dDsS]?)\s*$')
+
+
+def parse_precision(precision):
+    """
+    解析精度设置
+    :return: None（不处理）、("auto", None)、("decimals", 位数) 或 ("significant", 位数)
+    """
+    if precision is None or precision == "" or precision is False:
+        return None
+    if isinstance(precision, (int, float)) and not isinstance(precision, bool):
+        return "decimals", max(0, int(precision))
+    text = str(precision).strip().lower()
+    if text in ("auto", "自动"):
+        return "auto", None
+    if text in ("none", "off", "raw", "原始"):
+        return None
+    match = _PRECISION_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"无法识别的数值精度: {precision}，可选值为 auto、小数位数（如 2 或 2d）或有效数字（如 4s）")
+    digits, unit = int(match.group(1)), match.group(2)
+    if unit == "s":
+        return "significant", max(1, digits)
+    return "decimals", digits
+
+
+def _auto_decimals(values) -> int:
+    """按系列中小数的取值范围计算小数位数；范围为 0 时按最大绝对值计算"""
+    low = high = None
+    for value in values:
+        if type(value) is float and math.isfinite(value):
+            if low is None or value < low:
+                low = value
+            if high is None or value > high:
+                high = value
+    if low is None:
+        return None
+    span = high - low or max(abs(low), abs(high))
+    if span == 0:
+        return 0
+    return max(0, AUTO_DIGITS - 1 - math.floor(math.log10(span)))
+
+
+def make_quantizer(values, precision):
+    """
+    为一个系列生成取整函数，只处理小数，整数、文本和空值原样返回
+    精度为空或系列中没有小数时返回 None
+    """
+    parsed = parse_precision(precision)
+    if parsed is None or (isinstance(values, array) and values.typecode == 'q'):
+        return None
+    mode, digits = parsed
+    if mode == "auto":
+        digits = _auto_decimals(values)
+        if digits is None:
+            return None
+        mode = "decimals"
+
+    if mode == "significant":
+        def quantize(value):
+            if type(value) is float and math.isfinite(value):
+                return float(f"{value:.{digits}g}")
+            return value
+    elif digits == 0:
+        def quantize(value):
+            # 没有小数位时输出整数，省去 ".0"
+            if type(value) is float and math.isfinite(value):
+                return int(round(value))
+            return value
+    else:
+        def quantize(value):
+            if type(value) is float and math.isfinite(value):
+                return round(value, digits)
+            return value
+    return quantize
+
+
+def quantize_values(values, precision):
+    """按精度处理一列数值，不需要处理时原样返回"""
+    quantize = make_quantizer(values, precision)
+    if quantize is None:
+        return values
+    return [quantize(value) for value in values]
+
+
+def quantize_columns(columns: dict, keys: list, precision) -> dict:
+    """对指定的数值字段按精度处理（auto 模式下每个字段单独计算），返回新的列式数据，其他字段共享原数据"""
+    if parse_precision(precision) is None:
+        return columns
+    quantized = dict(columns)
+    for key in dict.fromkeys(keys):
+        if key in columns:
+            quantized[key] = quantize_values(columns[key], precision)
+    return quantized
@@ -1,25 +1,34 @@
 from utils.chart import generate_colors, auto_detect_keys
-import json
+from utils.columns import as_columns, column_length, decode_rows, distinct_values, group_rows
+from utils.quantize import quantize_columns
+from utils.serialize import dumps_config
 
 def generate_echarts_radar(
-    data_list: list,
+    data_list,
     name_key: str = None,
     value_keys: list = None,
     title: str = None,
     series_names: list = None,
     saturation=0.5,  # 新增饱和度参数
     brightness=0.95,  # 新增亮度参数
-    group_key: str = None  # 新增分组参数
+    group_key: str = None,  # 新增分组参数
+    precision=None,  # 数值精度：auto、小数位数（如 2）或有效数字（如 4s），为空时保留原始数值
+    compact=False,  # 为 True 时输出不带缩进的紧凑 JSON
+    chunked=False  # 为 True 时返回 JSON 文本片段的生成器，用于分段输出
 ) -> str:
     """生成通用 ECharts 雷达图配置，支持自动推断字段和多维数据，支持按字段分组"""
     if not data_list:
         raise ValueError("数据列表不能为空")
+    # 统一转换为列式数据 {字段名: 值列表}，data_list 也可以直接传入列式数据
+    columns = as_columns(data_list)
+    if not column_length(columns):
+        raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(columns)
     
     if not value_keys:
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(columns)
         value_keys = [value_key]
     
     if series_names is None:
@@ -31,11 +40,14 @@ def generate_echarts_radar(
         required_fields.append(group_key)
     
     for field in required_fields:
-        if field not in data_list[0]:
+        if field not in columns:
             raise KeyError(f"数据中未找到字段: '{field}'")
     
+    # 按精度处理数值字段，auto 模式下每个指标按自身的取值范围计算小数位数
+    columns = quantize_columns(columns, value_keys, precision)
+
     # 准备雷达图的数据结构
-    indicators = [{"name": value_key, "max": max(item[value_key] for item in data_list) * 1.1} for value_key in value_keys]
+    indicators = [{"name": value_key, "max": max(columns[value_key]) * 1.1} for value_key in value_keys]
     
     # 自动生成标题
     if not title:
@@ -87,7 +99,7 @@ def generate_echarts_radar(
     # 按group_key分组生成多系列雷达图
     if group_key:
         # 获取所有唯一的分组值
-        groups = list(set(item[group_key] for item in data_list))
+        groups = distinct_values(columns[group_key])
         groups.sort()  # 排序确保展示顺序一致
         
         # 动态生成颜色列表（按分组-指标组合数量生成）
@@ -98,10 +110,15 @@ def generate_echarts_radar(
         legend_data = []
         color_index = 0
         
+        # 一次遍历记录每个分组包含的行号（保持原始顺序）
+        rows_by_group = group_rows(columns[group_key])
+        names = columns[name_key]
+        
         # 为每个分组-指标组合生成一个系列
         for group in groups:
-            # 过滤出该分组的数据
-            group_data = [item for item in data_list if item[group_key] == group]
+            # 该分组各行的类别名称，字典编码的列直接查类别表，每个分组只解码一次
+            rows = rows_by_group[group]
+            group_names = decode_rows(names, rows)
             
             # 为每个value_key生成一个系列
             for i, value_key in enumerate(value_keys):
@@ -110,12 +127,12 @@ def generate_echarts_radar(
                 full_series_name = f"{group}-{series_name}"
                 
                 # 为该分组-指标组合构建雷达图数据
+                values = columns[value_key]
                 group_series_data = []
-                for item in group_data:
-                    item_data = [item[value_key]]
+                for row, name in zip(rows, group_names):
                     group_series_data.append({
-                        "value": item_data,
-                        "name": item[name_key]
+                        "value": [values[row]],
+                        "name": name
                     })
                 
                 series_config = {
@@ -149,19 +166,19 @@ def generate_echarts_radar(
         }
     else:
         # 原有逻辑 - 不分组的雷达图
+        names = columns[name_key]
         series_data = []
-        for item in data_list:
-            item_data = [item[value_key] for value_key in value_keys]
+        for row, item_data in enumerate(zip(*(columns[value_key] for value_key in value_keys))):
             series_data.append({
-                "value": item_data,
-                "name": item[name_key]
+                "value": list(item_data),
+                "name": names[row]
             })
         
         # 动态生成颜色列表
-        color_list = generate_colors(len(data_list), saturation=saturation, brightness=brightness)
+        color_list = generate_colors(len(names), saturation=saturation, brightness=brightness)
         
         config["legend"] = {
-            "data": [item[name_key] for item in data_list],
+            "data": list(names),
             "left": "center",
             "bottom": "0%",
             "textStyle": {
@@ -184,4 +201,4 @@ def generate_echarts_radar(
         config["series"].append(series_config)
         config["color"] = color_list
     
-    return json.dumps(config, indent=4, ensure_ascii=False)
\ No newline at end of file
+    return dumps_config(config, compact, chunked)
\ No newline at end of file
@@ -0,0 +1,386 @@
+import csv
+import io
+import json
+import os
+import re
+from array import array
+
+from utils.columns import CategoryColumn
+from utils.ingest import ChartDataError, RecordSource, open_json_source
+
+# 文件扩展名与数据格式的对应关系
+FORMAT_BY_EXTENSION = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".json": "json",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".parquet": "parquet",
+}
+
+FORMAT_BY_MIME_TYPE = {
+    "text/csv": "csv",
+    "text/tab-separated-values": "tsv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json": "json",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.parquet": "parquet",
+}
+
+
+# CSV 中按数字解析的文本：整数不能有前导零（"007" 之类的编号保持字符串），不接受下划线、nan、inf 等写法
+_INT_TEXT = re.compile(r'[+-]?(?:0|[1-9][0-9]*)')
+_FLOAT_TEXT = re.compile(r'[+-]?(?:(?:0|[1-9][0-9]*)(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?')
+
+
+def _parse_text_value(text: str):
+    """把 CSV 中的文本转换为数字，空字符串视为空值，其他保持字符串"""
+    if text == "":
+        return None
+    stripped = text.strip()
+    if _INT_TEXT.fullmatch(stripped):
+        return int(stripped)
+    if _FLOAT_TEXT.fullmatch(stripped):
+        return float(stripped)
+    return text
+
+
+class _FileSource(RecordSource):
+    """文件数据源，source 可以是本地路径或文件内容（bytes）"""
+
+    def __init__(self, source):
+        self.source = source
+
+    def open_binary(self):
+        if isinstance(self.source, (bytes, bytearray, memoryview)):
+            # BytesIO 与原始 bytes 共享内存，不会复制文件内容
+            return io.BytesIO(self.source)
+        return open(self.source, "rb")
+
+    def open_text(self):
+        return io.TextIOWrapper(self.open_binary(), encoding="utf-8-sig", newline="")
+
+    def size_hint(self):
+        if isinstance(self.source, (bytes, bytearray, memoryview)):
+            return len(self.source)
+        try:
+            return os.path.getsize(self.source)
+        except (OSError, TypeError):
+            return None
+
+
+class CsvSource(_FileSource):
+    """使用 csv 模块逐行读取，数字文本自动转换为数值"""
+
+    def __init__(self, source, delimiter: str = None):
+        super().__init__(source)
+        self.delimiter = delimiter
+
+    def record_width(self, record: dict) -> int:
+        # CSV 每行只有取值，没有字段名
+        return sum(len(str(value)) + 1 for value in record.values() if value is not None) + 1
+
+    def iter_records(self):
+        with self.open_text() as stream:
+            delimiter = self.delimiter
+            if delimiter is None:
+                head = stream.read(4096)
+                stream.seek(0)
+                try:
+                    delimiter = csv.Sniffer().sniff(head, delimiters=",;\t|").delimiter
+                except csv.Error:
+                    delimiter = ","
+            reader = csv.reader(stream, delimiter=delimiter)
+            header = next(reader, None)
+            if header is None:
+                return
+            for row in reader:
+                if not row:
+                    continue
+                yield {key: _parse_text_value(value) for key, value in zip(header, row)}
+
+
+class NdjsonSource(_FileSource):
+    """每行一个 JSON 对象，逐行解析"""
+
+    def iter_records(self):
+        with self.open_text() as stream:
+            for line_no, line in enumerate(stream, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ChartDataError(f"NDJSON 第 {line_no} 行不是有效的 JSON: {e}") from e
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ChartDataError("读取 Arrow/Parquet 文件需要安装 pyarrow：取消 requirements.txt 中 pyarrow 一行的注释后重新打包插件，"
+                             "或改用 CSV、NDJSON、JSON 格式") from e
+    return pyarrow
+
+
+def _arrow_column_values(column):
+    """把 Arrow 列转换为 Python 序列：无空值的数值列直接按内存拷贝到 array 中，其他列转换为 list"""
+    pa = _import_pyarrow()
+    column_type = column.type
+    if column.null_count == 0 and (pa.types.is_integer(column_type) or pa.types.is_floating(column_type)):
+        if pa.types.is_integer(column_type):
+            typecode, target = 'q', pa.int64()
+        else:
+            typecode, target = 'd', pa.float64()
+        if column_type != target:
+            column = column.cast(target)
+        values = array(typecode)
+        for chunk in column.chunks:
+            data = memoryview(chunk.buffers()[1])
+            values.frombytes(data[chunk.offset * 8:(chunk.offset + len(chunk)) * 8])
+        return values
+    if _is_string_type(column_type) or (pa.types.is_dictionary(column_type) and _is_string_type(column_type.value_type)):
+        return _arrow_category_values(column)
+    return column.to_pylist()
+
+
+def _is_string_type(data_type) -> bool:
+    pa = _import_pyarrow()
+    return pa.types.is_string(data_type) or pa.types.is_large_string(data_type)
+
+
+def _arrow_category_values(column) -> CategoryColumn:
+    """字符串列在 Arrow 中做字典编码，只有不同的字符串转换为 Python 对象，编码按内存拷贝；空值作为一个类别"""
+    pa = _import_pyarrow()
+    import pyarrow.compute as pc
+    # 文件中已经是字典类型的列，字典里可能有没有用到的取值
+    complete = not pa.types.is_dictionary(column.type)
+    if complete:
+        column = column.dictionary_encode()
+    # 各分块的字典合并为同一个，编码才能共用一张类别表
+    column = column.unify_dictionaries()
+    categories = column.chunks[0].dictionary.to_pylist() if column.num_chunks else []
+    null_code = len(categories)
+    if column.null_count:
+        categories.append(None)
+    codes = array('I')
+    for chunk in column.chunks:
+        indices = chunk.indices
+        if indices.null_count:
+            indices = pc.fill_null(indices, null_code)
+        indices = indices.cast(pa.uint32())
+        data = memoryview(indices.buffers()[1])
+        codes.frombytes(data[indices.offset * 4:(indices.offset + len(indices)) * 4])
+    return CategoryColumn(codes, categories, complete)
+
+
+def _flatten_table(table):
+    """把结构体（struct）列逐层展开为 父字段.子字段 形式的列"""
+    pa = _import_pyarrow()
+    while any(pa.types.is_struct(field.type) for field in table.schema):
+        table = table.flatten()
+    return table
+
+
+def _flat_field_names(fields, prefix: str = "") -> list:
+    """不读取数据，直接从 schema 中列出展开后的列名"""
+    pa = _import_pyarrow()
+    names = []
+    for field in fields:
+        name = prefix + field.name
+        if pa.types.is_struct(field.type):
+            names.extend(_flat_field_names(list(field.type), name + "."))
+        else:
+            names.append(name)
+    return names
+
+
+class _ArrowTableSource(RecordSource):
+    """
+    Arrow IPC 与 Parquet 的公共逻辑：样本只读取开头的少量行，load 只读取指定的列
+    结构体列展开为 父字段.子字段 形式，与嵌套 JSON 的路径写法一致
+    """
+
+    # 抽样时读取的最大行数
+    sample_rows = 1000
+    streams_records = False
+
+    def __init__(self, source):
+        self.source = source
+
+    def schema(self):
+        raise NotImplementedError
+
+    def schema_names(self) -> list:
+        return _flat_field_names(list(self.schema()))
+
+    def root_columns(self, keys: list) -> list:
+        """展开后的列名所属的顶层列"""
+        roots = []
+        for field in self.schema():
+            if any(key == field.name or key.startswith(field.name + ".") for key in keys):
+                roots.append(field.name)
+        return roots
+
+    def read_head(self, num_rows: int):
+        raise NotImplementedError
+
+    def read_columns(self, keys: list):
+        raise NotImplementedError
+
+    def iter_records(self):
+        yield from _flatten_table(self.read_head(self.sample_rows)).to_pylist()
+
+    def iter_rows(self, keys: list):
+        # 按批转换为 Python 对象，不会一次性转换整列
+        names = set(self.schema_names())
+        present = [key for key in dict.fromkeys(keys) if key in names]
+        table = _flatten_table(self.read_columns(self.root_columns(present)))
+        for batch in table.select(present).to_batches(max_chunksize=65536):
+            columns = batch.to_pydict()
+            values = [columns.get(key) or [None] * batch.num_rows for key in keys]
+            yield from map(list, zip(*values))
+
+    def estimate_rows(self, sample_records: list):
+        return self.row_count()
+
+    def row_count(self) -> int:
+        raise NotImplementedError
+
+    def load(self, keys: list, stride: int = 1) -> dict:
+        names = set(self.schema_names())
+        keys = [key for key in dict.fromkeys(keys) if key in names]
+        table = _flatten_table(self.read_columns(self.root_columns(keys)))
+        if stride > 1:
+            # 先在 Arrow 中抽取行，只转换被抽中的行
+            pa = _import_pyarrow()
+            table = table.take(pa.array(range(0, table.num_rows, stride)))
+        return {key: _arrow_column_values(table.column(key)) for key in keys}
+
+    def _buffer(self):
+        """路径使用内存映射打开，bytes 直接包装为 Arrow 缓冲区，二者都不会复制文件内容"""
+        pa = _import_pyarrow()
+        if isinstance(self.source, (bytes, bytearray, memoryview)):
+            return pa.BufferReader(pa.py_buffer(self.source))
+        return pa.memory_map(os.fspath(self.source), "r")
+
+
+class ArrowSource(_ArrowTableSource):
+    """Arrow IPC 文件（file 或 stream 格式）"""
+
+    def __init__(self, source):
+        super().__init__(source)
+        self._table = None
+
+    def _read_table(self):
+        """只打开一次：内存映射的表在数据源的生命周期内复用，抽样、估算行数和读取列不再重复打开文件"""
+        if self._table is None:
+            pa = _import_pyarrow()
+            import pyarrow.ipc
+            try:
+                self._table = pa.ipc.open_file(self._buffer()).read_all()
+            except pa.ArrowInvalid:
+                self._table = pa.ipc.open_stream(self._buffer()).read_all()
+        return self._table
+
+    def schema(self):
+        return self._read_table().schema
+
+    def row_count(self) -> int:
+        return self._read_table().num_rows
+
+    def read_head(self, num_rows: int):
+        return self._read_table().slice(0, num_rows)
+
+    def read_columns(self, keys: list):
+        # 内存映射读取是零拷贝的，select 只保留需要的列
+        return self._read_table().select(keys)
+
+
+class ParquetSource(_ArrowTableSource):
+    """Parquet 文件，按列读取，未选中的列不会被解码"""
+
+    def __init__(self, source):
+        super().__init__(source)
+        self._file = None
+
+    def _parquet_file(self):
+        """文件元数据只解析一次，之后按需读取行组和列"""
+        if self._file is None:
+            _import_pyarrow()
+            import pyarrow.parquet as pq
+            if isinstance(self.source, (bytes, bytearray, memoryview)):
+                self._file = pq.ParquetFile(self._buffer())
+            else:
+                self._file = pq.ParquetFile(os.fspath(self.source), memory_map=True)
+        return self._file
+
+    def schema(self):
+        return self._parquet_file().schema_arrow
+
+    def row_count(self) -> int:
+        # 行数记录在文件元数据中，不需要读取数据
+        return self._parquet_file().metadata.num_rows
+
+    def read_head(self, num_rows: int):
+        pa = _import_pyarrow()
+        parquet_file = self._parquet_file()
+        for batch in parquet_file.iter_batches(batch_size=num_rows):
+            return pa.Table.from_batches([batch])
+        return parquet_file.schema_arrow.empty_table()
+
+    def read_columns(self, keys: list):
+        return self._parquet_file().read(columns=keys)
+
+
+def detect_format(filename: str = None, mime_type: str = None, extension: str = None) -> str:
+    """根据文件名、扩展名或 MIME 类型判断数据格式"""
+    extensions = [os.path.splitext(filename)[1] if filename else None, extension]
+    for ext in extensions:
+        if ext:
+            ext = ext.lower() if ext.startswith(".") else "." + ext.lower()
+            if ext in FORMAT_BY_EXTENSION:
+                return FORMAT_BY_EXTENSION[ext]
+    if mime_type:
+        mime_type = mime_type.split(";")[0].strip().lower()
+        if mime_type in FORMAT_BY_MIME_TYPE:
+            return FORMAT_BY_MIME_TYPE[mime_type]
+    raise ChartDataError(f"不支持的文件格式: {filename or mime_type}，目前支持 CSV、TSV、NDJSON、JSON、Arrow IPC、Parquet")
+
+
+def open_source(source, data_format: str) -> RecordSource:
+    """按格式创建数据源，source 可以是本地路径或文件内容（bytes）"""
+    if data_format == "csv":
+        return CsvSource(source)
+    if data_format == "tsv":
+        return CsvSource(source, delimiter="\t")
+    if data_format == "ndjson":
+        return NdjsonSource(source)
+    if data_format == "arrow":
+        return ArrowSource(source)
+    if data_format == "parquet":
+        return ParquetSource(source)
+    if data_format == "json":
+        if not isinstance(source, (bytes, bytearray, memoryview)):
+            with open(source, "rb") as f:
+                source = f.read()
+        return open_json_source(bytes(source).decode("utf-8-sig"))
+    raise ChartDataError(f"不支持的文件格式: {data_format}")
+
+
+def open_file_source(file) -> RecordSource:
+    """根据 Dify 上传的文件对象或本地路径创建数据源"""
+    if isinstance(file, (str, os.PathLike)):
+        return open_source(file, detect_format(os.fspath(file)))
+    data_format = detect_format(getattr(file, "filename", None), getattr(file, "mime_type", None),
+                                getattr(file, "extension", None))
+    try:
+        blob = file.blob
+    except Exception as e:
+        raise ChartDataError(f"读取数据文件失败: {e}") from e
+    return open_source(blob, data_format)
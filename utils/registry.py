@@ -0,0 +1,145 @@
+import importlib
+from dataclasses import dataclass, field
+
+from utils.table import has_numeric
+
+
+@dataclass
+class ChartType:
+    """
+    图表类型的声明：构建函数、别名以及对字段的要求
+    构建函数以 "模块:函数" 字符串登记，第一次使用时才导入
+    """
+    name: str
+    builder: str
+    aliases: tuple = ()
+    # value_keys 的数量要求：少于 min 时报错，多于 max 时截断并提示
+    min_value_keys: int = 1
+    max_value_keys: int = None
+    too_few_message: str = None
+    too_many_message: str = None
+    supports_group: bool = True
+    # 构建函数需要的数值字段个数，不足时会从数据的其他字段中自动补充（散点图需要 x、y 两个数值轴）
+    auto_fill_value_keys: int = 0
+    # value_keys 只有一个时，若 name_key 是数值字段则把它作为第一个数值轴
+    numeric_name_key_axis: bool = False
+    # 分组时每个分组生成独立的系列（受系列上限约束）；value_keys_are_series 为 False 时数值字段是坐标轴而不是系列（散点图）
+    grouped_series: bool = False
+    value_keys_are_series: bool = True
+    # 是否需要类别字段 name_key（直方图、箱线图只统计数值分布）
+    uses_name_key: bool = True
+    # 输出体积的估算方式：category（每个系列在每个类目上一个值）、items（每行一个 {name, value} 对象）、
+    # points（每行一个坐标点）、cells（热力图单元格）、summary（统计结果，与行数无关）
+    output_layout: str = "category"
+    # 快速估算输出体积时，缩进格式下每个数据元素的结构开销与每个数值（连同缩进、逐项样式）的字节数上限
+    element_bytes: int = 24
+    value_bytes: int = 40
+    # 超出输出体积上限时的缩减方式：downsample 按步长抽样，top_n 只保留数值最大的类别，None 表示无需缩减
+    size_reduction: str = None
+    # 构建函数在通用参数之外支持的可选参数（如时间轴的 time_bucket），其他图表类型不会收到这些参数
+    extra_options: tuple = ()
+    _func: object = field(default=None, init=False, repr=False)
+
+    def load(self):
+        """导入并缓存构建函数"""
+        if self._func is None:
+            module_name, func_name = self.builder.split(":")
+            self._func = getattr(importlib.import_module(module_name), func_name)
+        return self._func
+
+    def series_count(self, value_keys: list, group_count: int) -> int:
+        """按分组数估算图表的系列数"""
+        per_group = len(value_keys) if self.value_keys_are_series else 1
+        if not self.grouped_series or not group_count:
+            return per_group
+        return group_count * per_group
+
+    def needs_all_columns(self, value_keys: list) -> bool:
+        """数值字段不足、需要构建函数自动补充时，必须保留数据中的全部字段"""
+        return len(value_keys) < self.auto_fill_value_keys
+
+    def prepare_keys(self, name_key: str, value_keys: list, series_names: list, columns: dict) -> tuple:
+        """
+        按图表类型的字段要求调整 value_keys 与 series_names
+        :return: (value_keys, series_names, 提示信息列表)，不满足要求时抛出 ValueError
+        """
+        value_keys = list(value_keys)
+        series_names = list(series_names)
+        messages = []
+        if self.numeric_name_key_axis and len(value_keys) == 1 and name_key in columns:
+            try:
+                if has_numeric(columns[name_key]):
+                    # 如果name_key是数值字段，将其也加入value_keys
+                    messages.append(f"检测到name_key '{name_key}' 是数值字段，已自动将其作为第二个数值轴")
+                    value_keys = [name_key] + value_keys
+                    series_names = [name_key] + series_names
+            except Exception:
+                pass
+        if len(value_keys) < self.min_value_keys:
+            raise ValueError(self.too_few_message or f"{self.name}需要至少{self.min_value_keys}个数值字段")
+        if self.max_value_keys is not None and len(value_keys) > self.max_value_keys:
+            messages.append(self.too_many_message or f"{self.name}只支持{self.max_value_keys}个数值字段，将使用前{self.max_value_keys}个字段")
+            value_keys = value_keys[:self.max_value_keys]
+            series_names = series_names[:self.max_value_keys]
+        return value_keys, series_names, messages
+
+
+CHART_TYPES = {}
+_ALIASES = {}
+
+
+def register_chart_type(chart_type: ChartType) -> ChartType:
+    """登记图表类型，名称和别名都可以用于查找（英文不区分大小写）"""
+    CHART_TYPES[chart_type.name] = chart_type
+    for alias in (chart_type.name,) + tuple(chart_type.aliases):
+        _ALIASES[alias.strip().lower()] = chart_type
+    return chart_type
+
+
+def get_chart_type(name: str):
+    """根据名称或别名查找图表类型，找不到时返回 None"""
+    if not isinstance(name, str):
+        return None
+    return _ALIASES.get(name.strip().lower())
+
+
+register_chart_type(ChartType(
+    name="饼状图", builder="utils.pie:generate_echarts_pie", aliases=("pie", "pie chart", "饼图"),
+    max_value_keys=1, too_many_message="饼图只支持一个数值字段，将使用第一个字段", supports_group=False,
+    output_layout="items", size_reduction="top_n", element_bytes=288,
+))
+register_chart_type(ChartType(
+    name="柱状图", builder="utils.bar:generate_echarts_bar", aliases=("bar", "bar chart", "柱形图", "条形图"),
+    size_reduction="top_n", grouped_series=True, extra_options=("time_bucket", "time_agg"),
+))
+register_chart_type(ChartType(
+    name="折线图", builder="utils.line:generate_echarts_line", aliases=("line", "line chart", "曲线图"),
+    size_reduction="downsample", grouped_series=True, extra_options=("time_bucket", "time_agg"),
+))
+register_chart_type(ChartType(
+    name="雷达图", builder="utils.radar:generate_echarts_radar", aliases=("radar", "radar chart"),
+    min_value_keys=3, too_few_message="雷达图需要至少三个数值字段进行多维度分析", grouped_series=True,
+    output_layout="items", size_reduction="top_n", value_bytes=160,
+))
+register_chart_type(ChartType(
+    name="漏斗图", builder="utils.funnel:generate_echarts_funnel", aliases=("funnel", "funnel chart"),
+    supports_group=False, output_layout="items", size_reduction="top_n",
+))
+register_chart_type(ChartType(
+    name="散点图", builder="utils.scatter:generate_echarts_scatter", aliases=("scatter", "scatter chart", "散点"),
+    too_few_message="散点图需要至少一个数值字段", auto_fill_value_keys=2, numeric_name_key_axis=True,
+    grouped_series=True, value_keys_are_series=False, output_layout="points", size_reduction="downsample",
+))
+register_chart_type(ChartType(
+    name="直方图", builder="utils.histogram:generate_echarts_histogram", aliases=("histogram", "hist", "分布直方图"),
+    max_value_keys=1, too_many_message="直方图只统计一个数值字段，将使用第一个字段", uses_name_key=False,
+    output_layout="summary",
+))
+register_chart_type(ChartType(
+    name="箱线图", builder="utils.boxplot:generate_echarts_boxplot", aliases=("boxplot", "box plot", "箱形图", "盒须图"),
+    uses_name_key=False, output_layout="summary",
+))
+register_chart_type(ChartType(
+    name="热力图", builder="utils.heatmap:generate_echarts_heatmap", aliases=("heatmap", "heat map", "热图"),
+    output_layout="cells", size_reduction="top_n", element_bytes=128,
+))
@@ -1,35 +1,55 @@
 from utils.chart import generate_colors, auto_detect_keys
-import json
+from utils.columns import as_columns, column_length, distinct_values, first_row
+from utils.quantize import quantize_columns
+from utils.serialize import dumps_config
+
+
+def _scatter_points(columns: dict, name_key: str, value_keys: list) -> list:
+    """按行生成 [x, y, 名称] 形式的散点数据"""
+    xs = columns[value_keys[0]]
+    ys = columns[value_keys[1]]
+    # 如果有name_key，添加名称信息用于tooltip
+    if name_key in columns:
+        return [[x_val, y_val, name] for x_val, y_val, name in zip(xs, ys, columns[name_key])]
+    return [[x_val, y_val] for x_val, y_val in zip(xs, ys)]
+
 
 def generate_echarts_scatter(
-    data_list: list,
+    data_list,
     name_key: str = None,
     value_keys: list = None,
     title: str = None,
     series_names: list = None,
     saturation=0.5,  # 新增饱和度参数
     brightness=0.95,  # 新增亮度参数
-    group_key: str = None  # 新增分组字段参数
+    group_key: str = None,  # 新增分组字段参数
+    precision=None,  # 数值精度：auto、小数位数（如 2）或有效数字（如 4s），为空时保留原始数值
+    compact=False,  # 为 True 时输出不带缩进的紧凑 JSON
+    chunked=False  # 为 True 时返回 JSON 文本片段的生成器，用于分段输出
 ) -> str:
     """生成通用 ECharts 散点图配置，支持自动推断字段、多维数据和分组显示"""
     if not data_list:
         raise ValueError("数据列表不能为空")
+    # 统一转换为列式数据 {字段名: 值列表}，data_list 也可以直接传入列式数据
+    columns = as_columns(data_list)
+    if not column_length(columns):
+        raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(columns)
     
     if not value_keys:
         # 散点图需要至少两个值字段
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(columns)
         # 尝试找第二个数值字段作为y轴
-        numeric_keys = [k for k, v in data_list[0].items() if isinstance(v, (int, float)) and k != value_key]
+        numeric_keys = [k for k, v in first_row(columns).items() if isinstance(v, (int, float)) and k != value_key]
         if numeric_keys:
             value_keys = [value_key, numeric_keys[0]]
         else:
             value_keys = [value_key, value_key]  # 如果只有一个数值字段，就用它作为两个轴
     elif len(value_keys) < 2:
         # 如果只提供了一个值字段，找另一个数值字段
-        numeric_keys = [k for k, v in data_list[0].items() if isinstance(v, (int, float)) and k != value_keys[0]]
+        numeric_keys = [k for k, v in first_row(columns).items() if isinstance(v, (int, float)) and k != value_keys[0]]
         if numeric_keys:
             value_keys.append(numeric_keys[0])
         else:
@@ -40,9 +60,12 @@ def generate_echarts_scatter(
     
     # 验证字段存在
     for value_key in value_keys[:2]:  # 散点图只需要前两个值字段
-        if value_key not in data_list[0] or name_key not in data_list[0]:
+        if value_key not in columns or name_key not in columns:
             raise KeyError(f"数据中未找到推断的字段: '{value_key}' 或 '{name_key}'")
     
+    # 按精度处理坐标，auto 模式下横轴、纵轴按各自的取值范围计算小数位数
+    columns = quantize_columns(columns, value_keys[:2], precision)
+
     # 自动生成标题
     if not title:
         if group_key:
@@ -88,26 +111,20 @@ def generate_echarts_scatter(
     }
 
     # 处理分组逻辑
-    if group_key and group_key in data_list[0]:
+    if group_key and group_key in columns:
         # 获取所有唯一的分组值
-        groups = set(item.get(group_key) for item in data_list)
+        groups = distinct_values(columns[group_key])
         groups = sorted(groups)  # 排序确保展示顺序一致
         colors = generate_colors(len(groups), saturation=saturation, brightness=brightness)
         
+        # 一次遍历把数据点分配到各自的分组（保持原始顺序）
+        group_points = {group_value: [] for group_value in groups}
+        for group_value, data_point in zip(columns[group_key], _scatter_points(columns, name_key, value_keys)):
+            group_points[group_value].append(data_point)
+        
         # 为每个分组创建系列
         for i, group_value in enumerate(groups):
-            group_data = []
-            for item in data_list:
-                if item.get(group_key) == group_value:
-                    # 确保我们有足够的value_keys来获取x和y值
-                    if len(value_keys) >= 2:
-                        x_val = item[value_keys[0]]
-                        y_val = item[value_keys[1]]
-                        data_point = [x_val, y_val]
-                        # 如果有name_key，添加名称信息用于tooltip
-                        if name_key in item:
-                            data_point.append(item[name_key])
-                        group_data.append(data_point)
+            group_data = group_points[group_value]
             
             series_config = {
                 "name": str(group_value),
@@ -152,15 +169,7 @@ def generate_echarts_scatter(
         }
     else:
         # 不分组的传统散点图逻辑
-        scatter_data = []
-        for item in data_list:
-            x_val = item[value_keys[0]]
-            y_val = item[value_keys[1]]
-            data_point = [x_val, y_val]
-            # 如果有name_key，添加名称信息用于tooltip
-            if name_key in item:
-                data_point.append(item[name_key])
-            scatter_data.append(data_point)
+        scatter_data = _scatter_points(columns, name_key, value_keys)
         
         color_list = generate_colors(1, saturation=saturation, brightness=brightness)
         
@@ -188,4 +197,4 @@ def generate_echarts_scatter(
         }
         config["series"].append(series_config)
     
-    return json.dumps(config, indent=4, ensure_ascii=False)
\ No newline at end of file
+    return dumps_config(config, compact, chunked)
\ No newline at end of file
@@ -0,0 +1,84 @@
+import json
+import os
+
+try:
+    # orjson 为可选依赖，安装后紧凑输出改用它编码
+    import orjson
+except ImportError:
+    orjson = None
+
+# 分段输出时每段的最大字符数，可通过环境变量调整
+CHUNK_SIZE = int(os.getenv("JSON2CHART_CHUNK_SIZE", str(64 * 1024)))
+# 紧凑格式下超过该长度的列表分批编码，每批一次性交给 json.dumps，兼顾速度与内存
+STREAM_BATCH = 1000
+
+
+def dumps_config(config: dict, compact: bool = False, chunked: bool = False):
+    """
+    把 ECharts 配置序列化为 JSON 字符串
+    默认缩进 4 格便于阅读；compact 为 True 时去掉缩进和多余空格，体积通常只有缩进格式的三分之一左右
+    chunked 为 True 时返回文本片段的生成器（见 iter_config），不在内存中生成完整字符串
+    """
+    if chunked:
+        return iter_config(config, compact)
+    if not compact:
+        return json.dumps(config, indent=4, ensure_ascii=False)
+    if orjson is not None:
+        try:
+            return orjson.dumps(config, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            # 含有 orjson 不支持的类型时退回标准库
+            pass
+    return json.dumps(config, ensure_ascii=False, separators=(",", ":"))
+
+
+def _iter_compact(value):
+    """紧凑格式的文本片段：长列表按批编码，字典逐个字段展开，其余部分整体编码"""
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        yield "{"
+        for i, (key, item) in enumerate(value.items()):
+            yield ("," if i else "") + json.dumps(key, ensure_ascii=False) + ":"
+            yield from _iter_compact(item)
+        yield "}"
+    elif isinstance(value, list) and len(value) > STREAM_BATCH:
+        yield "["
+        for start in range(0, len(value), STREAM_BATCH):
+            # 去掉每批编码结果两端的方括号即为逗号分隔的元素
+            batch = json.dumps(value[start:start + STREAM_BATCH], ensure_ascii=False, separators=(",", ":"))
+            yield ("," if start else "") + batch[1:-1]
+        yield "]"
+    else:
+        yield json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def iter_chunks(fragments, chunk_size: int = CHUNK_SIZE):
+    """把文本片段合并成不超过 chunk_size 个字符的分段，过长的片段会被切开；fragments 也可以是单个字符串"""
+    if isinstance(fragments, str):
+        fragments = [fragments]
+    parts = []
+    size = 0
+    for fragment in fragments:
+        if size + len(fragment) > chunk_size and parts:
+            yield "".join(parts)
+            parts = []
+            size = 0
+        while len(fragment) > chunk_size:
+            yield fragment[:chunk_size]
+            fragment = fragment[chunk_size:]
+        if fragment:
+            parts.append(fragment)
+            size += len(fragment)
+    if parts:
+        yield "".join(parts)
+
+
+def iter_config(config: dict, compact: bool = False, chunk_size: int = CHUNK_SIZE):
+    """
+    分段序列化 ECharts 配置，每段不超过 chunk_size 个字符，拼接后与 dumps_config 的结果等价
+    缩进格式直接使用标准库的 iterencode；紧凑格式分批编码长列表，避免逐个元素编码的开销
+    """
+    if compact:
+        fragments = _iter_compact(config)
+    else:
+        fragments = json.JSONEncoder(indent=4, ensure_ascii=False).iterencode(config)
+    return iter_chunks(fragments, chunk_size)
@@ -0,0 +1,55 @@
+import csv
+import io
+import math
+from array import array
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def records_to_markdown(records: list) -> str:
+    """
+    把样本记录转换为以 | 分隔的类 Markdown 表格，供大模型判断字段
+    表头为所有记录字段的并集（按首次出现的顺序），缺失值输出为 nan
+    """
+    keys = list(dict.fromkeys(key for item in records for key in item))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter='|', lineterminator='\n')
+    writer.writerow(keys)
+    for item in records:
+        writer.writerow(['nan' if _is_missing(item.get(key)) else item.get(key) for key in keys])
+    return '|' + buffer.getvalue().replace('\n', '\n|')
+
+
+def to_number(value):
+    """把单个值转换为数值，无法转换时返回 None（与 pandas.to_numeric(errors='coerce') 的规则一致）"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return None if isinstance(value, float) and math.isnan(value) else value
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            return int(text)
+        except ValueError:
+            pass
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+        return None if math.isnan(number) else number
+    return None
+
+
+def to_numeric(values) -> list:
+    """把一列值转换为数值，无法转换的值为 None"""
+    return [to_number(value) for value in values]
+
+
+def has_numeric(values) -> bool:
+    """判断一列值中是否至少有一个可以转换为数值，遇到第一个数值就返回"""
+    if isinstance(values, array) and values.typecode == 'q':
+        # 列缓冲区中的整数数组本身就是数值
+        return len(values) > 0
+    return any(to_number(value) is not None for value in values)
@@ -0,0 +1,235 @@
+import math
+import re
+from array import array
+from datetime import date, datetime, timedelta
+
+from utils.quantize import quantize_values
+
+# 支持的时间粒度（秒）
+BUCKET_SECONDS = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+    "week": 7 * 86400,
+}
+# 自动选择粒度时的目标点数：选择使点数不超过该值的最细粒度
+TARGET_POINTS = 300
+# 判断是否为时间字段时检查的非空值个数
+DETECT_SAMPLE = 50
+AGGREGATIONS = ("sum", "mean", "max")
+
+# 2024-01-02、2024/1/2 10:30、2024-01-02T10:30:00.123+08:00 等写法
+_DATETIME_PATTERN = re.compile(
+    r'^\s*(\d{4})[-/](\d{1,2})[-/](\d{1,2})'
+    r'(?:[ T](\d{1,2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6})\d*)?)?)?'
+    r'\s*(Z|[+-]\d{2}:?\d{2})?\s*$'
+)
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+# 1970-01-05 是星期一，按周分桶时以星期一为一周的开始
+_WEEK_OFFSET = 4 * 86400
+
+
+def parse_timestamp(value):
+    """
+    把日期时间值转换为自 1970-01-01 起的秒数（按字面时间计算，不做时区换算，与 ECharts 按本地时间解析字符串一致）
+    无法识别时返回 None；数字不视为时间，避免把年份、编号等误判为时间戳
+    """
+    if isinstance(value, datetime):
+        return (value.replace(tzinfo=None) - _EPOCH).total_seconds()
+    if isinstance(value, date):
+        return (datetime(value.year, value.month, value.day) - _EPOCH).total_seconds()
+    if not isinstance(value, str):
+        return None
+    match = _DATETIME_PATTERN.match(value)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, fraction, _ = match.groups()
+    try:
+        moment = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                          int((fraction or "0").ljust(6, "0")))
+    except ValueError:
+        return None
+    return (moment - _EPOCH).total_seconds()
+
+
+def format_timestamp(seconds: float) -> str:
+    """秒数转换回 ECharts 可以解析的时间字符串"""
+    moment = _EPOCH + timedelta(seconds=seconds)
+    if moment.microsecond:
+        return moment.isoformat(sep=" ", timespec="milliseconds")
+    return moment.isoformat(sep=" ")
+
+
+def is_temporal(values) -> bool:
+    """开头的若干个非空值都能识别为日期时间时，认为是时间字段"""
+    checked = 0
+    for value in values:
+        if value is None:
+            continue
+        if parse_timestamp(value) is None:
+            return False
+        checked += 1
+        if checked >= DETECT_SAMPLE:
+            break
+    return checked > 0
+
+
+def choose_bucket(span_seconds: float, target_points: int = TARGET_POINTS) -> str:
+    """选择使时间范围内的点数不超过 target_points 的最细粒度，范围再大也最多按周聚合"""
+    for bucket, size in BUCKET_SECONDS.items():
+        if span_seconds / size <= target_points:
+            return bucket
+    return "week"
+
+
+def _day_seconds(year: int, month: int, day: int):
+    """日期零点对应的秒数，日期无效时返回 None"""
+    try:
+        return (date(year, month, day).toordinal() - _EPOCH_ORDINAL) * 86400
+    except ValueError:
+        return None
+
+
+def parse_timestamps(values) -> list:
+    """
+    把一列日期时间值转换为秒数，结果与逐个调用 parse_timestamp 一致
+    同一天的日期部分只解析一次；最常见的 YYYY-MM-DD HH:MM:SS 定长写法直接按位置切片，不经过正则
+    """
+    day_cache = {}
+    result = []
+    append = result.append
+    for value in values:
+        if type(value) is str and len(value) == 19 and value[4] == '-' and value[7] == '-' and value[10] in ' T' \
+                and value[13] == ':' and value[16] == ':':
+            prefix = value[:10]
+            day = day_cache.get(prefix)
+            if day is None and prefix not in day_cache:
+                try:
+                    day = _day_seconds(int(value[:4]), int(value[5:7]), int(value[8:10]))
+                except ValueError:
+                    day = None
+                day_cache[prefix] = day
+            try:
+                hour, minute, second = int(value[11:13]), int(value[14:16]), int(value[17:19])
+            except ValueError:
+                hour = None
+            if day is None or hour is None or hour > 23 or minute > 59 or second > 59:
+                append(parse_timestamp(value))
+            else:
+                append(day + hour * 3600 + minute * 60 + second)
+        else:
+            append(parse_timestamp(value))
+    return result
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return None if isinstance(value, float) and math.isnan(value) else value
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        return None if math.isnan(number) else number
+    return None
+
+
+def resample_time_series(columns: dict, name_key: str, value_keys: list, group_key: str = None,
+                         bucket: str = "auto", agg: str = "mean", target_points: int = TARGET_POINTS,
+                         precision=None):
+    """
+    把时间字段作为横轴，按时间粒度分桶聚合
+    :param bucket: auto（按时间范围和目标点数自动选择）、raw（不聚合）或 minute/hour/day/week
+    :param agg: 同一分桶内的聚合方式 sum/mean/max
+    :param precision: 聚合结果的数值精度，见 utils.quantize.parse_precision
+    :return: name_key 不是时间字段时返回 None，否则返回 (实际粒度, {分组: {数值字段: [[时间, 值], ...]}})，
+             不分组时分组为 None；数据点按时间排序
+    """
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"不支持的聚合方式: {agg}，可选值为 {', '.join(AGGREGATIONS)}")
+    if bucket not in ("auto", "raw") and bucket not in BUCKET_SECONDS:
+        raise ValueError(f"不支持的时间粒度: {bucket}，可选值为 auto、raw、{', '.join(BUCKET_SECONDS)}")
+    names = columns[name_key]
+    if not is_temporal(names):
+        return None
+
+    times = parse_timestamps(names)
+    valid = [t for t in times if t is not None]
+    if not valid:
+        return None
+    if bucket == "auto":
+        # 点数本身不多时保留原始时间点
+        bucket = "raw" if len(valid) <= target_points else choose_bucket(max(valid) - min(valid), target_points)
+
+    # 第一遍：每行所属的 (分组, 分桶) 编号
+    groups = columns[group_key] if group_key else None
+    if bucket != "raw":
+        size = BUCKET_SECONDS[bucket]
+        offset = _WEEK_OFFSET if bucket == "week" else 0
+    slot_of = {}
+    slot_keys = []
+    rows = []
+    for row, seconds in enumerate(times):
+        if seconds is None:
+            continue
+        if bucket != "raw":
+            seconds = (seconds - offset) // size * size + offset
+        key = (groups[row] if groups is not None else None, seconds)
+        slot = slot_of.get(key)
+        if slot is None:
+            slot = slot_of[key] = len(slot_keys)
+            slot_keys.append(key)
+        rows.append((row, slot))
+
+    # 第二遍：按列聚合，整数/小数列缓冲区中没有空值，可以直接累加
+    aggregated = []
+    for value_key in value_keys:
+        values = columns[value_key]
+        if not (isinstance(values, array) and values.typecode in 'qd'):
+            values = [_to_float(value) for value in values]
+        totals = [0] * len(slot_keys)
+        counts = [0] * len(slot_keys)
+        maxima = [None] * len(slot_keys)
+        for row, slot in rows:
+            number = values[row]
+            if number is None:
+                continue
+            totals[slot] += number
+            counts[slot] += 1
+            current = maxima[slot]
+            if current is None or number > current:
+                maxima[slot] = number
+        if agg == "sum":
+            aggregated.append([total if count else None for total, count in zip(totals, counts)])
+        elif agg == "mean":
+            aggregated.append([total / count if count else None for total, count in zip(totals, counts)])
+        else:
+            aggregated.append(maxima)
+        # 均值等聚合结果会产生很长的小数，在聚合之后再处理精度
+        aggregated[-1] = quantize_values(aggregated[-1], precision)
+
+    series = {}
+    for slot in sorted(range(len(slot_keys)), key=lambda slot: slot_keys[slot][1]):
+        group, seconds = slot_keys[slot]
+        label = format_timestamp(seconds)
+        by_value = series.setdefault(group, {value_key: [] for value_key in value_keys})
+        for value_key, column in zip(value_keys, aggregated):
+            by_value[value_key].append([label, column[slot]])
+    return bucket, series
+
+
+def time_axis_config() -> dict:
+    """ECharts 时间轴配置"""
+    return {
+        "type": "time",
+        "splitLine": {
+            "show": True,
+            "lineStyle": {
+                "color": ['#eee'],
+                "type": 'dashed'
+            }
+        }
+    }
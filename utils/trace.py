@@ -0,0 +1,125 @@
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """一个阶段的计时，可以用 with 包裹代码块，也可以手动调用 start/end"""
+
+    __slots__ = ("trace", "name", "attrs", "started")
+
+    def __init__(self, trace, name: str, attrs: dict):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.started = None
+
+    def set(self, **attrs):
+        """补充阶段的属性（如行数、图表类型），会写入日志和汇总"""
+        self.attrs.update(attrs)
+
+    def start(self):
+        self.started = time.perf_counter()
+        return self
+
+    def end(self, **attrs):
+        if self.started is None:
+            return
+        self.attrs.update(attrs)
+        self.trace.record(self, time.perf_counter())
+        self.started = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.end()
+        return False
+
+
+class _NoopSpan:
+    """关闭计时时使用的空操作，所有调用共用同一个实例"""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def start(self):
+        return self
+
+    def end(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """一次调用中各阶段的耗时：每个阶段结束时写一条 JSON 格式的 DEBUG 日志，结束后可以输出汇总"""
+
+    enabled = True
+
+    def __init__(self, name: str = "json2chart"):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def span(self, name: str, **attrs) -> Span:
+        return Span(self, name, attrs)
+
+    def record(self, span: Span, ended: float):
+        record = {
+            "name": span.name,
+            "start_ms": round((span.started - self.started) * 1000, 2),
+            "ms": round((ended - span.started) * 1000, 2),
+        }
+        record.update(span.attrs)
+        self.spans.append(record)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(dict(record, trace=self.name), ensure_ascii=False, default=str))
+
+    def summary(self, status: str = None) -> dict:
+        """汇总：调用结果、总耗时、按阶段名合计的耗时，以及每个阶段的明细"""
+        stages = {}
+        for record in self.spans:
+            stages[record["name"]] = round(stages.get(record["name"], 0) + record["ms"], 2)
+        return {
+            "trace": self.name,
+            "status": status,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "stages": stages,
+            "spans": self.spans,
+        }
+
+
+class NullTrace:
+    """关闭计时时的替代品：span 返回共用的空操作，不读取时钟也不写日志"""
+
+    enabled = False
+
+    def span(self, name: str, **attrs):
+        return _NOOP_SPAN
+
+    def summary(self, status: str = None):
+        return None
+
+
+NULL_TRACE = NullTrace()
+
+
+def start_trace(enabled: bool = False, name: str = "json2chart"):
+    """enabled 为 True 或 utils.trace 日志开启了 DEBUG 级别时记录各阶段耗时，否则返回 NullTrace"""
+    if enabled or logger.isEnabledFor(logging.DEBUG):
+        return Trace(name)
+    return NULL_TRACE
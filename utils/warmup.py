@@ -0,0 +1,73 @@
+import logging
+import os
+import time
+
+from utils.chart import generate_colors
+from utils.decisions import get_decision_cache
+from utils.executor import make_chart_job, run_chart_job
+from utils.registry import CHART_TYPES
+
+logger = logging.getLogger(__name__)
+
+# 设置为 1 时在插件启动阶段执行预热
+WARMUP_ENV = "JSON2CHART_WARMUP"
+# 预先生成的调色板大小（系列数、分组数通常不会超过这个范围）
+PALETTE_SIZES = range(1, 33)
+# 工具参数中饱和度和亮度的默认值
+DEFAULT_SATURATION = 0.5
+DEFAULT_BRIGHTNESS = 0.95
+
+# 用于预热的少量数据，覆盖所有图表类型的字段要求
+_WARMUP_COLUMNS = {
+    "name": ["A", "B", "C"],
+    "v1": [1, 2, 3],
+    "v2": [4.5, 5.5, 6.5],
+    "v3": [7, 8, 9],
+    "group": ["g1", "g2", "g1"],
+}
+
+
+def warmup_enabled() -> bool:
+    return os.getenv(WARMUP_ENV, "0") == "1"
+
+
+def warm_up(palette_sizes=PALETTE_SIZES) -> dict:
+    """
+    预热：导入所有图表构建函数并各执行一次、生成常用调色板、加载持久化的决策缓存
+    让第一次调用的耗时与之后的调用一致，返回各阶段耗时（毫秒）
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    stage = time.perf_counter()
+    for spec in CHART_TYPES.values():
+        spec.load()
+    timings["builders"] = (time.perf_counter() - stage) * 1000
+
+    # 图表的固定配置是构建函数中的字面量，用小数据执行一次，让配置构造和 JSON 序列化的代码路径都预先走过
+    stage = time.perf_counter()
+    for spec in CHART_TYPES.values():
+        value_keys = ["v1", "v2", "v3"][:spec.max_value_keys or 3]
+        job = make_chart_job(spec.name, _WARMUP_COLUMNS, name_key="name", value_keys=value_keys,
+                             title="warmup", series_names=value_keys, saturation=DEFAULT_SATURATION,
+                             brightness=DEFAULT_BRIGHTNESS, group_key=None)
+        try:
+            run_chart_job(job)
+        except Exception as e:
+            logger.warning("预热图表类型 %s 失败: %s", spec.name, e)
+    timings["templates"] = (time.perf_counter() - stage) * 1000
+
+    stage = time.perf_counter()
+    for size in palette_sizes:
+        generate_colors(size, DEFAULT_SATURATION, DEFAULT_BRIGHTNESS)
+    timings["palettes"] = (time.perf_counter() - stage) * 1000
+
+    stage = time.perf_counter()
+    cache = get_decision_cache()
+    timings["decision_cache"] = (time.perf_counter() - stage) * 1000
+
+    timings["total"] = (time.perf_counter() - start) * 1000
+    logger.info("预热完成，耗时 %.1f ms（构建函数 %.1f ms，模板 %.1f ms，调色板 %.1f ms，决策缓存 %.1f ms，%d 条）",
+                timings["total"], timings["builders"], timings["templates"], timings["palettes"],
+                timings["decision_cache"], len(cache.entries))
+    return timings